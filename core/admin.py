@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Mensagem, Reuniao, Tarefa, Perfil
+from django.utils import timezone
+from .models import Mensagem, Reuniao, Tarefa, Perfil, Trabalho, Turma
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
 
@@ -14,10 +15,40 @@ class PerfilInline(admin.StackedInline):
 class UserAdmin(BaseUserAdmin):
     inlines = (PerfilInline,)
 
+    def get_inline_instances(self, request, obj=None):
+        # Ao criar o usuário o perfil nasce pelo sinal (core/models.py); o inline aparece só na edição,
+        # senão o admin tentaria criar um segundo perfil
+        if obj is None:
+            return []
+        return super().get_inline_instances(request, obj)
+
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
 
 # Registrando os modelos para aparecerem no painel /admin/
 admin.site.register(Mensagem)
 admin.site.register(Reuniao)
-admin.site.register(Tarefa)
\ No newline at end of file
+admin.site.register(Tarefa)
+
+
+@admin.register(Turma)
+class TurmaAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'mentor', 'criada_em')
+    raw_id_fields = ('mentor', 'alunos')  # sem carregar todos os usuários num <select>
+
+
+# Fila de trabalhos (core/fila.py): o que está pendente, o que falhou e por quê
+@admin.register(Trabalho)
+class TrabalhoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado', 'tentativas', 'executar_em', 'worker', 'criado_em', 'concluido_em')
+    list_filter = ('estado', 'tipo')
+    readonly_fields = ('criado_em', 'iniciado_em', 'concluido_em', 'worker', 'erro')
+    ordering = ('-id',)
+    actions = ['tentar_de_novo']
+
+    @admin.action(description='Tentar de novo (volta para a fila)')
+    def tentar_de_novo(self, request, queryset):
+        total = queryset.exclude(estado=Trabalho.EXECUTANDO).update(
+            estado=Trabalho.PENDENTE, tentativas=0, executar_em=timezone.now(), erro='',
+        )
+        self.message_user(request, f'{total} trabalho(s) de volta na fila.')
@@ -0,0 +1,505 @@
+# core/agenda.py
+# --- CONSULTAS DA AGENDA (REUNIÕES E TAREFAS POR PERÍODO) ---
+# Tudo aqui trabalha com uma janela [inicio, fim): a página do calendário, a API
+# (api/calendario/?start=&end=) e o feed .ics para apps de calendário externos.
+# Reuniões e tarefas que repetem são uma linha só: as consultas trazem as séries que tocam a janela
+# e ocorrencias_de_reunioes()/ocorrencias_de_tarefas() calculam as ocorrências (core/recorrencia.py).
+from bisect import bisect_left
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from . import recorrencia
+from .models import ParticipanteReuniao, Reuniao, ReuniaoExcecao, Tarefa, TarefaExcecao
+
+DURACAO_MAXIMA = timedelta(hours=8)  # o form não deixa passar disso (e a busca de ocupação conta com isso)
+LOTE_USUARIOS = 200  # usuários por consulta de ocupação
+HORARIO_UTIL = (time(7), time(22))  # horários livres só são sugeridos dentro dessa faixa (hora local)
+
+# Janela do feed .ics: um pouco de passado (para o histórico no app) e um ano pra frente
+FEED_PASSADO = timedelta(days=90)
+FEED_FUTURO = timedelta(days=365)
+
+SALT_FEED = 'core.agenda.feed'
+
+
+# --- CONSULTAS POR JANELA ---
+
+def reunioes_do_usuario(usuario, inicio, fim):
+    """
+    Reuniões em que participo (organizando ou convidado) que podem ter ocorrência em [inicio, fim):
+    as que começam na janela e as séries que ainda não acabaram. As ocorrências em si saem de
+    ocorrencias_de_reunioes(); o queryset serve direto para contagens e para o feed.
+    Um filtro só na tabela de participantes, cada lado do OR no seu índice (participante_agenda_idx e o
+    parcial participante_serie_idx), uma linha por reunião (par reunião/usuário é único), sem DISTINCT.
+    """
+    folga = recorrencia.DESLOCAMENTO_MAXIMO
+    return (
+        Reuniao.objects.filter(
+            Q(participacoes__usuario=usuario, participacoes__data_inicio__gte=inicio, participacoes__data_inicio__lt=fim)
+            | Q(
+                participacoes__usuario=usuario,
+                participacoes__fim_da_serie__gt=inicio - folga,
+                participacoes__data_inicio__lt=fim + folga,
+            )
+        )
+        .select_related('solicitante')
+        .prefetch_related(Reuniao.prefetch_convidados())
+        .order_by('data_inicio')
+    )
+
+
+def tarefas_do_usuario(usuario, inicio, fim):
+    """
+    Tarefas minhas (dono ou criador) que podem ter ocorrência com prazo em [inicio, fim) — datas, não datetimes.
+    Como em reunioes_do_usuario, as ocorrências saem de ocorrencias_de_tarefas().
+    """
+    folga = recorrencia.DESLOCAMENTO_MAXIMO
+    na_janela = Q(data_prazo__gte=inicio, data_prazo__lt=fim)
+    series = Q(fim_da_serie__gte=inicio - folga, data_prazo__lt=fim + folga)
+    # Os quatro lados do OR escritos por extenso: cada um cai num índice (dono/criador x prazo/série)
+    return (
+        Tarefa.objects.filter(
+            Q(usuario=usuario) & na_janela | Q(criador=usuario) & na_janela
+            | Q(usuario=usuario) & series | Q(criador=usuario) & series
+        )
+        .order_by('data_prazo', 'id')
+    )
+
+
+# --- OCORRÊNCIAS (SÉRIES EXPANDIDAS NA JANELA) ---
+
+def _excecoes(modelo, campo, ids, primeiro_dia, ultimo_dia):
+    # {(id da série, data_original): exceção} das séries `ids` no período; nenhuma consulta se não há série
+    if not ids:
+        return {}
+    excecoes = modelo.objects.filter(**{f'{campo}__in': ids}, data_original__gte=primeiro_dia, data_original__lte=ultimo_dia)
+    return {(getattr(e, campo), e.data_original): e for e in excecoes}
+
+
+def _dias_com_folga(inicio, fim):
+    folga = recorrencia.DESLOCAMENTO_MAXIMO
+    return timezone.localtime(inicio - folga).date(), timezone.localtime(fim + folga).date()
+
+
+def _horarios(reuniao_id, data_inicio, data_fim, frequencia, repetir_ate, repeticoes, excecoes, inicio, fim):
+    """(original, inicio, fim) de cada ocorrência não cancelada que cruza [inicio, fim)."""
+    folga = recorrencia.DESLOCAMENTO_MAXIMO
+    duracao = data_fim - data_inicio
+    for original in recorrencia.inicios(data_inicio, frequencia, repetir_ate, repeticoes):
+        if original >= fim + folga:
+            return
+        if original + folga + DURACAO_MAXIMA <= inicio:
+            continue
+        excecao = excecoes.get((reuniao_id, timezone.localtime(original).date()))
+        if excecao is None:
+            ini, fi = original, original + duracao
+        elif excecao.cancelada:
+            continue
+        else:
+            ini, fi = excecao.data_inicio, excecao.data_fim
+        if ini < fim and fi > inicio:
+            yield original, ini, fi
+
+
+def ocorrencias_de_reunioes(reunioes, inicio, fim):
+    """
+    Ocorrências (recorrencia.Ocorrencia) com início em [inicio, fim), em ordem de início.
+    Mais uma consulta (as exceções da janela) só se alguma reunião repete.
+    """
+    reunioes = list(reunioes)
+    excecoes = _excecoes(ReuniaoExcecao, 'reuniao_id', [r.id for r in reunioes if r.frequencia], *_dias_com_folga(inicio, fim))
+
+    ocorrencias = []
+    for r in reunioes:
+        for original, ini, fi in _horarios(r.id, r.data_inicio, r.data_fim, r.frequencia, r.repetir_ate, r.repeticoes, excecoes, inicio, fim):
+            if ini >= inicio:
+                ocorrencias.append(recorrencia.Ocorrencia(r, original, data_inicio=ini, data_fim=fi, inicio_original=original))
+    ocorrencias.sort(key=lambda o: (o.data_inicio, o.id))
+    return ocorrencias
+
+
+def ocorrencias_de_tarefas(tarefas, inicio, fim):
+    """Ocorrências com prazo em [inicio, fim) (datas), em ordem de prazo."""
+    tarefas = list(tarefas)
+    folga = recorrencia.DESLOCAMENTO_MAXIMO
+    excecoes = _excecoes(TarefaExcecao, 'tarefa_id', [t.id for t in tarefas if t.frequencia], inicio - folga, fim + folga)
+
+    ocorrencias = []
+    for t in tarefas:
+        for original in recorrencia.datas(t.data_prazo, t.frequencia, t.repetir_ate, t.repeticoes):
+            if original >= fim + folga:
+                break
+            if original < inicio - folga:
+                continue
+            excecao = excecoes.get((t.id, original))
+            if excecao is not None and excecao.cancelada:
+                continue
+            prazo = excecao.data_prazo if excecao is not None else original
+            if inicio <= prazo < fim:
+                ocorrencias.append(recorrencia.Ocorrencia(t, original, data_prazo=prazo))
+    ocorrencias.sort(key=lambda o: (o.data_prazo, o.id))
+    return ocorrencias
+
+
+def ocorrencia_da_reuniao(reuniao, dia):
+    """A ocorrência da série que caía em `dia` (data original), ou None se não existe ou foi cancelada."""
+    inicio = inicio_do_dia(dia) - recorrencia.DESLOCAMENTO_MAXIMO
+    fim = inicio_do_dia(dia) + timedelta(days=1) + recorrencia.DESLOCAMENTO_MAXIMO
+    return next((o for o in ocorrencias_de_reunioes([reuniao], inicio, fim) if o.original == dia), None)
+
+
+def ocorrencia_da_tarefa(tarefa, dia):
+    folga = recorrencia.DESLOCAMENTO_MAXIMO
+    return next((o for o in ocorrencias_de_tarefas([tarefa], dia - folga, dia + timedelta(days=1) + folga) if o.original == dia), None)
+
+
+def horarios_da_serie(inicio, fim, frequencia='', repetir_ate=None, repeticoes=None):
+    """[(inicio, fim), ...] de todas as ocorrências pela regra (sem olhar exceções)."""
+    duracao = fim - inicio
+    return [(o, o + duracao) for o in recorrencia.inicios(inicio, frequencia, repetir_ate, repeticoes)]
+
+
+def reuniao_json(reuniao):
+    inicio = timezone.localtime(reuniao.data_inicio)
+    return {
+        'id': reuniao.id,
+        'titulo': reuniao.titulo,
+        'inicio': inicio.isoformat(),
+        'fim': timezone.localtime(reuniao.data_fim).isoformat(),
+        'link': reuniao.link_externo,
+        'organizador': reuniao.solicitante.username,
+        'convidados': [c.username for c in reuniao.convidados_lista],
+        'repete': reuniao.frequencia or None,
+        'ocorrencia': reuniao.original.isoformat() if isinstance(reuniao, recorrencia.Ocorrencia) else None,
+    }
+
+
+def tarefa_json(tarefa):
+    return {
+        'id': tarefa.id,
+        'titulo': tarefa.titulo,
+        'prazo': tarefa.data_prazo.isoformat(),
+        'concluida': tarefa.concluida,
+        'informacoes': tarefa.informacoes,
+        'repete': tarefa.frequencia or None,
+        'ocorrencia': tarefa.original.isoformat() if isinstance(tarefa, recorrencia.Ocorrencia) else None,
+    }
+
+
+# --- DISPONIBILIDADE ---
+# Ocupação de vários usuários de uma vez: uma consulta por lote de LOTE_USUARIOS na tabela
+# de participantes (índice usuario, data_inicio, data_fim), e o resto é juntar intervalos em Python.
+
+def participacoes_ocupadas(usuario_ids, inicio, fim):
+    """Participações dos usuários em reuniões que podem cruzar [inicio, fim) (as séries ainda precisam ser expandidas)."""
+    folga = recorrencia.DESLOCAMENTO_MAXIMO
+    return ParticipanteReuniao.objects.filter(
+        # Sobrepõe se começa antes do fim da janela e termina depois do começo. Como nenhuma reunião
+        # dura mais que DURACAO_MAXIMA, o começo também tem limite de baixo: vira um intervalo no índice
+        Q(usuario_id__in=usuario_ids, data_inicio__lt=fim, data_inicio__gt=inicio - DURACAO_MAXIMA, data_fim__gt=inicio)
+        # Séries em andamento (índice parcial participante_serie_idx)
+        | Q(usuario_id__in=usuario_ids, fim_da_serie__gt=inicio - folga, data_inicio__lt=fim + folga)
+    )
+
+
+def ocupacoes(usuario_ids, inicio, fim, ignorar_reuniao=None):
+    """{usuario_id: [(inicio, fim), ...]} com as reuniões (ou ocorrências) de cada um que cruzam [inicio, fim)."""
+    ids = list(dict.fromkeys(usuario_ids))
+    resultado = {uid: [] for uid in ids}
+
+    linhas = []
+    for i in range(0, len(ids), LOTE_USUARIOS):
+        participacoes = participacoes_ocupadas(ids[i:i + LOTE_USUARIOS], inicio, fim)
+        if ignorar_reuniao:
+            participacoes = participacoes.exclude(reuniao_id=ignorar_reuniao)
+        linhas += participacoes.values_list(
+            'usuario_id', 'reuniao_id', 'data_inicio', 'data_fim',
+            'reuniao__frequencia', 'reuniao__repetir_ate', 'reuniao__repeticoes',
+        )
+
+    excecoes = _excecoes(ReuniaoExcecao, 'reuniao_id', {linha[1] for linha in linhas if linha[4]}, *_dias_com_folga(inicio, fim))
+    for uid, reuniao_id, *regra in linhas:
+        resultado[uid] += [(ini, fi) for _, ini, fi in _horarios(reuniao_id, *regra, excecoes, inicio, fim)]
+    for intervalos in resultado.values():
+        intervalos.sort()
+    return resultado
+
+
+def conflitos(usuario_ids, inicio, fim, ignorar_reuniao=None):
+    """Só quem está ocupado em algum momento de [inicio, fim): {usuario_id: [(inicio, fim), ...]}."""
+    return {uid: livres for uid, livres in ocupacoes(usuario_ids, inicio, fim, ignorar_reuniao).items() if livres}
+
+
+def conflitos_da_serie(usuario_ids, horarios, ignorar_reuniao=None):
+    """
+    Como conflitos(), para todas as ocorrências de uma série de uma vez (horarios_da_serie):
+    uma busca de ocupação só, do começo da primeira ao fim da última, e o cruzamento em Python.
+    """
+    horarios = sorted(horarios)
+    comecos = [ini for ini, _ in horarios]
+    resultado = {}
+    for uid, intervalos in ocupacoes(usuario_ids, horarios[0][0], horarios[-1][1], ignorar_reuniao).items():
+        choques = []
+        for ini, fi in intervalos:
+            # As ocorrências não se sobrepõem: basta olhar a última que começa antes do fim do intervalo
+            i = bisect_left(comecos, fi) - 1
+            if i >= 0 and horarios[i][1] > ini:
+                choques.append((ini, fi))
+        if choques:
+            resultado[uid] = choques
+    return resultado
+
+
+def mesclar(intervalos):
+    """Junta intervalos que se sobrepõem ou encostam. Devolve a lista ordenada."""
+    mesclados = []
+    for ini, fim in sorted(intervalos):
+        if mesclados and ini <= mesclados[-1][1]:
+            if fim > mesclados[-1][1]:
+                mesclados[-1] = (mesclados[-1][0], fim)
+        else:
+            mesclados.append((ini, fim))
+    return mesclados
+
+
+def _faixas_uteis(inicio, fim):
+    # Recorta [inicio, fim) nos pedaços dentro do HORARIO_UTIL de cada dia (hora local)
+    dia = timezone.localtime(inicio).date()
+    ultimo = timezone.localtime(fim).date()
+    while dia <= ultimo:
+        abre = timezone.make_aware(datetime.combine(dia, HORARIO_UTIL[0]))
+        fecha = timezone.make_aware(datetime.combine(dia, HORARIO_UTIL[1]))
+        ini, fi = max(abre, inicio), min(fecha, fim)
+        if ini < fi:
+            yield ini, fi
+        dia += timedelta(days=1)
+
+
+def horarios_livres(usuario_ids, inicio, fim, duracao, limite=5, ignorar_reuniao=None):
+    """
+    Os primeiros `limite` intervalos em [inicio, fim) em que TODOS estão livres
+    por pelo menos `duracao` (dentro do HORARIO_UTIL). Lista de (inicio, fim) de cada folga.
+    """
+    ocupado = mesclar(
+        intervalo
+        for intervalos in ocupacoes(usuario_ids, inicio, fim, ignorar_reuniao).values()
+        for intervalo in intervalos
+    )
+
+    livres = []
+    for faixa_ini, faixa_fim in _faixas_uteis(inicio, fim):
+        cursor = faixa_ini
+        for oc_ini, oc_fim in ocupado:
+            if oc_fim <= cursor:
+                continue
+            if oc_ini >= faixa_fim:
+                break
+            if oc_ini - cursor >= duracao:
+                livres.append((cursor, oc_ini))
+                if len(livres) >= limite:
+                    return livres
+            cursor = max(cursor, oc_fim)
+        if faixa_fim - cursor >= duracao:
+            livres.append((cursor, faixa_fim))
+            if len(livres) >= limite:
+                return livres
+    return livres
+
+
+# --- FEED .ICS ---
+
+def token_do_feed(usuario):
+    # O app de calendário não tem sessão: o link leva um token assinado com o id do usuário
+    return signing.Signer(salt=SALT_FEED).sign(str(usuario.id))
+
+
+def usuario_do_token(token):
+    """Id do usuário dono do token, ou None se a assinatura não bate."""
+    try:
+        return int(signing.Signer(salt=SALT_FEED).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def janela_do_feed():
+    agora = timezone.now()
+    return agora - FEED_PASSADO, agora + FEED_FUTURO
+
+
+def etag_do_feed(usuario):
+    """Muda quando qualquer item da janela muda, entra ou sai (maior atualizado_em + quantidade)."""
+    inicio, fim = janela_do_feed()
+    reunioes = reunioes_do_usuario(usuario, inicio, fim).order_by().aggregate(n=Count('id'), ultima=Max('atualizado_em'))
+    tarefas = tarefas_do_usuario(usuario, inicio.date(), fim.date()).order_by().aggregate(n=Count('id'), ultima=Max('atualizado_em'))
+    partes = [reunioes['n'], reunioes['ultima'], tarefas['n'], tarefas['ultima'], inicio.date()]
+    return '-'.join(str(p.timestamp()) if isinstance(p, datetime) else str(p) for p in partes)
+
+
+def _escapar(texto):
+    return (texto or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _dobrar(linha):
+    # RFC 5545: linhas de no máximo 75 octetos, continuação começa com espaço
+    dados = linha.encode('utf-8')
+    if len(dados) <= 75:
+        return linha + '\r\n'
+    partes, atual = [], b''
+    for caractere in linha:
+        c = caractere.encode('utf-8')
+        if len(atual) + len(c) > (75 if not partes else 74):
+            partes.append(atual.decode('utf-8'))
+            atual = b''
+        atual += c
+    partes.append(atual.decode('utf-8'))
+    return '\r\n '.join(partes) + '\r\n'
+
+
+def _utc(momento):
+    return momento.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _local(momento):
+    # Séries vão em hora local com TZID: "toda terça 14h" continua 14h quando muda o horário de verão
+    return f'TZID={settings.TIME_ZONE}:{timezone.localtime(momento):%Y%m%dT%H%M%S}'
+
+
+def _deslocamento(delta):
+    minutos = int(delta.total_seconds()) // 60
+    sinal = '-' if minutos < 0 else '+'
+    return f'{sinal}{abs(minutos) // 60:02d}{abs(minutos) % 60:02d}'
+
+
+def _vtimezone(inicio, fim):
+    """
+    VTIMEZONE do settings.TIME_ZONE (RFC 5545: todo TZID usado precisa da definição no arquivo).
+    Sai do próprio zoneinfo: o deslocamento em vigor no início da janela e cada mudança dentro dela
+    (procurada dia a dia e depois até o minuto).
+    """
+    zona = timezone.get_default_timezone()
+
+    def em(momento):
+        return momento.astimezone(zona)
+
+    def componente(momento_utc, antes, depois, referencia=None):
+        # referencia: de onde tirar nome e horário de verão (o próprio momento, ou o início da janela)
+        local = momento_utc.replace(tzinfo=None) + antes
+        referencia = em(referencia or momento_utc)
+        tipo = 'DAYLIGHT' if referencia.dst() else 'STANDARD'
+        yield f'BEGIN:{tipo}\r\n'
+        yield f'DTSTART:{local:%Y%m%dT%H%M%S}\r\n'
+        yield f'TZOFFSETFROM:{_deslocamento(antes)}\r\n'
+        yield f'TZOFFSETTO:{_deslocamento(depois)}\r\n'
+        yield f'TZNAME:{referencia.tzname()}\r\n'
+        yield f'END:{tipo}\r\n'
+
+    yield 'BEGIN:VTIMEZONE\r\n'
+    yield f'TZID:{settings.TIME_ZONE}\r\n'
+    atual = em(inicio).utcoffset()
+    yield from componente(datetime(1970, 1, 1, tzinfo=dt_timezone.utc) - atual, atual, atual, referencia=inicio)
+
+    dia = inicio.astimezone(dt_timezone.utc)
+    while dia < fim:
+        proximo = dia + timedelta(days=1)
+        novo = em(proximo).utcoffset()
+        if novo != atual:
+            antes, depois = dia, proximo
+            while depois - antes > timedelta(minutes=1):
+                meio = antes + (depois - antes) / 2
+                antes, depois = (meio, depois) if em(meio).utcoffset() == atual else (antes, meio)
+            mudanca = depois.replace(second=0, microsecond=0)
+            if em(mudanca).utcoffset() != novo:
+                mudanca += timedelta(minutes=1)
+            yield from componente(mudanca, atual, novo)
+            atual = novo
+        dia = proximo
+    yield 'END:VTIMEZONE\r\n'
+
+
+def _linhas_da_serie(objeto, ultimo, dia_inteiro=False):
+    # RRULE com UNTIL na última ocorrência (cobre repetir_ate, repeticoes e o teto MAX_REPETICOES)
+    # e EXDATE das ocorrências canceladas; as movidas vão depois, como VEVENT com RECURRENCE-ID
+    ate = f'{ultimo:%Y%m%d}' if dia_inteiro else _utc(ultimo)
+    yield f'RRULE:{recorrencia.RRULE[objeto.frequencia]};UNTIL={ate}\r\n'
+    for excecao in objeto.excecoes.all():
+        if excecao.cancelada:
+            yield f'EXDATE;{_data_original(objeto, excecao, dia_inteiro)}\r\n'
+
+
+def _data_original(objeto, excecao, dia_inteiro):
+    if dia_inteiro:
+        return f'VALUE=DATE:{excecao.data_original:%Y%m%d}'
+    hora = timezone.localtime(objeto.data_inicio).time()
+    return _local(timezone.make_aware(datetime.combine(excecao.data_original, hora)))
+
+
+def linhas_ics(usuario, host):
+    """Gerador com o VCALENDAR inteiro, uma linha por vez (para StreamingHttpResponse)."""
+    inicio, fim = janela_do_feed()
+
+    yield 'BEGIN:VCALENDAR\r\n'
+    yield 'VERSION:2.0\r\n'
+    yield 'PRODID:-//Mentoria//Agenda//PT-BR\r\n'
+    yield 'CALSCALE:GREGORIAN\r\n'
+    yield _dobrar(f'X-WR-CALNAME:{_escapar("Mentoria — " + usuario.username)}')
+    yield from _vtimezone(inicio, fim)
+
+    # Série vai como um VEVENT só, com RRULE: quem expande é o app de calendário
+    reunioes = reunioes_do_usuario(usuario, inicio, fim).prefetch_related('excecoes')
+    for r in reunioes.iterator(chunk_size=200):
+        convidados = ', '.join(c.username for c in r.convidados_lista) or 'Ninguém'
+        descricao = f'Organizador: {r.solicitante.username}\nConvidados: {convidados}'
+        movidas = [e for e in r.excecoes.all() if not e.cancelada] if r.frequencia else []
+
+        for excecao in [None] + movidas:
+            yield 'BEGIN:VEVENT\r\n'
+            yield f'UID:reuniao-{r.id}@{host}\r\n'
+            yield f'DTSTAMP:{_utc(r.atualizado_em)}\r\n'
+            if excecao is not None:
+                yield f'RECURRENCE-ID;{_data_original(r, excecao, False)}\r\n'
+                yield f'DTSTART:{_utc(excecao.data_inicio)}\r\n'
+                yield f'DTEND:{_utc(excecao.data_fim)}\r\n'
+            elif r.frequencia:
+                yield f'DTSTART;{_local(r.data_inicio)}\r\n'
+                yield f'DTEND;{_local(r.data_fim)}\r\n'
+                yield from _linhas_da_serie(r, r.fim_da_serie - (r.data_fim - r.data_inicio))
+            else:
+                yield f'DTSTART:{_utc(r.data_inicio)}\r\n'
+                yield f'DTEND:{_utc(r.data_fim)}\r\n'
+            yield _dobrar(f'SUMMARY:{_escapar(r.titulo)}')
+            yield _dobrar(f'DESCRIPTION:{_escapar(descricao)}')
+            if r.link_externo:
+                yield _dobrar(f'URL:{r.link_externo}')
+            yield 'END:VEVENT\r\n'
+
+    tarefas = tarefas_do_usuario(usuario, inicio.date(), fim.date()).prefetch_related('excecoes')
+    for t in tarefas.iterator(chunk_size=500):
+        movidas = [e for e in t.excecoes.all() if not e.cancelada] if t.frequencia else []
+
+        # Tarefa vira evento de dia inteiro no prazo (VTODO quase nenhum app mostra)
+        for excecao in [None] + movidas:
+            prazo = excecao.data_prazo if excecao is not None else t.data_prazo
+            yield 'BEGIN:VEVENT\r\n'
+            yield f'UID:tarefa-{t.id}@{host}\r\n'
+            yield f'DTSTAMP:{_utc(t.atualizado_em)}\r\n'
+            if excecao is not None:
+                yield f'RECURRENCE-ID;{_data_original(t, excecao, True)}\r\n'
+            yield f'DTSTART;VALUE=DATE:{prazo:%Y%m%d}\r\n'
+            yield f'DTEND;VALUE=DATE:{prazo + timedelta(days=1):%Y%m%d}\r\n'
+            if excecao is None and t.frequencia:
+                yield from _linhas_da_serie(t, t.fim_da_serie, dia_inteiro=True)
+            yield _dobrar(f'SUMMARY:{_escapar(("✔ " if t.concluida else "") + "Tarefa: " + t.titulo)}')
+            if t.informacoes:
+                yield _dobrar(f'DESCRIPTION:{_escapar(t.informacoes)}')
+            yield 'END:VEVENT\r\n'
+
+    yield 'END:VCALENDAR\r\n'
+
+
+def inicio_do_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
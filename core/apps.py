@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # Registra os sinais: índice de busca, eventos em tempo real (SSE), cache do painel e feed da agenda
+        # e das facetas do diretório, versões dos cards de post, os trabalhos da fila e os PRAGMAs de cada
+        # conexão com o SQLite
+        from . import agenda, banco, busca, diretorio, eventos, paginas, painel, trabalhos  # noqa: F401
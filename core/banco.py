@@ -0,0 +1,29 @@
+# core/banco.py
+# --- AJUSTES DE CADA CONEXÃO NOVA COM O SQLITE ---
+# No SQLite padrão (journal "delete") quem escreve tranca o arquivo inteiro, inclusive para leitura, e quem
+# encontra o banco trancado desiste na hora: com mensagens do chat, curtidas e avisos chegando juntos,
+# aparecia "database is locked". Cada conexão nova recebe os PRAGMAs abaixo:
+#   - journal_mode=WAL: leitores não esperam o escritor nem o contrário (continua um escritor por vez);
+#     fica gravado no arquivo do banco, os outros valem por conexão;
+#   - busy_timeout: quem encontra a trava espera até esse tanto (ms) antes de dar erro;
+#   - synchronous=NORMAL: com WAL não corrompe o banco; numa queda de energia perde no máximo os últimos commits;
+#   - mmap_size: leituras direto do arquivo mapeado na memória, sem cópia.
+# O resto (transação IMMEDIATE, PostgreSQL com conexões persistentes) está no DATABASES do settings.py.
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PRAGMAS_SQLITE = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+}
+
+
+@receiver(connection_created)
+def ajustar_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for nome, valor in PRAGMAS_SQLITE.items():
+            cursor.execute(f'PRAGMA {nome} = {valor}')
@@ -0,0 +1,248 @@
+# core/busca.py
+# --- BUSCA TEXTUAL DO FÓRUM E DO DIRETÓRIO ---
+# Índice próprio para posts e comentários, no lugar do icontains (que varre a tabela toda):
+#   - SQLite: tabela virtual FTS5 (ranking bm25)
+#   - PostgreSQL: tabela com tsvector + índice GIN (ranking ts_rank)
+# Cada documento aponta para o post "dono" (o comentário leva para o post dele).
+# O "Sobre mim" dos perfis tem um índice igual, à parte (core_busca_perfil, id do documento = id do perfil),
+# usado pelo diretório da comunidade (core/diretorio.py).
+# Os índices são mantidos pelos sinais lá embaixo e podem ser refeitos com `manage.py reindexar_busca`.
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Comentario, Perfil, Post
+
+TABELA = 'core_busca'
+TABELA_PERFIS = 'core_busca_perfil'
+
+# O id do documento é o id do objeto + o tipo nos 2 bits de baixo,
+# assim atualizar/remover é sempre pela chave primária (rowid no FTS5)
+TIPO_POST = 1
+TIPO_COMENTARIO = 2
+
+
+def _doc_id(objeto_id, tipo):
+    return objeto_id * 4 + tipo
+
+
+def disponivel():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def _termos(texto):
+    # Só letras/números: nada de operadores vindos do usuário chegando no MATCH/tsquery
+    return re.findall(r'\w+', (texto or '').lower())
+
+
+def _nome_autor(user):
+    return ' '.join(filter(None, [user.username, user.first_name, user.last_name]))
+
+
+# --- ESCRITA ---
+
+def _salvar(doc_id, post_id, conteudo, autor):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {TABELA} WHERE rowid = %s', [doc_id])
+            cursor.execute(
+                f'INSERT INTO {TABELA} (rowid, post_id, conteudo, autor) VALUES (%s, %s, %s, %s)',
+                [doc_id, post_id, conteudo, autor],
+            )
+        else:
+            cursor.execute(
+                f"""
+                INSERT INTO {TABELA} (id, post_id, documento)
+                VALUES (%s, %s, setweight(to_tsvector('portuguese', %s), 'A') || setweight(to_tsvector('portuguese', %s), 'B'))
+                ON CONFLICT (id) DO UPDATE SET post_id = EXCLUDED.post_id, documento = EXCLUDED.documento
+                """,
+                [doc_id, post_id, conteudo, autor],
+            )
+
+
+def _remover(doc_id):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {TABELA} WHERE rowid = %s', [doc_id])
+        else:
+            cursor.execute(f'DELETE FROM {TABELA} WHERE id = %s', [doc_id])
+
+
+def indexar_post(post):
+    if disponivel():
+        _salvar(_doc_id(post.id, TIPO_POST), post.id, post.conteudo, _nome_autor(post.autor))
+
+
+def indexar_comentario(comentario):
+    if disponivel():
+        _salvar(_doc_id(comentario.id, TIPO_COMENTARIO), comentario.post_id, comentario.conteudo, _nome_autor(comentario.autor))
+
+
+def _remover_perfil(perfil_id):
+    with connection.cursor() as cursor:
+        coluna = 'rowid' if connection.vendor == 'sqlite' else 'id'
+        cursor.execute(f'DELETE FROM {TABELA_PERFIS} WHERE {coluna} = %s', [perfil_id])
+
+
+def indexar_perfil(perfil):
+    if not disponivel():
+        return
+    _remover_perfil(perfil.id)
+    if not (perfil.bio or '').strip():
+        return  # sem "Sobre mim" não tem o que achar
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'INSERT INTO {TABELA_PERFIS} (rowid, bio) VALUES (%s, %s)', [perfil.id, perfil.bio])
+        else:
+            cursor.execute(
+                f"INSERT INTO {TABELA_PERFIS} (id, documento) VALUES (%s, to_tsvector('portuguese', %s))",
+                [perfil.id, perfil.bio],
+            )
+
+
+def reconstruir():
+    """Apaga e refaz os índices inteiros a partir das tabelas (INSERT ... SELECT, sem passar pelo Python)."""
+    if not disponivel():
+        return 0
+
+    nome = "u.username || ' ' || u.first_name || ' ' || u.last_name"
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABELA}')
+        for tabela, tipo, post_col in (('core_post', TIPO_POST, 'o.id'), ('core_comentario', TIPO_COMENTARIO, 'o.post_id')):
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    f"""
+                    INSERT INTO {TABELA} (rowid, post_id, conteudo, autor)
+                    SELECT o.id * 4 + {tipo}, {post_col}, o.conteudo, {nome}
+                    FROM {tabela} o JOIN auth_user u ON u.id = o.autor_id
+                    """
+                )
+            else:
+                cursor.execute(
+                    f"""
+                    INSERT INTO {TABELA} (id, post_id, documento)
+                    SELECT o.id * 4 + {tipo}, {post_col},
+                           setweight(to_tsvector('portuguese', o.conteudo), 'A') || setweight(to_tsvector('portuguese', {nome}), 'B')
+                    FROM {tabela} o JOIN auth_user u ON u.id = o.autor_id
+                    """
+                )
+
+        cursor.execute(f'DELETE FROM {TABELA_PERFIS}')
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"INSERT INTO {TABELA_PERFIS} (rowid, bio) SELECT id, bio FROM core_perfil WHERE TRIM(COALESCE(bio, '')) != ''")
+        else:
+            cursor.execute(
+                f"INSERT INTO {TABELA_PERFIS} (id, documento) SELECT id, to_tsvector('portuguese', bio) "
+                f"FROM core_perfil WHERE TRIM(COALESCE(bio, '')) != ''"
+            )
+
+        cursor.execute(f'SELECT (SELECT COUNT(*) FROM {TABELA}) + (SELECT COUNT(*) FROM {TABELA_PERFIS})')
+        return cursor.fetchone()[0]
+
+
+# --- LEITURA ---
+
+def buscar_posts(texto, tipo_autor=None, limite=20, offset=0):
+    """
+    Ids dos posts que batem com `texto` (no post ou em algum comentário dele),
+    do mais relevante para o menos relevante. `tipo_autor` filtra por Perfil.tipo do autor do post.
+    """
+    termos = _termos(texto)
+    if not termos or not disponivel():
+        return []
+
+    params = []
+    if connection.vendor == 'sqlite':
+        # Prefixo em cada termo ("mentor*"), todos obrigatórios
+        consulta = ' '.join(f'"{t}"*' for t in termos)
+        # rank do FTS5 é o bm25: quanto menor, mais relevante
+        docs = f'SELECT post_id, rank AS relevancia FROM {TABELA} WHERE {TABELA} MATCH %s'
+        params.append(consulta)
+    else:
+        consulta = ' & '.join(f'{t}:*' for t in termos)
+        docs = (
+            f"SELECT post_id, -ts_rank(documento, to_tsquery('portuguese', %s)) AS relevancia "
+            f"FROM {TABELA} WHERE documento @@ to_tsquery('portuguese', %s)"
+        )
+        params.extend([consulta, consulta])
+
+    join_perfil = ''
+    if tipo_autor:
+        join_perfil = 'JOIN core_perfil pf ON pf.user_id = p.autor_id AND pf.tipo = %s'
+        params.append(tipo_autor)
+
+    sql = f"""
+        SELECT b.post_id
+        FROM ({docs}) b
+        JOIN core_post p ON p.id = b.post_id
+        {join_perfil}
+        GROUP BY b.post_id
+        ORDER BY MIN(b.relevancia), MAX(p.data_criacao) DESC
+        LIMIT %s OFFSET %s
+    """
+    params.extend([limite, offset])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+def filtrar_perfis(queryset, texto):
+    """Restringe um queryset de Perfil aos que têm todos os termos de `texto` no "Sobre mim" (prefixo, sem acento)."""
+    termos = _termos(texto)
+    if not termos:
+        return queryset
+    if not disponivel():
+        for termo in termos:
+            queryset = queryset.filter(bio__icontains=termo)
+        return queryset
+
+    if connection.vendor == 'sqlite':
+        sql = f'SELECT rowid FROM {TABELA_PERFIS} WHERE {TABELA_PERFIS} MATCH %s'
+        consulta = ' '.join(f'"{t}"*' for t in termos)
+    else:
+        sql = f"SELECT id FROM {TABELA_PERFIS} WHERE documento @@ to_tsquery('portuguese', %s)"
+        consulta = ' & '.join(f'{t}:*' for t in termos)
+    return queryset.filter(id__in=RawSQL(sql, [consulta]))
+
+
+# --- SINAIS: MANTÉM O ÍNDICE EM DIA ---
+
+@receiver(post_save, sender=Post)
+def indexar_post_salvo(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indexar_post(instance)
+
+
+@receiver(post_save, sender=Comentario)
+def indexar_comentario_salvo(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indexar_comentario(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remover_post_do_indice(sender, instance, **kwargs):
+    if disponivel():
+        _remover(_doc_id(instance.id, TIPO_POST))
+
+
+@receiver(post_delete, sender=Comentario)
+def remover_comentario_do_indice(sender, instance, **kwargs):
+    if disponivel():
+        _remover(_doc_id(instance.id, TIPO_COMENTARIO))
+
+
+@receiver(post_save, sender=Perfil)
+def indexar_perfil_salvo(sender, instance, created=False, raw=False, **kwargs):
+    # Perfil novo (junto com o usuário) nasce sem "Sobre mim": nada a indexar
+    if not raw and not (created and not instance.bio):
+        indexar_perfil(instance)
+
+
+@receiver(post_delete, sender=Perfil)
+def remover_perfil_do_indice(sender, instance, **kwargs):
+    if disponivel():
+        _remover_perfil(instance.id)
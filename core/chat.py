@@ -0,0 +1,131 @@
+# core/chat.py
+# --- REGRAS DO CHAT ---
+# Toda mensagem nova e toda leitura passam por aqui, porque além da Mensagem
+# precisamos manter o resumo da Conversa (caixa de entrada) na mesma transação.
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+from django.utils.formats import date_format
+
+from . import painel, tempo_real
+from .models import Conversa, Mensagem
+
+TAMANHO_TRECHO = 120
+
+
+def dados_mensagem(msg):
+    # Formato usado pela API do histórico e pelos eventos do WebSocket
+    data = timezone.localtime(msg.data_envio)
+    return {
+        'id': msg.id,
+        'remetente_id': msg.remetente_id,
+        'conteudo': msg.conteudo,
+        'data_envio': data.isoformat(),
+        'dia': date_format(data, 'd \\d\\e F'),
+        'hora': date_format(data, 'H:i'),
+        'lido': msg.lido,
+    }
+
+
+def mensagem_json(msg, usuario):
+    return {**dados_mensagem(msg), 'minha': msg.remetente_id == usuario.id}
+
+
+def _trecho(conteudo):
+    conteudo = ' '.join(conteudo.split())
+    if len(conteudo) <= TAMANHO_TRECHO:
+        return conteudo
+    return conteudo[:TAMANHO_TRECHO - 1] + '…'
+
+
+def enviar_mensagem(remetente, destinatario, conteudo):
+    a, b = Conversa.par(remetente.id, destinatario.id)
+    campo_nao_lidas = 'nao_lidas_a' if destinatario.id == a else 'nao_lidas_b'
+
+    with transaction.atomic():
+        msg = Mensagem.objects.create(remetente=remetente, destinatario=destinatario, conteudo=conteudo)
+
+        conversa, _ = Conversa.objects.get_or_create(usuario_a_id=a, usuario_b_id=b)
+        Conversa.objects.filter(pk=conversa.pk).update(**{campo_nao_lidas: F(campo_nao_lidas) + 1})
+        # Só avança a "última mensagem" (se outra mais nova já chegou por outra requisição, mantém ela)
+        Conversa.objects.filter(
+            Q(ultima_mensagem__isnull=True) | Q(ultima_mensagem_id__lt=msg.id), pk=conversa.pk
+        ).update(ultima_mensagem=msg, ultima_data=msg.data_envio, ultimo_trecho=_trecho(conteudo))
+
+        tempo_real.publicar_apos_commit(
+            tempo_real.canal_conversa(a, b), {'tipo': 'mensagem', 'mensagem': dados_mensagem(msg)}
+        )
+        # Contador de não lidas do destinatário (SSE, em qualquer página)
+        tempo_real.publicar_apos_commit(tempo_real.canal_usuario(destinatario.id), {'tipo': 'mensagens'})
+
+    return msg
+
+
+def marcar_como_lidas(leitor, outro_usuario):
+    """Marca como lidas as mensagens que `outro_usuario` mandou para `leitor`. Devolve quantas mudaram."""
+    a, b = Conversa.par(leitor.id, outro_usuario.id)
+    campo_nao_lidas = 'nao_lidas_a' if leitor.id == a else 'nao_lidas_b'
+
+    nao_lidas = Mensagem.objects.filter(remetente=outro_usuario, destinatario=leitor, lido=False)
+    with transaction.atomic():
+        ultima = nao_lidas.aggregate(maior=Max('id'))['maior']
+        if ultima is None:
+            return 0
+        total = nao_lidas.filter(id__lte=ultima).update(lido=True)
+        Conversa.objects.filter(usuario_a_id=a, usuario_b_id=b).update(
+            **{campo_nao_lidas: Greatest(F(campo_nao_lidas) - total, 0)}
+        )
+
+        # Confirmação de leitura para quem está com a conversa aberta (✓✓)
+        tempo_real.publicar_apos_commit(
+            tempo_real.canal_conversa(a, b), {'tipo': 'lidas', 'leitor_id': leitor.id, 'lidas_ate': ultima}
+        )
+        tempo_real.publicar_apos_commit(tempo_real.canal_usuario(leitor.id), {'tipo': 'mensagens'})
+        # update() não dispara sinal: o painel do leitor mostra o total de não lidas
+        painel.invalidar(leitor.id)
+    return total
+
+
+def reconstruir_conversas(tamanho_lote=1000):
+    """Refaz a tabela Conversa inteira a partir das mensagens (comando reconstruir_conversas)."""
+    pares = (
+        Mensagem.objects.order_by()
+        .annotate(a=Least('remetente_id', 'destinatario_id'), b=Greatest('remetente_id', 'destinatario_id'))
+        .values('a', 'b')
+        .annotate(
+            ultima=Max('id'),
+            nao_lidas_a=Count('id', filter=Q(lido=False, destinatario_id=F('a'))),
+            nao_lidas_b=Count('id', filter=Q(lido=False, destinatario_id=F('b'))),
+        )
+    )
+
+    total = 0
+    with transaction.atomic():
+        Conversa.objects.all().delete()
+        lote = []
+        for par in pares.iterator():
+            lote.append(par)
+            if len(lote) >= tamanho_lote:
+                total += _gravar_lote(lote)
+                lote = []
+        if lote:
+            total += _gravar_lote(lote)
+    return total
+
+
+def _gravar_lote(pares):
+    ultimas = Mensagem.objects.only('id', 'data_envio', 'conteudo').in_bulk([p['ultima'] for p in pares])
+    Conversa.objects.bulk_create([
+        Conversa(
+            usuario_a_id=p['a'],
+            usuario_b_id=p['b'],
+            ultima_mensagem_id=p['ultima'],
+            ultima_data=ultimas[p['ultima']].data_envio,
+            ultimo_trecho=_trecho(ultimas[p['ultima']].conteudo),
+            nao_lidas_a=p['nao_lidas_a'],
+            nao_lidas_b=p['nao_lidas_b'],
+        )
+        for p in pares
+    ])
+    return len(pares)
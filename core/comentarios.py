@@ -0,0 +1,106 @@
+# core/comentarios.py
+# --- COMENTÁRIOS DO POST EM ÁRVORE ---
+# Os comentários formam fios: um comentário principal (sem parent) e as respostas, em qualquer profundidade.
+# Cada comentário guarda a raiz do fio e o caminho (ids desde a raiz, ver Comentario em core/models.py),
+# então a página do post não sobe a árvore pai por pai nem faz uma consulta por comentário:
+#   1. uma página de comentários principais (keyset em data_criacao, id; índice comentario_principais_idx);
+#   2. as primeiras RESPOSTAS_POR_FIO respostas de todos esses fios numa consulta só (ROW_NUMBER por raiz,
+#      em ordem de caminho; índice comentario_fio_idx), com o total de cada fio;
+#   3. a árvore é montada aqui em Python (comentario.filhos).
+# O resto de um fio grande vem pelo "Ver mais respostas" (respostas_do_fio), RESPOSTAS_POR_PAGINA de cada vez.
+from collections import defaultdict
+
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import Comentario
+
+COMENTARIOS_POR_PAGINA = 20
+RESPOSTAS_POR_FIO = 10  # respostas de cada fio que já vêm com a página
+RESPOSTAS_POR_PAGINA = 50  # "Ver mais respostas"
+
+
+def _com_autor(queryset):
+    # Nome, foto e selo de mentor de cada comentário vêm no mesmo JOIN
+    return queryset.select_related('autor__perfil')
+
+
+def principais(post_id, antes=None, limite=COMENTARIOS_POR_PAGINA):
+    """
+    Uma página de comentários principais do post, o mais novo primeiro.
+    antes: (data_criacao, id) do último comentário da página anterior. Devolve (comentarios, tem_mais).
+    """
+    qs = _com_autor(Comentario.objects.filter(post_id=post_id, parent=None)).order_by('-data_criacao', '-id')
+    if antes:
+        data, pk = antes
+        qs = qs.filter(Q(data_criacao__lt=data) | Q(data_criacao=data, id__lt=pk))
+    pagina = list(qs[:limite + 1])
+    return pagina[:limite], len(pagina) > limite
+
+
+def respostas_dos_fios(raiz_ids, limite=RESPOSTAS_POR_FIO):
+    """As primeiras `limite` respostas de cada fio, em ordem de caminho, cada uma com o total do fio (total_do_fio)."""
+    return _com_autor(
+        Comentario.objects.filter(raiz_id__in=raiz_ids).annotate(
+            ordem=Window(RowNumber(), partition_by=F('raiz_id'), order_by=F('caminho').asc()),
+            total_do_fio=Window(Count('id'), partition_by=F('raiz_id')),
+        ).filter(ordem__lte=limite)
+    ).order_by('raiz_id', 'caminho')
+
+
+def respostas_do_fio(raiz_id, depois='', limite=RESPOSTAS_POR_PAGINA):
+    """Próximas respostas do fio depois do caminho `depois`. Devolve (respostas, tem_mais)."""
+    qs = _com_autor(Comentario.objects.filter(raiz_id=raiz_id)).order_by('caminho')
+    if depois:
+        qs = qs.filter(caminho__gt=depois)
+    respostas = list(qs[:limite + 1])
+    return respostas[:limite], len(respostas) > limite
+
+
+def montar(comentarios):
+    """
+    Pendura cada comentário no pai dele (comentario.filhos), se o pai estiver na lista.
+    `comentarios` em ordem de caminho (o pai sempre vem antes). Devolve os que ficaram no topo.
+    """
+    por_id = {}
+    topo = []
+    for comentario in comentarios:
+        comentario.filhos = []
+        por_id[comentario.id] = comentario
+        pai = por_id.get(comentario.parent_id)
+        (pai.filhos if pai else topo).append(comentario)
+    return topo
+
+
+def fios(post_id, antes=None):
+    """
+    Uma página de fios do post (duas consultas). Devolve (principais, tem_mais); cada principal vem com
+    .filhos (a árvore), .restantes (respostas do fio que ainda não vieram) e .depois (o caminho a partir
+    do qual pedir as restantes, ou '').
+    """
+    pagina, tem_mais = principais(post_id, antes)
+    respostas = defaultdict(list)
+    if pagina:
+        for resposta in respostas_dos_fios([c.id for c in pagina]):
+            respostas[resposta.raiz_id].append(resposta)
+
+    for comentario in pagina:
+        do_fio = respostas[comentario.id]
+        comentario.filhos = montar(do_fio)
+        comentario.restantes = (do_fio[0].total_do_fio - len(do_fio)) if do_fio else 0
+        comentario.depois = do_fio[-1].caminho if comentario.restantes else ''
+    return pagina, tem_mais
+
+
+def blocos(respostas):
+    """
+    Continuação de um fio (respostas_do_fio) montada em árvore e agrupada por pai já exibido na página:
+    [(parent_id, [respostas...]), ...] na ordem em que aparecem.
+    """
+    grupos = []
+    for resposta in montar(respostas):
+        if grupos and grupos[-1][0] == resposta.parent_id:
+            grupos[-1][1].append(resposta)
+        else:
+            grupos.append((resposta.parent_id, [resposta]))
+    return grupos
@@ -0,0 +1,149 @@
+# core/diretorio.py
+# --- DIRETÓRIO DA COMUNIDADE (MENTORES E ESTUDANTES) ---
+# A página da comunidade e a API /api/diretorio/ listam perfis, nunca todos de uma vez:
+#   - filtros por igualdade (tipo, cidade, profissão, empresa, formação), cada um com índice (campo, tipo, id);
+#   - busca no "Sobre mim" pelo índice textual (core/busca.py);
+#   - páginas de POR_PAGINA em ordem de id, com select_related('user') (nada de consulta por card);
+#   - as facetas (valores mais comuns de cada filtro e quantos perfis têm cada um) são GROUP BY na tabela
+#     toda, então ficam no cache e são apagadas quando algum perfil muda.
+# Aqui também fica a busca por começo do nome que alimenta os seletores de usuário dos formulários.
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from . import busca
+from .models import Perfil
+
+TIPOS = [tipo for tipo, _ in Perfil.TIPO_USUARIO_CHOICES]
+FILTROS = ['cidade', 'profissao', 'empresa', 'formacao']
+
+POR_PAGINA = 24
+MAX_POR_PAGINA = 100
+MAX_VALORES_FACETA = 30
+
+CHAVE_FACETAS = 'diretorio:facetas'
+TEMPO_CACHE_FACETAS = 600  # segundos (o sinal lá embaixo apaga antes se algum perfil mudar)
+
+
+def ler_filtros(params):
+    """Os filtros de uma query string (request.GET), já sem espaços; os vazios ficam de fora."""
+    filtros = {campo: params.get(campo, '').strip() for campo in ['tipo', 'q', *FILTROS]}
+    return {campo: valor for campo, valor in filtros.items() if valor}
+
+
+def perfis(tipo=None, q=None, **filtros):
+    """Perfis de usuários ativos que batem com os filtros, em ordem de id (estável para paginar)."""
+    qs = Perfil.objects.filter(user__is_active=True).select_related('user')
+    if tipo:
+        qs = qs.filter(tipo=tipo)
+    for campo in FILTROS:
+        if filtros.get(campo):
+            qs = qs.filter(**{campo: filtros[campo]})
+    if q:
+        qs = busca.filtrar_perfis(qs, q)
+    return qs.order_by('id')
+
+
+def pagina(queryset, numero, por_pagina=POR_PAGINA):
+    """Página `numero` (texto da query string; inválido ou fora do intervalo vira a primeira/última)."""
+    return Paginator(queryset, min(por_pagina, MAX_POR_PAGINA)).get_page(numero)
+
+
+def facetas():
+    """
+    {'tipo': {'Mentor': n, 'Estudante': m}, 'cidade': [{'valor': 'Recife', 'total': 12}, ...], ...}
+    Contam o diretório inteiro (não só o resultado filtrado), com os MAX_VALORES_FACETA mais comuns de cada campo.
+    """
+    dados = cache.get(CHAVE_FACETAS)
+    if dados is not None:
+        return dados
+
+    ativos = Perfil.objects.filter(user__is_active=True).order_by()
+    dados = {'tipo': dict(ativos.values_list('tipo').annotate(total=Count('id')))}
+    for campo in FILTROS:
+        contagem = (
+            ativos.exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''})
+            .values_list(campo).annotate(total=Count('id')).order_by('-total', campo)[:MAX_VALORES_FACETA]
+        )
+        dados[campo] = [{'valor': valor, 'total': total} for valor, total in contagem]
+    cache.set(CHAVE_FACETAS, dados, TEMPO_CACHE_FACETAS)
+    return dados
+
+
+def perfil_json(perfil):
+    return {
+        'username': perfil.user.username,
+        'nome': perfil.user.get_full_name() or perfil.user.username,
+        'tipo': perfil.tipo,
+        'foto': perfil.foto_media,
+        'profissao': perfil.profissao or '',
+        'empresa': perfil.empresa or '',
+        'cidade': perfil.cidade or '',
+        'formacao': perfil.formacao or '',
+        'bio': perfil.bio or '',
+        'url': reverse('perfil_publico', args=[perfil.user.username]),
+    }
+
+
+# --- BUSCA DE USUÁRIOS PELO COMEÇO DO NOME (AUTOCOMPLETAR) ---
+# Os seletores de usuário (convidados da reunião, aluno da tarefa) não mandam a lista de todo mundo no HTML:
+# perguntam para /api/usuarios/ enquanto a pessoa digita. Cada palavra digitada tem que ser começo do
+# username, do nome ou do sobrenome, sem diferenciar maiúsculas. "Começa com" vira um intervalo em
+# LOWER(coluna) (>= 'an' e < 'ao'), que usa os índices usuario_*_lower_idx (migração 0018).
+
+COLUNAS_NOME = ['username', 'first_name', 'last_name']
+MAX_SUGESTOES = 10
+MAX_PALAVRAS = 3
+
+
+def _comeca_com(coluna, prefixo):
+    fim = prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+    return Q(**{f'{coluna}_lower__gte': prefixo, f'{coluna}_lower__lt': fim})
+
+
+def usuarios_por_prefixo(texto, tipo=None, excluir=None, limite=MAX_SUGESTOES):
+    """Usuários ativos cujo nome começa com o que foi digitado, em ordem de username."""
+    palavras = (texto or '').lower().split()[:MAX_PALAVRAS]
+    if not palavras:
+        return User.objects.none()
+
+    qs = User.objects.filter(is_active=True).alias(**{f'{c}_lower': Lower(c) for c in COLUNAS_NOME})
+    for palavra in palavras:
+        qs = qs.filter(reduce(or_, [_comeca_com(coluna, palavra) for coluna in COLUNAS_NOME]))
+    if tipo:
+        qs = qs.filter(perfil__tipo=tipo)
+    if excluir:
+        qs = qs.exclude(pk=excluir)
+    return qs.select_related('perfil').order_by('username')[:limite]
+
+
+def rotulo(usuario):
+    """Como o usuário aparece nos seletores: "Ana Souza (@ana)", ou só o username."""
+    nome = usuario.get_full_name()
+    return f'{nome} (@{usuario.username})' if nome else usuario.username
+
+
+def usuario_json(usuario):
+    return {
+        'id': usuario.id,
+        'username': usuario.username,
+        'rotulo': rotulo(usuario),
+        'tipo': usuario.perfil.tipo,
+        'foto': usuario.perfil.foto_pequena,
+    }
+
+
+# --- SINAIS: PERFIL MUDOU, AS FACETAS SAEM DO CACHE ---
+
+@receiver([post_save, post_delete], sender=Perfil)
+def perfil_alterado(sender, instance, **kwargs):
+    transaction.on_commit(lambda: cache.delete(CHAVE_FACETAS))
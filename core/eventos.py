@@ -0,0 +1,177 @@
+# core/eventos.py
+# --- EVENTOS DO USUÁRIO VIA SERVER-SENT EVENTS (SSE) ---
+# Um fluxo por aba aberta em /eventos/, alimentado pelo pub/sub de core/tempo_real.py:
+#   estado       -> contadores iniciais (ao conectar e quando eventos foram descartados)
+#   notificacao  -> nova Notificacao para mim (+ total de avisos não lidos)
+#   mensagens    -> mudou meu total de mensagens não lidas
+#   comentario   -> alguém comentou num post meu
+# Cada evento custa no máximo uma consulta pequena (índices parciais de não lidas).
+#
+# A view é assíncrona: servida pelo ASGI, uma aba parada não segura thread nenhuma.
+# Pelo WSGI o gerador infinito seguraria uma thread por aba: lá a view responde 204 (o EventSource
+# para de tentar) e as páginas nem abrem o fluxo (settings.SERVIDOR_ASGI, tempo_real_ativo abaixo).
+# Mesmo assim há limite de conexões (total e por usuário) e a fila de cada conexão é limitada.
+import json
+import threading
+
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import presenca, tempo_real
+from .models import Comentario, Mensagem, Notificacao
+
+INTERVALO_PING = 20  # segundos sem evento até mandar um comentário ": ping" (mantém proxies abertos)
+TAMANHO_FILA = 50
+
+
+def _limite_total():
+    return getattr(settings, 'SSE_MAX_CONEXOES', 500)
+
+
+def _limite_por_usuario():
+    return getattr(settings, 'SSE_MAX_POR_USUARIO', 5)
+
+
+def tempo_real_ativo(request):
+    # Context processor (settings.TEMPLATES): o base.html só liga o eventos.js quando servido pelo ASGI
+    return {'tempo_real_ativo': getattr(settings, 'SERVIDOR_ASGI', False)}
+
+
+# --- LIMITE DE CONEXÕES (por processo) ---
+_conexoes = {}
+_conexoes_total = 0
+_conexoes_lock = threading.Lock()
+
+
+def reservar_conexao(user_id):
+    global _conexoes_total
+    with _conexoes_lock:
+        if _conexoes_total >= _limite_total() or _conexoes.get(user_id, 0) >= _limite_por_usuario():
+            return False
+        _conexoes[user_id] = _conexoes.get(user_id, 0) + 1
+        _conexoes_total += 1
+        return True
+
+
+def liberar_conexao(user_id):
+    global _conexoes_total
+    with _conexoes_lock:
+        restantes = _conexoes.get(user_id, 0) - 1
+        if restantes > 0:
+            _conexoes[user_id] = restantes
+        else:
+            _conexoes.pop(user_id, None)
+        _conexoes_total = max(_conexoes_total - 1, 0)
+
+
+# --- CONSULTAS (uma por evento) ---
+
+@tempo_real.com_banco
+def _total_mensagens_nao_lidas(user_id):
+    return Mensagem.objects.filter(destinatario_id=user_id, lido=False).count()
+
+
+@tempo_real.com_banco
+def _total_avisos_nao_lidos(user_id):
+    return Notificacao.objects.filter(destinatario_id=user_id, lida=False).count()
+
+
+# Presença marcada pelo ping: a aba parada não faz request, então é o próprio fluxo que grava os pendentes
+_descarregar_presenca = tempo_real.com_banco(presenca.descarregar)
+
+
+async def _estado(user_id):
+    return {
+        'mensagens': await _total_mensagens_nao_lidas(user_id),
+        'avisos': await _total_avisos_nao_lidos(user_id),
+    }
+
+
+def _formatar(tipo, dados):
+    return f'event: {tipo}\ndata: {json.dumps(dados)}\n\n'
+
+
+def _drenar(assinatura, primeiro):
+    # Junta o que já está na fila: vários "mensagens" seguidos viram uma consulta só
+    eventos = [primeiro]
+    while not assinatura.fila.empty():
+        eventos.append(assinatura.fila.get_nowait())
+
+    vistos = set()
+    unicos = []
+    for evento in eventos:
+        if evento['tipo'] == 'mensagens':
+            if 'mensagens' in vistos:
+                continue
+            vistos.add('mensagens')
+        unicos.append(evento)
+    return unicos
+
+
+async def fluxo_do_usuario(user_id):
+    """Gerador assíncrono com o texto SSE. Libera a vaga de conexão ao terminar."""
+    assinatura = tempo_real.assinar(tempo_real.canal_usuario(user_id), tamanho_fila=TAMANHO_FILA)
+    try:
+        yield 'retry: 5000\n\n'
+        yield _formatar('estado', await _estado(user_id))
+
+        while True:
+            evento = await assinatura.proximo(timeout=INTERVALO_PING)
+            if evento is None:
+                presenca.marcar(user_id)  # aba aberta = usuário online, mesmo sem navegar
+                if presenca.hora_de_descarregar():
+                    await _descarregar_presenca()
+                yield ': ping\n\n'
+                continue
+
+            if assinatura.descartados:
+                # O cliente ficou para trás e perdemos eventos: manda os contadores atualizados e segue
+                assinatura.descartados = 0
+                while not assinatura.fila.empty():
+                    assinatura.fila.get_nowait()
+                yield _formatar('estado', await _estado(user_id))
+                continue
+
+            for evento in _drenar(assinatura, evento):
+                if evento['tipo'] == 'mensagens':
+                    yield _formatar('mensagens', {'mensagens': await _total_mensagens_nao_lidas(user_id)})
+                elif evento['tipo'] == 'notificacao':
+                    dados = {**evento['notificacao'], 'avisos': await _total_avisos_nao_lidos(user_id)}
+                    yield _formatar('notificacao', dados)
+                elif evento['tipo'] == 'comentario':
+                    yield _formatar('comentario', evento['comentario'])
+    finally:
+        assinatura.cancelar()
+        liberar_conexao(user_id)
+
+
+# --- PUBLICAÇÃO ---
+
+def avisar_mensagens(user_id):
+    tempo_real.publicar_apos_commit(tempo_real.canal_usuario(user_id), {'tipo': 'mensagens'})
+
+
+def avisar_notificacao(notificacao):
+    tempo_real.publicar_apos_commit(tempo_real.canal_usuario(notificacao.destinatario_id), {
+        'tipo': 'notificacao',
+        'notificacao': {'id': notificacao.id, 'mensagem': notificacao.mensagem, 'link': notificacao.link},
+    })
+
+
+@receiver(post_save, sender=Notificacao)
+def notificacao_criada(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        avisar_notificacao(instance)
+
+
+@receiver(post_save, sender=Comentario)
+def comentario_criado(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    autor_do_post = instance.post.autor_id
+    if autor_do_post != instance.autor_id:
+        tempo_real.publicar_apos_commit(tempo_real.canal_usuario(autor_do_post), {
+            'tipo': 'comentario',
+            'comentario': {'id': instance.id, 'post_id': instance.post_id, 'conteudo': instance.conteudo[:120]},
+        })
@@ -0,0 +1,144 @@
+# core/fila.py
+# --- FILA DE TRABALHOS EM SEGUNDO PLANO ---
+# O que é pesado (imagens, avisos para muita gente, e-mails) não roda dentro da requisição:
+# a view grava um Trabalho e um worker (python manage.py rodar_fila) executa depois.
+# A fila é a própria tabela do banco, sem Redis/RabbitMQ, e funciona em SQLite e Postgres.
+#
+#   - enfileirar() grava o trabalho na mesma transação da view: deu rollback, o trabalho some junto;
+#   - o worker "pega" um trabalho com um UPDATE condicional (estado=pendente): se dois workers
+#     tentarem o mesmo, só um UPDATE altera a linha e o outro procura o próximo;
+#   - falhou: volta para pendente com espera crescente (30s, 1min, 2min... até 1h);
+#     esgotou as tentativas, fica como "falhou" com o traceback (dá para ver e reenviar no admin);
+#   - worker que morreu no meio: depois de TEMPO_MAXIMO o trabalho volta para a fila.
+#
+# Os trabalhos em si ficam em core/trabalhos.py. Como o trabalho pode rodar de novo (nova tentativa,
+# worker que morreu), eles precisam aguentar rodar duas vezes.
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Trabalho
+
+logger = logging.getLogger(__name__)
+
+ESPERA_INICIAL = timedelta(seconds=30)
+ESPERA_MAXIMA = timedelta(hours=1)
+TEMPO_MAXIMO = timedelta(minutes=15)  # executando há mais que isso = o worker morreu
+GUARDAR_FEITOS = timedelta(days=7)
+
+TRABALHOS = {}  # nome -> função
+
+
+def trabalho(nome):
+    """Registra a função como trabalho da fila: @fila.trabalho('imagens.foto')."""
+    def registrar(funcao):
+        TRABALHOS[nome] = funcao
+        return funcao
+    return registrar
+
+
+def enfileirar(nome, /, atraso=None, max_tentativas=5, no_processo=False, **dados):
+    """
+    Agenda o trabalho `nome` com os argumentos `dados` (precisam caber em JSON).
+    Com FILA_SINCRONA (testes, desenvolvimento sem worker) roda na hora, depois do commit.
+    no_processo=True: roda neste processo depois do commit, mesmo com worker (o trabalho precisa de algo
+    que só existe aqui, ver notificacoes.gravar_no_processo). O worker só pega se não deu: este processo
+    morreu antes (por isso a espera de ESPERA_INICIAL) ou a execução falhou e foi para nova tentativa.
+    """
+    if nome not in TRABALHOS:
+        raise KeyError(f'Trabalho não registrado: {nome}')
+    if no_processo and atraso is None:
+        atraso = ESPERA_INICIAL
+    item = Trabalho.objects.create(
+        tipo=nome,
+        dados=dados,
+        max_tentativas=max_tentativas,
+        executar_em=timezone.now() + (atraso or timedelta()),
+    )
+    if no_processo or getattr(settings, 'FILA_SINCRONA', False):
+        transaction.on_commit(lambda: _rodar_na_hora(item))
+    return item
+
+
+def _rodar_na_hora(item):
+    if _marcar(item.pk, 'sincrono'):
+        item.refresh_from_db()
+        executar(item)
+
+
+def _marcar(pk, worker):
+    # O "pegar" da fila: só um worker consegue trocar pendente -> executando
+    return Trabalho.objects.filter(pk=pk, estado=Trabalho.PENDENTE).update(
+        estado=Trabalho.EXECUTANDO,
+        worker=worker,
+        iniciado_em=timezone.now(),
+        tentativas=F('tentativas') + 1,
+    )
+
+
+def pegar(worker, disputas=5):
+    """Marca o próximo trabalho pendente como executando por `worker` e devolve ele (None se a fila está vazia)."""
+    for _ in range(disputas):
+        pk = (
+            Trabalho.objects.filter(estado=Trabalho.PENDENTE, executar_em__lte=timezone.now())
+            .order_by('executar_em', 'id').values_list('pk', flat=True).first()
+        )
+        if pk is None:
+            return None
+        if _marcar(pk, worker):
+            return Trabalho.objects.get(pk=pk)
+        # Outro worker pegou antes: tenta o próximo
+    return None
+
+
+def _espera(tentativas):
+    return min(ESPERA_INICIAL * 2 ** (tentativas - 1), ESPERA_MAXIMA)
+
+
+def executar(item):
+    """Roda um trabalho já marcado como executando e grava o resultado. Devolve True se deu certo."""
+    funcao = TRABALHOS.get(item.tipo)
+    try:
+        if funcao is None:
+            raise KeyError(f'Trabalho não registrado: {item.tipo}')
+        with transaction.atomic():
+            funcao(**item.dados)
+    except Exception:
+        item.erro = traceback.format_exc()
+        if item.tentativas >= item.max_tentativas:
+            item.estado = Trabalho.FALHOU
+            logger.error('Trabalho %s falhou de vez:\n%s', item, item.erro)
+        else:
+            item.estado = Trabalho.PENDENTE
+            item.executar_em = timezone.now() + _espera(item.tentativas)
+            logger.warning('Trabalho %s falhou (tentativa %s), tenta de novo em %s', item, item.tentativas, item.executar_em)
+        item.save(update_fields=['estado', 'erro', 'executar_em'])
+        return False
+
+    item.estado = Trabalho.FEITO
+    item.concluido_em = timezone.now()
+    item.save(update_fields=['estado', 'concluido_em'])
+    return True
+
+
+def recuperar_travados():
+    """Devolve para a fila o que está "executando" há mais de TEMPO_MAXIMO (o worker morreu no meio)."""
+    return Trabalho.objects.filter(
+        estado=Trabalho.EXECUTANDO, iniciado_em__lt=timezone.now() - TEMPO_MAXIMO,
+    ).update(estado=Trabalho.PENDENTE, executar_em=timezone.now())
+
+
+def limpar():
+    """Apaga os trabalhos feitos há mais de GUARDAR_FEITOS (os que falharam ficam até alguém olhar)."""
+    return Trabalho.objects.filter(estado=Trabalho.FEITO, concluido_em__lt=timezone.now() - GUARDAR_FEITOS).delete()[0]
+
+
+def resumo():
+    """{estado: quantidade} (rodar_fila --status)."""
+    contagem = dict(Trabalho.objects.order_by().values_list('estado').annotate(n=Count('*')))
+    return {estado: contagem.get(estado, 0) for estado, _ in Trabalho.ESTADOS}
@@ -1,40 +1,146 @@
+from datetime import timedelta
+
 from django import forms
+from django.db.models import Count
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.formats import date_format
 from .models import Reuniao, Tarefa
 from django.contrib.auth.models import User
 from .models import Perfil, Reuniao, Tarefa # Adicione Perfil aqui
 from .models import Post, Comentario
+from . import agenda, diretorio, recorrencia, turmas
+
+
+# Widgets e validação dos campos de repetição (iguais em reunião e tarefa)
+WIDGETS_REPETICAO = {
+    'repetir_ate': forms.DateInput(attrs={'type': 'date'}, format='%Y-%m-%d'),
+    'repeticoes': forms.NumberInput(attrs={'min': 2, 'max': recorrencia.MAX_REPETICOES, 'placeholder': 'Quantas vezes'}),
+}
+
+
+def limpar_repeticao(form, dados, primeira_data):
+    if not dados.get('frequencia'):
+        # Não repete: ignora o que veio nos outros campos
+        dados['repetir_ate'] = dados['repeticoes'] = None
+        return
+    if dados.get('repetir_ate') and primeira_data and dados['repetir_ate'] < primeira_data:
+        form.add_error('repetir_ate', 'A repetição precisa terminar depois da primeira data.')
+    if dados.get('repeticoes') is not None and not 2 <= dados['repeticoes'] <= recorrencia.MAX_REPETICOES:
+        form.add_error('repeticoes', f'Entre 2 e {recorrencia.MAX_REPETICOES} vezes.')
+
+# --- SELETORES DE USUÁRIO COM AUTOCOMPLETAR ---
+# Um <select>/checkbox com todos os usuários da plataforma põe a tabela inteira no HTML.
+# Estes widgets só desenham as opções já escolhidas (valor inicial ou o que veio no POST) e o
+# static/js/autocompletar.js busca o resto em /api/usuarios/ enquanto a pessoa digita.
+# A validação do ModelChoiceField já consulta só os ids enviados.
+class AutocompletarUsuariosMixin:
+
+    class Media:
+        js = ['js/autocompletar.js']
+
+    def __init__(self, attrs=None, tipo=None):
+        super().__init__(attrs)
+        self.tipo = tipo  # só Mentor/Estudante nas sugestões
+
+    def get_context(self, name, value, attrs):
+        contexto = super().get_context(name, value, attrs)
+        contexto['widget']['attrs']['data-autocompletar'] = reverse('api_usuarios')
+        if self.tipo:
+            contexto['widget']['attrs']['data-tipo'] = self.tipo
+        return contexto
+
+    def optgroups(self, name, value, attrs=None):
+        ids = [v for v in value if str(v).isdigit()]
+        opcoes = []
+        if not self.allow_multiple_selected:
+            opcoes.append(self.create_option(name, '', self.choices.field.empty_label or '', not ids, 0))
+        if ids:
+            for usuario in self.choices.queryset.filter(pk__in=ids).order_by('username'):
+                opcoes.append(self.create_option(name, usuario.pk, diretorio.rotulo(usuario), True, len(opcoes)))
+        return [(None, opcoes, 0)]
+
+
+class AutocompletarUsuarios(AutocompletarUsuariosMixin, forms.SelectMultiple):
+    pass
+
+
+class AutocompletarUsuario(AutocompletarUsuariosMixin, forms.Select):
+    pass
+
 
 # Formulário para criar Reunião
 class ReuniaoForm(forms.ModelForm):
+    # Convidados não são mais um campo do modelo (ficam em ParticipanteReuniao):
+    # a view grava com reuniao.definir_convidados(form.cleaned_data['convidados'])
+    convidados = forms.ModelMultipleChoiceField(
+        queryset=User.objects.all(),
+        # Campo de busca por nome (a lista de todos os usuários não vai para a página)
+        widget=AutocompletarUsuarios(),
+    )
+
+    ignorar_conflitos = forms.BooleanField(required=False, label='Agendar mesmo com conflito de horário')
+
     class Meta:
         model = Reuniao
-        # MUDANÇA AQUI: 'convidados' no plural
-        fields = ['titulo', 'convidados', 'data_inicio', 'link_externo']
+        fields = ['titulo', 'convidados', 'data_inicio', 'data_fim', 'link_externo', 'frequencia', 'repetir_ate', 'repeticoes']
         widgets = {
             'data_inicio': forms.DateTimeInput(attrs={'type': 'datetime-local'}, format='%Y-%m-%dT%H:%M'),
-            # Isso transforma a lista em caixinhas de marcar (Checkboxes)
-            'convidados': forms.CheckboxSelectMultiple(),
+            'data_fim': forms.DateTimeInput(attrs={'type': 'datetime-local'}, format='%Y-%m-%dT%H:%M'),
+            **WIDGETS_REPETICAO,
         }
+        labels = {'frequencia': 'Repetir', 'repetir_ate': 'Até', 'repeticoes': 'Ou por quantas vezes'}
     
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user', None)
         super(ReuniaoForm, self).__init__(*args, **kwargs)
+        self.user = user
         # Removemos o próprio usuário da lista para ele não se auto-convidar
         if user:
             self.fields['convidados'].queryset = User.objects.exclude(id=user.id)
+
+    def clean(self):
+        dados = super().clean()
+        inicio, fim = dados.get('data_inicio'), dados.get('data_fim')
+        limpar_repeticao(self, dados, timezone.localtime(inicio).date() if inicio else None)
+        if not inicio or not fim:
+            return dados
+
+        if fim <= inicio:
+            self.add_error('data_fim', 'O término precisa ser depois do início.')
+        elif fim - inicio > agenda.DURACAO_MAXIMA:
+            self.add_error('data_fim', f'Uma reunião pode durar no máximo {agenda.DURACAO_MAXIMA.seconds // 3600} horas.')
+        elif self.user and not dados.get('ignorar_conflitos'):
+            # Organizador + todos os convidados numa consulta só (por lote), não uma por pessoa,
+            # e todas as ocorrências da série de uma vez
+            ids = [self.user.id] + [u.id for u in dados.get('convidados', [])]
+            horarios = agenda.horarios_da_serie(inicio, fim, dados.get('frequencia'), dados.get('repetir_ate'), dados.get('repeticoes'))
+            ocupados = agenda.conflitos_da_serie(ids, horarios, ignorar_reuniao=self.instance.pk)
+            if ocupados:
+                nomes = ', '.join(User.objects.filter(id__in=ocupados).order_by('username').values_list('username', flat=True))
+                livres = agenda.horarios_livres(ids, inicio, inicio + timedelta(days=7), fim - inicio, limite=3)
+                sugestoes = ', '.join(date_format(timezone.localtime(ini), 'd/m H:i') for ini, _ in livres)
+                raise forms.ValidationError(
+                    f"Conflito de horário para: {nomes}."
+                    + (f" Próximos horários livres para todos: {sugestoes}." if sugestoes else "")
+                )
+        return dados
 # (Bônus) Já vamos deixar pronto o de Tarefa também
 class TarefaForm(forms.ModelForm):
     class Meta:
         model = Tarefa
         # Adicionei 'usuario' aqui para o Django saber que esse campo pode ser salvo
-        fields = ['titulo', 'informacoes', 'data_prazo', 'usuario']
+        fields = ['titulo', 'informacoes', 'data_prazo', 'usuario', 'frequencia', 'repetir_ate', 'repeticoes']
         
         widgets = {
             'data_prazo': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'informacoes': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}),
-            # Estilo para o campo de seleção (caso apareça)
-            'usuario': forms.Select(attrs={'class': 'form-control'}),
+            # Estilo para o campo de seleção (caso apareça); os alunos vêm da busca por nome
+            'usuario': AutocompletarUsuario(attrs={'class': 'form-control'}),
+            **WIDGETS_REPETICAO,
         }
+        labels = {'frequencia': 'Repetir', 'repetir_ate': 'Até', 'repeticoes': 'Ou por quantas vezes'}
+        help_texts = {'repetir_ate': 'Sem data nem quantidade, repete no máximo %d vezes.' % recorrencia.MAX_REPETICOES}
 
     def __init__(self, *args, **kwargs):
         # 1. Pega o usuário que passamos lá na View
@@ -51,11 +157,60 @@ class TarefaForm(forms.ModelForm):
             self.fields['usuario'].label = "Designar para (Opcional)"
             self.fields['usuario'].queryset = User.objects.filter(perfil__tipo='Estudante')
             self.fields['usuario'].empty_label = "Para mim mesmo"
+            self.fields['usuario'].widget.tipo = 'Estudante'
         
         # Se for ESTUDANTE, escondemos o campo (ele nem vai saber que existe)
         else:
             self.fields['usuario'].widget = forms.HiddenInput()
 
+    def clean(self):
+        dados = super().clean()
+        limpar_repeticao(self, dados, dados.get('data_prazo'))
+        return dados
+
+# Mesma tarefa para vários alunos (só mentores; ver core/turmas.py)
+class TarefaEmLoteForm(forms.ModelForm):
+    alunos = forms.ModelMultipleChoiceField(
+        queryset=turmas.estudantes(), required=False, label='Alunos',
+        widget=AutocompletarUsuarios(tipo='Estudante'),
+    )
+    turmas = forms.ModelMultipleChoiceField(
+        queryset=None, required=False, label='Turmas', widget=forms.CheckboxSelectMultiple(),
+    )
+    todos = forms.BooleanField(required=False, label='Todos os meus alunos')
+    salvar_turma = forms.CharField(
+        required=False, max_length=100, label='Salvar os alunos escolhidos como turma (opcional)',
+        widget=forms.TextInput(attrs={'placeholder': 'Nome da turma'}),
+    )
+
+    class Meta:
+        model = Tarefa
+        fields = ['titulo', 'informacoes', 'data_prazo', 'frequencia', 'repetir_ate', 'repeticoes']
+        widgets = {
+            'data_prazo': forms.DateInput(attrs={'type': 'date'}),
+            'informacoes': forms.Textarea(attrs={'rows': 3}),
+            **WIDGETS_REPETICAO,
+        }
+        labels = TarefaForm.Meta.labels
+        help_texts = TarefaForm.Meta.help_texts
+
+    def __init__(self, *args, **kwargs):
+        self.mentor = kwargs.pop('user')
+        super().__init__(*args, **kwargs)
+        self.fields['turmas'].queryset = self.mentor.turmas.annotate(total=Count('alunos'))
+        self.fields['turmas'].label_from_instance = lambda turma: f'{turma.nome} ({turma.total} alunos)'
+
+    def clean(self):
+        dados = super().clean()
+        limpar_repeticao(self, dados, dados.get('data_prazo'))
+        ids = turmas.destinatarios(self.mentor, dados.get('alunos', []), dados.get('turmas', []), dados.get('todos'))
+        if not ids:
+            raise forms.ValidationError('Escolha pelo menos um aluno, uma turma ou "todos os meus alunos".')
+        if len(ids) > turmas.MAX_ALUNOS_POR_LOTE:
+            raise forms.ValidationError(f'No máximo {turmas.MAX_ALUNOS_POR_LOTE} alunos por vez.')
+        dados['destinatarios'] = ids
+        return dados
+
 class UserUpdateForm(forms.ModelForm):
     email = forms.EmailField()
 
@@ -0,0 +1,163 @@
+# core/imagens.py
+# --- IMAGENS ENVIADAS (FOTO DO PERFIL E IMAGEM DOS POSTS) ---
+# Toda imagem enviada passa por aqui:
+#   1. gira conforme o EXIF (foto de celular "deitada") e joga fora os metadados (o EXIF leva até GPS);
+#   2. o original fica com no máximo LADO_MAXIMO px (foto de 5MB do celular vira algumas centenas de KB);
+#   3. gera as versões de tamanho fixo que as páginas usam: avatar de 48px não baixa uma foto de 4000px.
+# As versões ficam em <pasta do original>/versoes/ e os caminhos vão no JSONField do modelo
+# (Perfil.foto_versoes, Post.imagem_versoes). Formato WebP; JPEG se o Pillow daqui não tiver WebP.
+# Para as imagens que já estavam no media/: python manage.py gerar_miniaturas
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+logger = logging.getLogger(__name__)
+
+LADO_MAXIMO = 2048
+LIMITE_PIXELS = 40_000_000  # acima disso nem decodifica (bomba de descompressão)
+QUALIDADE = 82
+
+# nome -> (largura, altura). Com altura: recorta no centro (avatar). Sem altura: só reduz, mantendo a proporção
+VERSOES_FOTO = {
+    'p': (96, 96),    # avatares de 30-55px (feed, comentários, chat), com folga para tela retina
+    'm': (160, 160),  # cards de usuários (80px)
+    'g': (320, 320),  # página de perfil (120-150px)
+}
+VERSOES_POST = {
+    'feed': (1200, None),  # coluna do feed tem 600px
+}
+
+FORMATO_VERSOES = 'WEBP' if features.check('webp') else 'JPEG'
+EXTENSAO_VERSOES = '.webp' if FORMATO_VERSOES == 'WEBP' else '.jpg'
+
+# Formato em que o original é regravado (o resto, como GIF/BMP/TIFF, vira PNG)
+FORMATOS_ORIGINAIS = {'JPEG': 'JPEG', 'MPO': 'JPEG', 'PNG': 'PNG', 'WEBP': 'WEBP'}
+EXTENSOES = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+
+
+def _abrir(campo):
+    campo.open('rb')
+    try:
+        imagem = Image.open(campo)
+        if imagem.width * imagem.height > LIMITE_PIXELS:
+            raise ValueError(f'{imagem.width}x{imagem.height} px é grande demais')
+        imagem.load()
+    finally:
+        campo.close()
+    formato, icc = imagem.format, imagem.info.get('icc_profile')
+    # Aplica a orientação do EXIF nos pixels; daqui para frente nenhum metadado é regravado
+    return ImageOps.exif_transpose(imagem), formato, icc
+
+
+def _no_modo(imagem, formato):
+    transparente = imagem.mode in ('RGBA', 'LA', 'PA') or (imagem.mode == 'P' and 'transparency' in imagem.info)
+    if not transparente:
+        return imagem.convert('RGB')
+    imagem = imagem.convert('RGBA')
+    if formato != 'JPEG':
+        return imagem
+    # JPEG não tem transparência: fundo branco
+    fundo = Image.new('RGB', imagem.size, 'white')
+    fundo.paste(imagem, mask=imagem.getchannel('A'))
+    return fundo
+
+
+def _codificar(imagem, formato, icc):
+    opcoes = {'PNG': {'optimize': True}, 'WEBP': {'quality': QUALIDADE, 'method': 4}}.get(
+        formato, {'quality': QUALIDADE, 'optimize': True, 'progressive': True}
+    )
+    if icc:
+        opcoes['icc_profile'] = icc  # o perfil de cor fica (sem ele as cores mudam); EXIF, XMP etc. não
+    buffer = BytesIO()
+    _no_modo(imagem, formato).save(buffer, formato, **opcoes)
+    return ContentFile(buffer.getvalue())
+
+
+def _gravar(storage, nome, conteudo):
+    # Regravar no mesmo nome: sem o delete o storage inventaria "nome_abc123.jpg"
+    storage.delete(nome)
+    return storage.save(nome, conteudo)
+
+
+def _versao(imagem, largura, altura):
+    if altura:
+        return ImageOps.fit(imagem, (largura, altura), Image.Resampling.LANCZOS)
+    copia = imagem.copy()
+    copia.thumbnail((largura, largura * 3), Image.Resampling.LANCZOS)  # thumbnail nunca aumenta
+    return copia
+
+
+def processar(campo, versoes):
+    """
+    Passa a imagem do campo (FieldFile) pelo pipeline e devolve {nome da versão: caminho no storage}.
+    Se não der para abrir (não é imagem, arquivo sumiu...), o arquivo fica como veio e devolve {}.
+    Pode trocar campo.name (original em formato sem suporte vira .png): quem chama grava o nome novo.
+    """
+    try:
+        imagem, formato, icc = _abrir(campo)
+    except (OSError, ValueError, UnidentifiedImageError, Image.DecompressionBombError) as erro:
+        logger.warning('Imagem %s não processada: %s', campo.name, erro)
+        return {}
+
+    storage = campo.storage
+    raiz = posixpath.splitext(campo.name)[0]
+
+    imagem.thumbnail((LADO_MAXIMO, LADO_MAXIMO), Image.Resampling.LANCZOS)
+    formato_original = FORMATOS_ORIGINAIS.get(formato, 'PNG')
+    nome_original = campo.name if formato in FORMATOS_ORIGINAIS else raiz + EXTENSOES[formato_original]
+    if nome_original != campo.name:
+        storage.delete(campo.name)
+    campo.name = _gravar(storage, nome_original, _codificar(imagem, formato_original, icc))
+
+    pasta, arquivo = posixpath.split(raiz)
+    caminhos = {}
+    for nome, (largura, altura) in versoes.items():
+        caminho = posixpath.join(pasta, 'versoes', f'{arquivo}_{nome}{EXTENSAO_VERSOES}')
+        caminhos[nome] = _gravar(storage, caminho, _codificar(_versao(imagem, largura, altura), FORMATO_VERSOES, icc))
+    return caminhos
+
+
+def atualizar(objeto, nome_campo, versoes, ja_feitas=None):
+    """
+    Processa objeto.<nome_campo> e grava o nome final e objeto.<nome_campo>_versoes com update()
+    (sem save(): não mexe em outros campos nem dispara sinais). Devolve as versões ({} se falhou).
+    O update só vale se o campo ainda aponta para o mesmo arquivo: se o usuário trocou a imagem
+    enquanto esta era processada, a nova não é sobrescrita.
+    ja_feitas: {nome do arquivo: (nome final, versões)} para o mesmo arquivo não ser processado duas vezes
+    (vários perfis apontam para o default.jpg).
+    """
+    campo = getattr(objeto, nome_campo)
+    nome_antes = campo.name
+    if not campo:
+        resultado = {}  # imagem removida: as versões da anterior não valem mais
+    elif ja_feitas is not None and campo.name in ja_feitas:
+        campo.name, resultado = ja_feitas[campo.name]
+    else:
+        resultado = processar(campo, versoes)
+        if ja_feitas is not None:
+            ja_feitas[nome_antes] = (campo.name, resultado)
+
+    setattr(objeto, f'{nome_campo}_versoes', resultado)
+    type(objeto).objects.filter(pk=objeto.pk, **{nome_campo: nome_antes}).update(
+        **{nome_campo: campo.name, f'{nome_campo}_versoes': resultado}
+    )
+    return resultado
+
+
+def processar_foto(perfil, ja_feitas=None):
+    return atualizar(perfil, 'foto', VERSOES_FOTO, ja_feitas)
+
+
+def processar_imagem_post(post, ja_feitas=None):
+    return atualizar(post, 'imagem', VERSOES_POST, ja_feitas)
+
+
+def url(campo, versoes, nome):
+    """URL da versão `nome`; enquanto ela não existe (imagem antiga, falha no processamento), a do original."""
+    if not campo:
+        return ''
+    caminho = (versoes or {}).get(nome)
+    return campo.storage.url(caminho) if caminho else campo.url
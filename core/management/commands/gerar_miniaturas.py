@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from core import imagens
+from core.models import Perfil, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Passa as imagens que já estão no media/ (fotos de perfil e imagens dos posts) pelo pipeline: '
+        'corrige a orientação, tira os metadados, limita o tamanho e gera as versões usadas nas páginas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Refaz também as imagens que já têm versões.')
+
+    def handle(self, *args, **options):
+        ja_feitas = {}  # vários perfis com o mesmo default.jpg: processa uma vez só
+        for nome, modelo, campo, processar in (
+            ('Fotos de perfil', Perfil, 'foto', imagens.processar_foto),
+            ('Imagens dos posts', Post, 'imagem', imagens.processar_imagem_post),
+        ):
+            pendentes = modelo.objects.exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''})
+            if not options['todas']:
+                pendentes = pendentes.filter(**{f'{campo}_versoes': {}})
+
+            feitas = falhas = 0
+            for objeto in pendentes.only('pk', campo).iterator(chunk_size=200):
+                if processar(objeto, ja_feitas):
+                    feitas += 1
+                else:
+                    falhas += 1
+
+            self.stdout.write(self.style.SUCCESS(f'{nome}: {feitas} imagem(ns) processada(s).'))
+            if falhas:
+                self.stdout.write(self.style.WARNING(f'{nome}: {falhas} arquivo(s) que não deu para abrir (ficaram como estavam).'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.models import Post, Comentario
+
+
+class Command(BaseCommand):
+    help = 'Recalcula likes_count e comentarios_count de todos os posts a partir das tabelas reais.'
+
+    def handle(self, *args, **options):
+        curtidas = (
+            Post.likes.through.objects.filter(post_id=OuterRef('pk'))
+            .order_by().values('post_id').annotate(c=Count('*')).values('c')
+        )
+        comentarios = (
+            Comentario.objects.filter(post_id=OuterRef('pk'))
+            .order_by().values('post_id').annotate(c=Count('*')).values('c')
+        )
+
+        # Um único UPDATE com subconsultas, sem carregar os posts na memória
+        total = Post.objects.update(
+            likes_count=Coalesce(Subquery(curtidas), 0),
+            comentarios_count=Coalesce(Subquery(comentarios), 0),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Contadores recalculados para {total} post(s).'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.chat import reconstruir_conversas
+
+
+class Command(BaseCommand):
+    help = 'Preenche (ou refaz) a caixa de entrada (Conversa) a partir das mensagens existentes.'
+
+    def handle(self, *args, **options):
+        total = reconstruir_conversas()
+        self.stdout.write(self.style.SUCCESS(f'{total} conversa(s) reconstruída(s).'))
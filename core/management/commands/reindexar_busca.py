@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core import busca
+
+
+class Command(BaseCommand):
+    help = 'Refaz os índices de busca textual: fórum (posts e comentários) e "Sobre mim" dos perfis (diretório).'
+
+    def handle(self, *args, **options):
+        if not busca.disponivel():
+            self.stdout.write(self.style.WARNING('Este banco não tem busca textual; o fórum usa icontains.'))
+            return
+
+        total = busca.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Índice de busca refeito com {total} documento(s).'))
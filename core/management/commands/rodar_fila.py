@@ -0,0 +1,56 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import fila
+
+
+class Command(BaseCommand):
+    help = (
+        'Worker da fila de trabalhos (imagens, notificações...). Fica rodando e executa os trabalhos pendentes; '
+        'dá para ter mais de um worker ao mesmo tempo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true', help='Executa o que está pendente agora e sai (bom para cron).')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera quando a fila está vazia.')
+        parser.add_argument('--status', action='store_true', help='Só mostra quantos trabalhos há em cada estado.')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            for estado, total in fila.resumo().items():
+                self.stdout.write(f'{estado}: {total}')
+            return
+
+        nome = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(self.style.SUCCESS(f'Worker {nome} rodando. Fila: {fila.resumo()}'))
+
+        feitos = falhas = 0
+        try:
+            while True:
+                # Worker de longa duração: conexão caída ou velha não pode derrubar o loop
+                close_old_connections()
+                item = fila.pegar(nome)
+                if item is None:
+                    recuperados = fila.recuperar_travados()
+                    if recuperados:
+                        self.stdout.write(self.style.WARNING(f'{recuperados} trabalho(s) travado(s) de volta na fila.'))
+                        continue
+                    if options['uma_vez']:
+                        break
+                    fila.limpar()
+                    time.sleep(options['intervalo'])
+                    continue
+
+                if fila.executar(item):
+                    feitos += 1
+                else:
+                    falhas += 1
+                    self.stdout.write(self.style.WARNING(f'{item} falhou: {item.erro.strip().splitlines()[-1]}'))
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'{feitos} trabalho(s) feito(s), {falhas} falha(s).'))
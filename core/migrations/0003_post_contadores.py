@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def preencher_contadores(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    Comentario = apps.get_model('core', 'Comentario')
+    Curtida = Post.likes.through
+
+    curtidas = Curtida.objects.filter(post_id=OuterRef('pk')).order_by().values('post_id').annotate(c=Count('*')).values('c')
+    comentarios = Comentario.objects.filter(post_id=OuterRef('pk')).order_by().values('post_id').annotate(c=Count('*')).values('c')
+    Post.objects.update(
+        likes_count=Coalesce(Subquery(curtidas), 0),
+        comentarios_count=Coalesce(Subquery(comentarios), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_notificacao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comentarios_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-likes_count', '-data_criacao', '-id'], name='post_mais_curtidos_idx'),
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:30
+
+from django.db import migrations
+
+
+def criar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    nome = "u.username || ' ' || u.first_name || ' ' || u.last_name"
+
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE core_busca USING fts5("
+            "post_id UNINDEXED, conteudo, autor, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        for tabela, tipo, post_col in (('core_post', 1, 'o.id'), ('core_comentario', 2, 'o.post_id')):
+            schema_editor.execute(
+                f"INSERT INTO core_busca (rowid, post_id, conteudo, autor) "
+                f"SELECT o.id * 4 + {tipo}, {post_col}, o.conteudo, {nome} "
+                f"FROM {tabela} o JOIN auth_user u ON u.id = o.autor_id"
+            )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE core_busca (id bigint PRIMARY KEY, post_id integer, documento tsvector NOT NULL)'
+        )
+        schema_editor.execute('CREATE INDEX core_busca_documento_idx ON core_busca USING GIN (documento)')
+        for tabela, tipo, post_col in (('core_post', 1, 'o.id'), ('core_comentario', 2, 'o.post_id')):
+            schema_editor.execute(
+                f"INSERT INTO core_busca (id, post_id, documento) "
+                f"SELECT o.id * 4 + {tipo}, {post_col}, "
+                f"setweight(to_tsvector('portuguese', o.conteudo), 'A') || setweight(to_tsvector('portuguese', {nome}), 'B') "
+                f"FROM {tabela} o JOIN auth_user u ON u.id = o.autor_id"
+            )
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS core_busca')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_post_contadores'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
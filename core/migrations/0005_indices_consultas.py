@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_indice_busca'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mensagem',
+            index=models.Index(fields=['remetente', 'destinatario', 'id'], name='msg_conversa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mensagem',
+            index=models.Index(condition=models.Q(('lido', False)), fields=['destinatario', 'remetente'], name='msg_nao_lidas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(condition=models.Q(('lida', False)), fields=['destinatario', '-data_criacao'], name='notif_nao_lidas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-data_criacao', '-id'], name='post_recentes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reuniao',
+            index=models.Index(fields=['data_inicio'], name='reuniao_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reuniao',
+            index=models.Index(fields=['solicitante', 'data_inicio'], name='reuniao_solic_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['usuario', 'data_prazo'], name='tarefa_usuario_prazo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['criador', 'data_prazo'], name='tarefa_criador_prazo_idx'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Greatest, Least
+
+
+TAMANHO_TRECHO = 120  # cópia de core/chat.py, congelada aqui: a migração não importa código do app
+LOTE = 1000
+
+
+def _trecho(conteudo):
+    conteudo = ' '.join(conteudo.split())
+    if len(conteudo) <= TAMANHO_TRECHO:
+        return conteudo
+    return conteudo[:TAMANHO_TRECHO - 1] + '…'
+
+
+def preencher_conversas(apps, schema_editor):
+    # Sem isso a caixa de entrada de todo mundo fica vazia até alguém rodar o comando reconstruir_conversas.
+    # Mesma conta do chat.reconstruir_conversas, só com os modelos históricos (um par de usuários por conversa)
+    banco = schema_editor.connection.alias
+    mensagens = apps.get_model('core', 'Mensagem').objects.using(banco)
+    Conversa = apps.get_model('core', 'Conversa')
+    pares = (
+        mensagens.order_by()
+        .annotate(a=Least('remetente_id', 'destinatario_id'), b=Greatest('remetente_id', 'destinatario_id'))
+        .values('a', 'b')
+        .annotate(
+            ultima=Max('id'),
+            nao_lidas_a=Count('id', filter=Q(lido=False, destinatario_id=F('a'))),
+            nao_lidas_b=Count('id', filter=Q(lido=False, destinatario_id=F('b'))),
+        )
+    )
+
+    def gravar(lote):
+        ultimas = mensagens.only('id', 'data_envio', 'conteudo').in_bulk([p['ultima'] for p in lote])
+        Conversa.objects.using(banco).bulk_create([
+            Conversa(
+                usuario_a_id=p['a'],
+                usuario_b_id=p['b'],
+                ultima_mensagem_id=p['ultima'],
+                ultima_data=ultimas[p['ultima']].data_envio,
+                ultimo_trecho=_trecho(ultimas[p['ultima']].conteudo),
+                nao_lidas_a=p['nao_lidas_a'],
+                nao_lidas_b=p['nao_lidas_b'],
+            )
+            for p in lote
+        ])
+
+    lote = []
+    for par in pares.iterator():
+        lote.append(par)
+        if len(lote) >= LOTE:
+            gravar(lote)
+            lote = []
+    if lote:
+        gravar(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_indices_consultas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima_data', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_trecho', models.CharField(blank=True, max_length=120)),
+                ('nao_lidas_a', models.PositiveIntegerField(default=0)),
+                ('nao_lidas_b', models.PositiveIntegerField(default=0)),
+                ('ultima_mensagem', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.mensagem')),
+                ('usuario_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('usuario_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['usuario_a', '-ultima_data'], name='conversa_a_recentes_idx'), models.Index(fields=['usuario_b', '-ultima_data'], name='conversa_b_recentes_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario_a', 'usuario_b'), name='conversa_par_unico')],
+            },
+        ),
+        migrations.RunPython(preencher_conversas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+TAMANHO_LOTE = 1000
+
+
+def copiar_participantes(apps, schema_editor):
+    # Organizador + cada linha de convidados vira uma participação (com a data de início copiada)
+    Reuniao = apps.get_model('core', 'Reuniao')
+    ParticipanteReuniao = apps.get_model('core', 'ParticipanteReuniao')
+    Convite = Reuniao.convidados.through
+
+    lote = []
+
+    def gravar():
+        ParticipanteReuniao.objects.bulk_create(lote, ignore_conflicts=True)
+        lote.clear()
+
+    for reuniao_id, solicitante_id, data_inicio in Reuniao.objects.values_list('id', 'solicitante_id', 'data_inicio').iterator():
+        lote.append(ParticipanteReuniao(reuniao_id=reuniao_id, usuario_id=solicitante_id, papel='organizador', data_inicio=data_inicio))
+        if len(lote) >= TAMANHO_LOTE:
+            gravar()
+    gravar()
+
+    convites = (
+        Convite.objects.exclude(user_id=models.F('reuniao__solicitante_id'))
+        .values_list('reuniao_id', 'user_id', 'reuniao__data_inicio')
+        .order_by('id')
+    )
+    for reuniao_id, user_id, data_inicio in convites.iterator():
+        lote.append(ParticipanteReuniao(reuniao_id=reuniao_id, usuario_id=user_id, papel='convidado', data_inicio=data_inicio))
+        if len(lote) >= TAMANHO_LOTE:
+            gravar()
+    gravar()
+
+
+def restaurar_convidados(apps, schema_editor):
+    Reuniao = apps.get_model('core', 'Reuniao')
+    ParticipanteReuniao = apps.get_model('core', 'ParticipanteReuniao')
+    Convite = Reuniao.convidados.through
+    convidados = ParticipanteReuniao.objects.filter(papel='convidado').values_list('reuniao_id', 'usuario_id')
+    Convite.objects.bulk_create(
+        (Convite(reuniao_id=reuniao_id, user_id=user_id) for reuniao_id, user_id in convidados.iterator()),
+        batch_size=TAMANHO_LOTE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_atualizado_em'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipanteReuniao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('papel', models.CharField(choices=[('organizador', 'Organizador'), ('convidado', 'Convidado')], default='convidado', max_length=20)),
+                ('data_inicio', models.DateTimeField()),
+                ('reuniao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participacoes', to='core.reuniao')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participacoes_reuniao', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='participantereuniao',
+            index=models.Index(fields=['usuario', 'data_inicio'], name='participante_agenda_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='participantereuniao',
+            constraint=models.UniqueConstraint(fields=('reuniao', 'usuario'), name='participante_unico'),
+        ),
+        migrations.RunPython(copiar_participantes, restaurar_convidados),
+        migrations.RemoveField(
+            model_name='reuniao',
+            name='convidados',
+        ),
+        migrations.AddField(
+            model_name='reuniao',
+            name='participantes',
+            field=models.ManyToManyField(related_name='reunioes', through='core.ParticipanteReuniao', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
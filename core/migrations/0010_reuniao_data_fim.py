@@ -0,0 +1,54 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:05
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def preencher_data_fim(apps, schema_editor):
+    # Reuniões antigas não tinham fim: assume 1 hora (o que o calendário já mostrava)
+    Reuniao = apps.get_model('core', 'Reuniao')
+    ParticipanteReuniao = apps.get_model('core', 'ParticipanteReuniao')
+    Reuniao.objects.filter(data_fim__isnull=True).update(data_fim=models.F('data_inicio') + timedelta(hours=1))
+    ParticipanteReuniao.objects.filter(data_fim__isnull=True).update(
+        data_fim=models.Subquery(Reuniao.objects.filter(pk=models.OuterRef('reuniao_id')).values('data_fim')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_participantes_reuniao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reuniao',
+            name='data_fim',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='participantereuniao',
+            name='data_fim',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(preencher_data_fim, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='reuniao',
+            name='data_fim',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterField(
+            model_name='participantereuniao',
+            name='data_fim',
+            field=models.DateTimeField(),
+        ),
+        migrations.RemoveIndex(
+            model_name='participantereuniao',
+            name='participante_agenda_idx',
+        ),
+        migrations.AddIndex(
+            model_name='participantereuniao',
+            index=models.Index(fields=['usuario', 'data_inicio', 'data_fim'], name='participante_agenda_idx'),
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_reuniao_data_fim'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReuniaoExcecao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_original', models.DateField()),
+                ('cancelada', models.BooleanField(default=False)),
+                ('data_inicio', models.DateTimeField(blank=True, null=True)),
+                ('data_fim', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TarefaExcecao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_original', models.DateField()),
+                ('cancelada', models.BooleanField(default=False)),
+                ('data_prazo', models.DateField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='participantereuniao',
+            name='fim_da_serie',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reuniao',
+            name='fim_da_serie',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='reuniao',
+            name='frequencia',
+            field=models.CharField(blank=True, choices=[('', 'Não repete'), ('semanal', 'Toda semana'), ('quinzenal', 'A cada 2 semanas'), ('mensal', 'Todo mês')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='reuniao',
+            name='repeticoes',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reuniao',
+            name='repetir_ate',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tarefa',
+            name='fim_da_serie',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tarefa',
+            name='frequencia',
+            field=models.CharField(blank=True, choices=[('', 'Não repete'), ('semanal', 'Toda semana'), ('quinzenal', 'A cada 2 semanas'), ('mensal', 'Todo mês')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='tarefa',
+            name='repeticoes',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tarefa',
+            name='repetir_ate',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='participantereuniao',
+            index=models.Index(condition=models.Q(('fim_da_serie__isnull', False)), fields=['usuario', 'fim_da_serie'], name='participante_serie_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(condition=models.Q(('fim_da_serie__isnull', False)), fields=['usuario', 'fim_da_serie'], name='tarefa_usuario_serie_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(condition=models.Q(('fim_da_serie__isnull', False)), fields=['criador', 'fim_da_serie'], name='tarefa_criador_serie_idx'),
+        ),
+        migrations.AddField(
+            model_name='reuniaoexcecao',
+            name='reuniao',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='excecoes', to='core.reuniao'),
+        ),
+        migrations.AddField(
+            model_name='tarefaexcecao',
+            name='tarefa',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='excecoes', to='core.tarefa'),
+        ),
+        migrations.AddConstraint(
+            model_name='reuniaoexcecao',
+            constraint=models.UniqueConstraint(fields=('reuniao', 'data_original'), name='reuniao_excecao_unica'),
+        ),
+        migrations.AddConstraint(
+            model_name='tarefaexcecao',
+            constraint=models.UniqueConstraint(fields=('tarefa', 'data_original'), name='tarefa_excecao_unica'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:40
+
+from django.conf import settings
+from django.db import migrations
+
+
+def criar_perfis_faltando(apps, schema_editor):
+    # Usuários antigos sem perfil ganhavam um no próximo save() do User (inclusive no login);
+    # agora o perfil só nasce junto com o usuário, então os que faltam são criados aqui
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Perfil = apps.get_model('core', 'Perfil')
+    sem_perfil = User.objects.filter(perfil__isnull=True).values_list('pk', flat=True)
+    Perfil.objects.bulk_create([Perfil(user_id=pk) for pk in sem_perfil.iterator()], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_fila_de_trabalhos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_perfis_faltando, migrations.RunPython.noop),
+    ]
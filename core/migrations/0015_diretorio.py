@@ -0,0 +1,60 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def criar_indice_perfis(apps, schema_editor):
+    # Busca no "Sobre mim" do diretório: igual ao core_busca do fórum (0004), uma linha por perfil com bio
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE core_busca_perfil USING fts5(bio, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO core_busca_perfil (rowid, bio) SELECT id, bio FROM core_perfil WHERE TRIM(COALESCE(bio, '')) != ''"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE TABLE core_busca_perfil (id bigint PRIMARY KEY, documento tsvector NOT NULL)')
+        schema_editor.execute('CREATE INDEX core_busca_perfil_documento_idx ON core_busca_perfil USING GIN (documento)')
+        schema_editor.execute(
+            "INSERT INTO core_busca_perfil (id, documento) SELECT id, to_tsvector('portuguese', bio) "
+            "FROM core_perfil WHERE TRIM(COALESCE(bio, '')) != ''"
+        )
+
+
+def remover_indice_perfis(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS core_busca_perfil')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_perfis_faltando'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='perfil',
+            index=models.Index(fields=['tipo', 'id'], name='perfil_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfil',
+            index=models.Index(fields=['cidade', 'tipo', 'id'], name='perfil_cidade_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfil',
+            index=models.Index(fields=['profissao', 'tipo', 'id'], name='perfil_profissao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfil',
+            index=models.Index(fields=['empresa', 'tipo', 'id'], name='perfil_empresa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfil',
+            index=models.Index(fields=['formacao', 'tipo', 'id'], name='perfil_formacao_idx'),
+        ),
+        migrations.RunPython(criar_indice_perfis, remover_indice_perfis),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:39
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def preencher_visto_em(apps, schema_editor):
+    # Até aqui o "Visto:" da comunidade era o last_login: começa dele
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Perfil = apps.get_model('core', 'Perfil')
+    Perfil.objects.update(visto_em=Subquery(User.objects.filter(pk=OuterRef('user_id')).values('last_login')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_diretorio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfil',
+            name='visto_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='perfil',
+            index=models.Index(condition=models.Q(('visto_em__isnull', False)), fields=['-visto_em'], name='perfil_visto_idx'),
+        ),
+        migrations.RunPython(preencher_visto_em, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def preencher_arvore(apps, schema_editor):
+    # Os comentários que já existem: raiz, caminho e profundidade a partir do parent
+    Comentario = apps.get_model('core', 'Comentario')
+    pais = dict(Comentario.objects.values_list('id', 'parent_id'))
+    calculados = {}
+
+    def calcular(pk):
+        if pk not in calculados:
+            pai = pais[pk]
+            if pai is None:
+                calculados[pk] = (None, f'{pk:010d}', 0)
+            else:
+                raiz, caminho, profundidade = calcular(pai)
+                calculados[pk] = (raiz or pai, f'{caminho}{pk:010d}', profundidade + 1)
+        return calculados[pk]
+
+    comentarios = []
+    for pk in pais:
+        raiz, caminho, profundidade = calcular(pk)
+        comentarios.append(Comentario(pk=pk, raiz_id=raiz, caminho=caminho, profundidade=profundidade))
+    Comentario.objects.bulk_update(comentarios, ['raiz', 'caminho', 'profundidade'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_perfil_visto_em'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comentario',
+            name='caminho',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comentario',
+            name='profundidade',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comentario',
+            name='raiz',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.comentario'),
+        ),
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(condition=models.Q(('parent__isnull', True)), fields=['post', '-data_criacao', '-id'], name='comentario_principais_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['raiz', 'caminho'], name='comentario_fio_idx'),
+        ),
+        migrations.RunPython(preencher_arvore, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:05
+
+from django.conf import settings
+from django.db import migrations
+
+# Busca de usuários por começo do nome (core/diretorio.py, usuarios_por_prefixo): intervalos em LOWER(coluna).
+# auth_user não é um modelo do core, então os índices de expressão são criados aqui com SQL
+# (a mesma sintaxe serve para SQLite e PostgreSQL).
+COLUNAS = ['username', 'first_name', 'last_name']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_comentario_arvore'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE INDEX IF NOT EXISTS usuario_{coluna}_lower_idx ON auth_user (LOWER({coluna}))',
+            f'DROP INDEX IF EXISTS usuario_{coluna}_lower_idx',
+        )
+        for coluna in COLUNAS
+    ]
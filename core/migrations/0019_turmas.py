@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_usuarios_nome_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Turma',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100)),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('alunos', models.ManyToManyField(blank=True, related_name='turmas_como_aluno', to=settings.AUTH_USER_MODEL)),
+                ('mentor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turmas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['nome'],
+                'constraints': [models.UniqueConstraint(fields=('mentor', 'nome'), name='turma_nome_unico')],
+            },
+        ),
+    ]
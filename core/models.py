@@ -1,9 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User  # <--- ESSA LINHA RESOLVE O ERRO
 from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
 from django.utils import timezone
 
+from . import imagens, recorrencia
+
 # --- SEUS MODELOS ANTIGOS (Mantive eles aqui) ---
 class Mensagem(models.Model):
     remetente = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mensagens_enviadas')
@@ -14,22 +16,197 @@ class Mensagem(models.Model):
 
     class Meta:
         ordering = ['data_envio'] # Mensagens antigas primeiro
+        indexes = [
+            # Histórico da conversa (sala_chat / API): (remetente, destinatario) + ordem por id
+            models.Index(fields=['remetente', 'destinatario', 'id'], name='msg_conversa_idx'),
+            # Contador de não lidas do painel e o "marcar como lida" (índice parcial: só as não lidas)
+            models.Index(fields=['destinatario', 'remetente'], condition=models.Q(lido=False), name='msg_nao_lidas_idx'),
+        ]
 
     def __str__(self):
         return f"De {self.remetente} para {self.destinatario}"
 
+# --- CAIXA DE ENTRADA: UM RESUMO POR PAR DE USUÁRIOS ---
+class Conversa(models.Model):
+    # usuario_a é sempre o de menor id, assim cada par tem uma linha só
+    usuario_a = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    usuario_b = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    ultima_mensagem = models.ForeignKey(Mensagem, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    ultima_data = models.DateTimeField(null=True, blank=True)
+    ultimo_trecho = models.CharField(max_length=120, blank=True)
+    # Não lidas PARA cada lado da conversa
+    nao_lidas_a = models.PositiveIntegerField(default=0)
+    nao_lidas_b = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['usuario_a', 'usuario_b'], name='conversa_par_unico'),
+        ]
+        indexes = [
+            # Caixa de entrada: minhas conversas (de um lado ou do outro) por recência
+            models.Index(fields=['usuario_a', '-ultima_data'], name='conversa_a_recentes_idx'),
+            models.Index(fields=['usuario_b', '-ultima_data'], name='conversa_b_recentes_idx'),
+        ]
+
+    def __str__(self):
+        return f"Conversa entre {self.usuario_a_id} e {self.usuario_b_id}"
+
+    @staticmethod
+    def par(id1, id2):
+        return (id1, id2) if id1 < id2 else (id2, id1)
+
+    def outro(self, usuario):
+        return self.usuario_b if usuario.id == self.usuario_a_id else self.usuario_a
+
+    def nao_lidas_para(self, usuario):
+        return self.nao_lidas_a if usuario.id == self.usuario_a_id else self.nao_lidas_b
+
 class Reuniao(models.Model):
     solicitante = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reunioes_solicitadas')
-    # AQUI MUDOU: De ForeignKey para ManyToManyField
-    convidados = models.ManyToManyField(User, related_name='reunioes_convidadas')
+    # Organizador + convidados, todos numa tabela só (ParticipanteReuniao, com o papel de cada um).
+    # Para mudar os convidados use definir_convidados(), que mantém a tabela em dia.
+    participantes = models.ManyToManyField(User, through='ParticipanteReuniao', related_name='reunioes')
     
     titulo = models.CharField(max_length=200)
     data_inicio = models.DateTimeField()
+    data_fim = models.DateTimeField()
     link_externo = models.URLField(blank=True, null=True)
+    atualizado_em = models.DateTimeField(auto_now=True)  # ETag do feed .ics
+
+    # Repetição (core/recorrencia.py): data_inicio/data_fim são a primeira ocorrência; as outras são
+    # calculadas para a janela pedida. Ocorrência editada ou cancelada vira uma ReuniaoExcecao
+    frequencia = models.CharField(max_length=10, choices=recorrencia.FREQUENCIAS, blank=True, default='')
+    repetir_ate = models.DateField(blank=True, null=True)
+    repeticoes = models.PositiveSmallIntegerField(blank=True, null=True)
+    fim_da_serie = models.DateTimeField(blank=True, null=True, editable=False)  # fim da última ocorrência (save() calcula)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['data_inicio'], name='reuniao_inicio_idx'),
+            models.Index(fields=['solicitante', 'data_inicio'], name='reuniao_solic_inicio_idx'),
+        ]
 
     def __str__(self):
         return self.titulo
 
+    def save(self, *args, **kwargs):
+        self.fim_da_serie = None
+        if self.frequencia:
+            ultimo_inicio = recorrencia.ultima(self.data_inicio, self.frequencia, self.repetir_ate, self.repeticoes)
+            self.fim_da_serie = ultimo_inicio + (self.data_fim - self.data_inicio)
+        if 'update_fields' in kwargs and kwargs['update_fields'] is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'fim_da_serie'}
+        super().save(*args, **kwargs)
+        # O organizador também é participante, e início/fim vão copiados para cada participação:
+        # "minhas reuniões no período" e "quem está ocupado" ficam só no índice (usuario, data_inicio, data_fim)
+        datas = {'data_inicio': self.data_inicio, 'data_fim': self.data_fim, 'fim_da_serie': self.fim_da_serie}
+        ParticipanteReuniao.objects.update_or_create(
+            reuniao=self, papel=ParticipanteReuniao.ORGANIZADOR,
+            defaults={'usuario_id': self.solicitante_id, **datas},
+        )
+        self.participacoes.exclude(**datas).update(**datas)
+
+    def alterar_ocorrencia(self, data_original, **campos):
+        """Cancela (cancelada=True) ou muda o horário (data_inicio/data_fim) de uma ocorrência só da série."""
+        ReuniaoExcecao.objects.update_or_create(
+            reuniao=self, data_original=data_original,
+            defaults={'cancelada': False, 'data_inicio': None, 'data_fim': None, **campos},
+        )
+        # Atualiza atualizado_em (ETag do feed) e dispara o post_save (cache do painel de quem participa)
+        self.save(update_fields=['atualizado_em'])
+
+    def definir_convidados(self, usuarios):
+        """Troca a lista de convidados: apaga quem saiu e cria (bulk_create) quem entrou."""
+        novos = {u.pk for u in usuarios} - {self.solicitante_id}
+        atuais = set(self.participacoes.filter(papel=ParticipanteReuniao.CONVIDADO).values_list('usuario_id', flat=True))
+
+        sairam, entraram = atuais - novos, novos - atuais
+        if sairam:
+            self.participacoes.filter(papel=ParticipanteReuniao.CONVIDADO, usuario_id__in=sairam).delete()
+        if entraram:
+            ParticipanteReuniao.objects.bulk_create([
+                ParticipanteReuniao(
+                    reuniao=self, usuario_id=uid, papel=ParticipanteReuniao.CONVIDADO,
+                    data_inicio=self.data_inicio, data_fim=self.data_fim, fim_da_serie=self.fim_da_serie,
+                )
+                for uid in entraram
+            ])
+        if sairam or entraram:
+            Reuniao.objects.filter(pk=self.pk).update(atualizado_em=timezone.now())
+            participantes_alterados.send(sender=Reuniao, reuniao=self, usuarios=sairam | entraram)
+
+    @staticmethod
+    def prefetch_convidados():
+        # Use com prefetch_related(): depois disso convidados_lista não consulta o banco
+        return models.Prefetch(
+            'participacoes',
+            queryset=ParticipanteReuniao.objects.filter(papel=ParticipanteReuniao.CONVIDADO).select_related('usuario').order_by('id'),
+            to_attr='_convidacoes',
+        )
+
+    @property
+    def convidados_lista(self):
+        if hasattr(self, '_convidacoes'):
+            return [p.usuario for p in self._convidacoes]
+        return list(User.objects.filter(
+            participacoes_reuniao__reuniao=self, participacoes_reuniao__papel=ParticipanteReuniao.CONVIDADO
+        ).order_by('participacoes_reuniao__id'))
+
+
+# Avisa quem cacheia coisas por usuário (painel) que a lista de convidados mudou:
+# bulk_create não dispara post_save
+participantes_alterados = Signal()
+
+
+class ParticipanteReuniao(models.Model):
+    ORGANIZADOR = 'organizador'
+    CONVIDADO = 'convidado'
+    PAPEIS = [(ORGANIZADOR, 'Organizador'), (CONVIDADO, 'Convidado')]
+
+    reuniao = models.ForeignKey(Reuniao, on_delete=models.CASCADE, related_name='participacoes')
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='participacoes_reuniao')
+    papel = models.CharField(max_length=20, choices=PAPEIS, default=CONVIDADO)
+    # Cópias de reuniao.data_inicio/data_fim/fim_da_serie (Reuniao.save mantém)
+    data_inicio = models.DateTimeField()
+    data_fim = models.DateTimeField()
+    fim_da_serie = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reuniao', 'usuario'], name='participante_unico'),
+        ]
+        indexes = [
+            # Agenda por período e ocupação (o fim no índice evita ir na tabela para checar sobreposição)
+            models.Index(fields=['usuario', 'data_inicio', 'data_fim'], name='participante_agenda_idx'),
+            # Séries que começaram antes da janela e ainda não acabaram (parcial: só reuniões que repetem)
+            models.Index(
+                fields=['usuario', 'fim_da_serie'], name='participante_serie_idx',
+                condition=models.Q(fim_da_serie__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario.username} ({self.papel}) em {self.reuniao.titulo}"
+
+
+class ReuniaoExcecao(models.Model):
+    """Ocorrência de uma série que foi cancelada ou mudou de horário (as outras não têm linha)."""
+    reuniao = models.ForeignKey(Reuniao, on_delete=models.CASCADE, related_name='excecoes')
+    data_original = models.DateField()  # dia em que a ocorrência cairia pela regra
+    cancelada = models.BooleanField(default=False)
+    # Novo horário (vazio quando cancelada)
+    data_inicio = models.DateTimeField(blank=True, null=True)
+    data_fim = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reuniao', 'data_original'], name='reuniao_excecao_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.reuniao.titulo} em {self.data_original}"
+
+
 class Tarefa(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
     titulo = models.CharField(max_length=200)
@@ -37,10 +214,76 @@ class Tarefa(models.Model):
     data_prazo = models.DateField()
     concluida = models.BooleanField(default=False)
     criador = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tarefas')
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    # Repetição, como em Reuniao: data_prazo é o prazo da primeira ocorrência
+    frequencia = models.CharField(max_length=10, choices=recorrencia.FREQUENCIAS, blank=True, default='')
+    repetir_ate = models.DateField(blank=True, null=True)
+    repeticoes = models.PositiveSmallIntegerField(blank=True, null=True)
+    fim_da_serie = models.DateField(blank=True, null=True, editable=False)  # prazo da última ocorrência
+
+    class Meta:
+        indexes = [
+            # Painel e calendário filtram "minhas" tarefas (dono ou criador) por prazo
+            models.Index(fields=['usuario', 'data_prazo'], name='tarefa_usuario_prazo_idx'),
+            models.Index(fields=['criador', 'data_prazo'], name='tarefa_criador_prazo_idx'),
+            # Séries que ainda não acabaram (parciais: só tarefas que repetem)
+            models.Index(fields=['usuario', 'fim_da_serie'], name='tarefa_usuario_serie_idx', condition=models.Q(fim_da_serie__isnull=False)),
+            models.Index(fields=['criador', 'fim_da_serie'], name='tarefa_criador_serie_idx', condition=models.Q(fim_da_serie__isnull=False)),
+        ]
 
     def __str__(self):
         return self.titulo
 
+    def save(self, *args, **kwargs):
+        self.fim_da_serie = None
+        if self.frequencia:
+            self.fim_da_serie = recorrencia.ultima(self.data_prazo, self.frequencia, self.repetir_ate, self.repeticoes)
+        if 'update_fields' in kwargs and kwargs['update_fields'] is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'fim_da_serie'}
+        super().save(*args, **kwargs)
+
+    def alterar_ocorrencia(self, data_original, **campos):
+        """Cancela (cancelada=True) ou muda o prazo (data_prazo) de uma ocorrência só da série."""
+        TarefaExcecao.objects.update_or_create(
+            tarefa=self, data_original=data_original,
+            defaults={'cancelada': False, 'data_prazo': None, **campos},
+        )
+        self.save(update_fields=['atualizado_em'])
+
+
+class TarefaExcecao(models.Model):
+    """Ocorrência de uma tarefa que repete que foi cancelada ou mudou de prazo."""
+    tarefa = models.ForeignKey(Tarefa, on_delete=models.CASCADE, related_name='excecoes')
+    data_original = models.DateField()
+    cancelada = models.BooleanField(default=False)
+    data_prazo = models.DateField(blank=True, null=True)  # novo prazo (vazio quando cancelada)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tarefa', 'data_original'], name='tarefa_excecao_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.tarefa.titulo} em {self.data_original}"
+
+
+class Turma(models.Model):
+    """Grupo de alunos salvo por um mentor, para passar a mesma tarefa para todos de uma vez (core/turmas.py)."""
+    mentor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='turmas')
+    nome = models.CharField(max_length=100)
+    alunos = models.ManyToManyField(User, related_name='turmas_como_aluno', blank=True)
+    criada_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['nome']
+        constraints = [
+            models.UniqueConstraint(fields=['mentor', 'nome'], name='turma_nome_unico'),
+        ]
+
+    def __str__(self):
+        return self.nome
+
 # --- NOVO MODELO: PERFIL ---
 class Perfil(models.Model):
     # Aqui voltamos a usar User direto, pois importamos ele lá em cima
@@ -65,22 +308,48 @@ class Perfil(models.Model):
     linkedin = models.URLField(blank=True, null=True, verbose_name="LinkedIn (Link Completo)")
     instagram = models.CharField(max_length=50, blank=True, null=True, verbose_name="Instagram (@usuario)")
     foto = models.ImageField(upload_to='perfil_fotos/', blank=True, null=True, default='default.jpg')
+    # Caminhos das versões geradas pelo core/imagens.py ({'p': ..., 'm': ..., 'g': ...})
+    foto_versoes = models.JSONField(default=dict, blank=True, editable=False)
+    # Última vez que o usuário foi visto no site (gravado em lote por core/presenca.py)
+    visto_em = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Quem está online: visto_em recente, o mais novo primeiro
+            models.Index(fields=['-visto_em'], condition=models.Q(visto_em__isnull=False), name='perfil_visto_idx'),
+            # Diretório da comunidade (core/diretorio.py): filtros por igualdade, páginas em ordem de id
+            models.Index(fields=['tipo', 'id'], name='perfil_tipo_idx'),
+            models.Index(fields=['cidade', 'tipo', 'id'], name='perfil_cidade_idx'),
+            models.Index(fields=['profissao', 'tipo', 'id'], name='perfil_profissao_idx'),
+            models.Index(fields=['empresa', 'tipo', 'id'], name='perfil_empresa_idx'),
+            models.Index(fields=['formacao', 'tipo', 'id'], name='perfil_formacao_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.username} Perfil'
 
-# --- SINAIS AUTOMÁTICOS ---
-@receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    if created:
-        Perfil.objects.create(user=instance)
+    # Nos templates usar estas em vez de foto.url (o original pode ter milhares de px)
+    @property
+    def foto_pequena(self):
+        return imagens.url(self.foto, self.foto_versoes, 'p')
+
+    @property
+    def foto_media(self):
+        return imagens.url(self.foto, self.foto_versoes, 'm')
 
+    @property
+    def foto_grande(self):
+        return imagens.url(self.foto, self.foto_versoes, 'g')
+
+# --- SINAIS AUTOMÁTICOS ---
+# O perfil nasce uma vez, junto com o usuário, e depois só é gravado por quem mexe nele (meu_perfil, admin).
+# Salvar o User (ex.: last_login a cada login) não toca no perfil.
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    try:
-        instance.perfil.save()
-    except:
-        Perfil.objects.create(user=instance)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    # raw: loaddata, o perfil vem da própria fixture
+    if created and not raw:
+        # get_or_create: se algum código já criou o perfil dentro da mesma transação, não duplica
+        Perfil.objects.get_or_create(user=instance)
 
 
 # --- FÓRUM / FEED ---
@@ -89,19 +358,34 @@ class Post(models.Model):
     autor = models.ForeignKey(User, on_delete=models.CASCADE)
     conteudo = models.TextField(max_length=500, verbose_name="O que você está pensando?")
     imagem = models.ImageField(upload_to='posts_img/', blank=True, null=True)
+    imagem_versoes = models.JSONField(default=dict, blank=True, editable=False)  # ver core/imagens.py
     data_criacao = models.DateTimeField(default=timezone.now)
     
     # Campo para curtidas (Many to Many = Vários usuários podem curtir vários posts)
     likes = models.ManyToManyField(User, related_name='posts_curtidos', blank=True)
 
+    # Contadores desnormalizados (atualizados com F() nas views; ver comando recalcular_contadores)
+    likes_count = models.PositiveIntegerField(default=0)
+    comentarios_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         ordering = ['-data_criacao'] # O mais novo aparece primeiro
+        indexes = [
+            # "Mais Curtidos" vira uma leitura em ordem do índice, sem GROUP BY
+            models.Index(fields=['-likes_count', '-data_criacao', '-id'], name='post_mais_curtidos_idx'),
+            # Feed "Mais Recentes" (keyset em data_criacao, id)
+            models.Index(fields=['-data_criacao', '-id'], name='post_recentes_idx'),
+        ]
 
     def __str__(self):
         return f"Post de {self.autor.username}"
 
     def total_likes(self):
-        return self.likes.count()
+        return self.likes_count
+
+    @property
+    def imagem_feed(self):
+        return imagens.url(self.imagem, self.imagem_versoes, 'feed')
 
 class Comentario(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comentarios')
@@ -112,8 +396,41 @@ class Comentario(models.Model):
     # NOVO CAMPO: Aponta para outro comentário (Pai)
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='respostas')
 
+    # Árvore de respostas (qualquer profundidade), para carregar um fio inteiro sem subir pai por pai:
+    #   raiz: o comentário principal do fio (vazio nos principais);
+    #   caminho: os ids do principal até este, LARGURA_CAMINHO dígitos cada. Ordenar por caminho dá
+    #   o fio já na ordem de exibição (cada resposta logo depois do pai). Ver core/comentarios.py.
+    raiz = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='+', editable=False)
+    caminho = models.TextField(blank=True, editable=False)
+    profundidade = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    LARGURA_CAMINHO = 10
+
+    class Meta:
+        indexes = [
+            # Página de comentários principais do post, o mais novo primeiro
+            models.Index(
+                fields=['post', '-data_criacao', '-id'], condition=models.Q(parent__isnull=True),
+                name='comentario_principais_idx',
+            ),
+            # Respostas de um fio na ordem da árvore
+            models.Index(fields=['raiz', 'caminho'], name='comentario_fio_idx'),
+        ]
+
     def __str__(self):
         return f"Comentário de {self.autor.username} no post {self.post.id}"
+
+    def save(self, *args, **kwargs):
+        novo = self._state.adding
+        if novo and self.parent_id:
+            self.raiz_id = self.parent.raiz_id or self.parent_id
+            self.profundidade = self.parent.profundidade + 1
+        super().save(*args, **kwargs)
+        if novo and not self.caminho:
+            # O caminho termina no próprio id, que só existe depois do INSERT
+            pai = self.parent.caminho if self.parent_id else ''
+            self.caminho = f'{pai}{self.pk:0{self.LARGURA_CAMINHO}d}'
+            Comentario.objects.filter(pk=self.pk).update(caminho=self.caminho)
     
 
 # --- MODELO DE NOTIFICAÇÃO ---
@@ -124,5 +441,52 @@ class Notificacao(models.Model):
     lida = models.BooleanField(default=False)
     data_criacao = models.DateTimeField(auto_now_add=True)
 
+    # Agrupamento (ver core/notificacoes.py): avisos não lidos com a mesma chave viram um só,
+    # "ana e mais 4 pessoas comentaram no seu post"
+    tipo = models.CharField(max_length=20, blank=True, default='')
+    chave = models.CharField(max_length=100, blank=True, default='')
+    atores = models.JSONField(default=list, blank=True)  # usernames, o mais recente primeiro
+    total = models.PositiveIntegerField(default=1)  # quantas pessoas diferentes
+
+    class Meta:
+        indexes = [
+            # Avisos não lidos do painel, mais novos primeiro (índice parcial: só as não lidas)
+            models.Index(fields=['destinatario', '-data_criacao'], condition=models.Q(lida=False), name='notif_nao_lidas_idx'),
+            # Procura do aviso aberto para agrupar
+            models.Index(fields=['destinatario', 'chave'], condition=models.Q(lida=False), name='notif_agrupar_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notificação para {self.destinatario.username}: {self.mensagem}"
+
+
+# --- FILA DE TRABALHOS (ver core/fila.py) ---
+class Trabalho(models.Model):
+    PENDENTE = 'pendente'
+    EXECUTANDO = 'executando'
+    FEITO = 'feito'
+    FALHOU = 'falhou'
+    ESTADOS = [(PENDENTE, 'Pendente'), (EXECUTANDO, 'Executando'), (FEITO, 'Feito'), (FALHOU, 'Falhou')]
+
+    tipo = models.CharField(max_length=100)  # nome registrado com @fila.trabalho
+    dados = models.JSONField(default=dict, blank=True)  # argumentos (só ids e textos, nada de objetos)
+    estado = models.CharField(max_length=10, choices=ESTADOS, default=PENDENTE)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    max_tentativas = models.PositiveSmallIntegerField(default=5)
+    executar_em = models.DateTimeField(default=timezone.now)  # não roda antes disso (espera entre tentativas)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)  # quem pegou (host:pid)
+    erro = models.TextField(blank=True)  # traceback da última falha
+    criado_em = models.DateTimeField(auto_now_add=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # O worker procura o próximo pendente: índice parcial, só os pendentes
+            models.Index(fields=['executar_em', 'id'], condition=models.Q(estado='pendente'), name='trabalho_fila_idx'),
+            # Travados: executando há tempo demais (o worker morreu no meio)
+            models.Index(fields=['iniciado_em'], condition=models.Q(estado='executando'), name='trabalho_travados_idx'),
+        ]
+
     def __str__(self):
-        return f"Notificação para {self.destinatario.username}: {self.mensagem}"
\ No newline at end of file
+        return f"{self.tipo} #{self.id} ({self.estado})"
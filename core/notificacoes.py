@@ -0,0 +1,180 @@
+# core/notificacoes.py
+# --- ENVIO DE NOTIFICAÇÕES ---
+# As views não criam Notificacao direto: dizem quem deve ser avisado e o serviço
+#   1. junta os destinatários, tira repetidos e tira quem fez a ação;
+#   2. põe a gravação na fila (core/fila.py), na mesma transação da ação: deu rollback, não tem aviso.
+#      Descobrir os destinatários de um comentário (quem já comentou, mencionados) também vai para a fila;
+#   3. no worker, numa transação só, atualiza os avisos não lidos com a mesma chave e cria o resto
+#      com bulk_create, e publica os eventos SSE (bulk_create/bulk_update não disparam post_save).
+#      Com o pub/sub em memória (TEMPO_REAL_BACKEND) ou o cache locmem, o worker não alcança as abas abertas
+#      nem o cache do painel de quem atende as páginas: aí o trabalho roda no próprio processo, depois do
+#      commit (gravar_no_processo; o check lá embaixo avisa no manage.py check/runserver).
+#
+# Agrupamento: enquanto o aviso não é lido, novos eventos com a mesma chave
+# ("comentario:post:7") só atualizam a linha: "ana e mais 4 pessoas comentaram no seu post."
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import checks
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+
+from . import eventos, fila, painel, tempo_real
+from .models import Comentario, Notificacao
+
+# tipo -> (ícone, verbo no singular, verbo no plural)
+TIPOS = {
+    'resposta': ('💬', 'respondeu seu comentário', 'responderam seu comentário'),
+    'comentario': ('📢', 'comentou no seu post', 'comentaram no seu post'),
+    'mencao': ('📣', 'mencionou você', 'mencionaram você'),
+    'discussao': ('🗨️', 'comentou numa discussão que você participa', 'comentaram numa discussão que você participa'),
+    'tarefa': ('📝', 'passou uma tarefa para você', 'passaram tarefas para você'),
+}
+
+MAX_ATORES = 20  # nomes guardados por aviso (o total continua contando)
+
+Aviso = namedtuple('Aviso', 'destinatario_id tipo chave link')
+
+MENCAO = re.compile(r'(?<![\w@])@([\w.+-]+)')
+
+
+def montar_mensagem(tipo, atores, total):
+    icone, singular, plural = TIPOS[tipo]
+    if total <= 1:
+        return f"{icone} {atores[0]} {singular}."
+    if total == 2 and len(atores) >= 2:
+        return f"{icone} {atores[0]} e {atores[1]} {plural}."
+    return f"{icone} {atores[0]} e mais {total - 1} pessoas {plural}."
+
+
+def usuarios_mencionados(texto):
+    nomes = {nome.rstrip('.') for nome in MENCAO.findall(texto or '')}
+    if not nomes:
+        return []
+    return list(User.objects.filter(username__in=nomes).values_list('id', flat=True))
+
+
+def filtrar(ator_id, avisos):
+    """
+    Um aviso por destinatário, sem o próprio ator. Se o mesmo destinatário aparece mais de uma vez,
+    vale o primeiro (passe os avisos do mais importante para o menos importante).
+    """
+    por_destinatario = {}
+    for aviso in avisos:
+        if aviso.destinatario_id != ator_id and aviso.destinatario_id not in por_destinatario:
+            por_destinatario[aviso.destinatario_id] = aviso
+    return list(por_destinatario.values())
+
+
+def gravar_no_processo():
+    """True se os eventos SSE ou o cache só existem neste processo (o worker não teria como avisar ninguém)."""
+    return isinstance(tempo_real.backend(), tempo_real.BackendMemoria) or isinstance(cache, LocMemCache)
+
+
+def _enfileirar(nome, **dados):
+    fila.enfileirar(nome, no_processo=gravar_no_processo(), **dados)
+
+
+@checks.register()
+def verificar_fila(app_configs, **kwargs):
+    if getattr(settings, 'FILA_SINCRONA', False) or not gravar_no_processo():
+        return []
+    return [checks.Warning(
+        'FILA_SINCRONA=False com pub/sub em memória ou cache locmem: os avisos são gravados na própria '
+        'requisição, não pelo worker.',
+        hint='Use um TEMPO_REAL_BACKEND e um CACHE_BACKEND (redis/file) compartilhados entre os processos.',
+        id='core.W001',
+    )]
+
+
+def notificar(ator, avisos):
+    """Põe os avisos na fila (o trabalho notificacoes.gravar chama gravar())."""
+    avisos = filtrar(ator.id, avisos)
+    if avisos:
+        _enfileirar('notificacoes.gravar', nome_ator=ator.username, avisos=[list(a) for a in avisos])
+
+
+def gravar(nome_ator, avisos):
+    if not avisos:
+        return
+    agora = timezone.now()
+    with transaction.atomic():
+        abertos = {
+            (n.destinatario_id, n.chave): n
+            for n in Notificacao.objects.select_for_update().filter(
+                destinatario_id__in=[a.destinatario_id for a in avisos],
+                chave__in={a.chave for a in avisos},
+                lida=False,
+            )
+        }
+
+        novos, alterados = [], []
+        for aviso in avisos:
+            existente = abertos.get((aviso.destinatario_id, aviso.chave))
+            if existente is None:
+                novos.append(Notificacao(
+                    destinatario_id=aviso.destinatario_id,
+                    tipo=aviso.tipo,
+                    chave=aviso.chave,
+                    link=aviso.link,
+                    atores=[nome_ator],
+                    total=1,
+                    mensagem=montar_mensagem(aviso.tipo, [nome_ator], 1),
+                ))
+                continue
+
+            # Mesmo ator de novo não conta como outra pessoa, só vai para o começo da lista
+            if nome_ator not in existente.atores:
+                existente.total += 1
+            existente.atores = [nome_ator] + [n for n in existente.atores if n != nome_ator][:MAX_ATORES - 1]
+            existente.mensagem = montar_mensagem(existente.tipo, existente.atores, existente.total)
+            existente.data_criacao = agora  # sobe para o topo da lista do painel
+            alterados.append(existente)
+
+        Notificacao.objects.bulk_create(novos)
+        Notificacao.objects.bulk_update(alterados, ['atores', 'total', 'mensagem', 'data_criacao'])
+
+        # bulk_create/bulk_update não disparam sinais: avisa o SSE e limpa o painel na mão
+        for notificacao in novos + alterados:
+            eventos.avisar_notificacao(notificacao)
+        painel.invalidar(*[a.destinatario_id for a in avisos])
+
+
+# --- EVENTOS DO FÓRUM ---
+
+def notificar_comentario(comentario):
+    _enfileirar('notificacoes.comentario', comentario_id=comentario.id)
+
+
+def avisos_do_comentario(comentario):
+    """Avisos de um comentário novo: quem foi respondido, dono do post, mencionados e quem já comentou."""
+    post = comentario.post
+    link = f"/forum/post/{post.id}/"
+    avisos = []
+
+    if comentario.parent_id:
+        avisos.append(Aviso(comentario.parent.autor_id, 'resposta', f'resposta:comentario:{comentario.parent_id}', link))
+    avisos.append(Aviso(post.autor_id, 'comentario', f'comentario:post:{post.id}', link))
+    avisos += [Aviso(uid, 'mencao', f'mencao:post:{post.id}', link) for uid in usuarios_mencionados(comentario.conteudo)]
+
+    participantes = (
+        Comentario.objects.filter(post=post).exclude(pk=comentario.pk)
+        .order_by().values_list('autor_id', flat=True).distinct()
+    )
+    avisos += [Aviso(uid, 'discussao', f'discussao:post:{post.id}', link) for uid in participantes]
+
+    return filtrar(comentario.autor_id, avisos)
+
+
+def notificar_post(post):
+    _enfileirar('notificacoes.post', post_id=post.id)
+
+
+def avisos_do_post(post):
+    link = f"/forum/post/{post.id}/"
+    avisos = [Aviso(uid, 'mencao', f'mencao:post:{post.id}', link) for uid in usuarios_mencionados(post.conteudo)]
+    return filtrar(post.autor_id, avisos)
@@ -0,0 +1,95 @@
+# core/paginas.py
+# --- PÁGINAS E PEDAÇOS DE PÁGINA EM CACHE ---
+# Backend do cache: settings.CACHES (variável CACHE_BACKEND). Toda chave já sai com o KEY_PREFIX e a
+# VERSION de lá: subir CACHE_VERSION num deploy que muda templates descarta tudo o que foi renderizado antes.
+#   - Páginas públicas (home, quem somos): para visitante não logado o HTML é o mesmo para todo mundo,
+#     então vai inteiro para o cache (em_cache_para_visitantes). Logado não passa por aqui: o menu
+#     tem o nome e o token CSRF de cada um.
+#   - Cards de post do perfil público: {% cache %} por post (templates/perfil_publico.html), chaveado
+#     pela versão do post + contadores. Curtidas e comentários mudam likes_count/comentarios_count com F()
+#     (sem sinal), por isso os contadores entram direto na chave; o resto do post muda pelo save(), que
+#     dispara o sinal lá embaixo e troca a versão.
+# Versão = um número guardado no cache (versao:<nome>:<id>). Trocar a versão não apaga nada: as chaves
+# antigas simplesmente deixam de ser pedidas e expiram sozinhas.
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from .models import Post
+
+TEMPO_PAGINA = 600  # segundos
+TEMPO_VERSAO = 7 * 24 * 3600
+
+
+def _chave_versao(nome, id):
+    return f'versao:{nome}:{id}'
+
+
+def _nova():
+    # Nunca repete uma versão que já existiu (mesmo se a chave da versão sumiu do cache)
+    return time.time_ns()
+
+
+def versoes(nome, ids):
+    """{id: versão} numa ida só ao cache; quem ainda não tem versão ganha uma agora."""
+    chaves = {_chave_versao(nome, id): id for id in ids}
+    achadas = cache.get_many(chaves)
+    faltando = {chave: _nova() for chave in chaves if chave not in achadas}
+    if faltando:
+        cache.set_many(faltando, TEMPO_VERSAO)
+    return {chaves[chave]: versao for chave, versao in {**achadas, **faltando}.items()}
+
+
+def nova_versao(nome, *ids):
+    chaves = {_chave_versao(nome, id): _nova() for id in ids}
+    # Só depois do commit: antes disso outra requisição renderizaria os dados antigos com a versão nova
+    transaction.on_commit(lambda: cache.set_many(chaves, TEMPO_VERSAO))
+
+
+def anotar_versoes(posts):
+    """Põe post.versao em cada post da lista (chave dos fragmentos {% cache %} do card)."""
+    posts = list(posts)
+    por_id = versoes('post', [post.id for post in posts])
+    for post in posts:
+        post.versao = por_id[post.id]
+    return posts
+
+
+# --- PÁGINA INTEIRA PARA VISITANTES ---
+
+def _chave_da_pagina(request):
+    caminho = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'pagina:{caminho}'
+
+
+def em_cache_para_visitantes(view):
+    @wraps(view)
+    def envolvida(request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        chave = _chave_da_pagina(request)
+        html = cache.get(chave)
+        if html is not None:
+            return HttpResponse(html)
+
+        resposta = view(request, *args, **kwargs)
+        # Resposta que grava cookie (CSRF, sessão) é de um visitante só: não vai para o cache
+        if resposta.status_code == 200 and not resposta.streaming and not resposta.cookies:
+            cache.set(chave, resposta.content, TEMPO_PAGINA)
+        return resposta
+    return envolvida
+
+
+# --- SINAIS: POST SALVO, CARDS COM A VERSÃO NOVA ---
+
+@receiver(post_save, sender=Post)
+def post_salvo(sender, instance, created, **kwargs):
+    if not created:
+        nova_versao('post', instance.pk)
@@ -0,0 +1,100 @@
+# core/painel.py
+# --- PAINEL (DASHBOARD) EM CACHE ---
+# O painel é a página mais acessada depois do login. Montamos um "retrato" por usuário
+# com poucas consultas fixas e guardamos no cache (chave painel:<id>, TTL curto).
+# Qualquer mudança em Reuniao, Tarefa, Notificacao ou Mensagem de um usuário apaga o retrato dele
+# (sinais lá embaixo). Escritas em lote (update/bulk_*) não disparam sinais: quem faz chama invalidar().
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import agenda
+from .models import Mensagem, Notificacao, Reuniao, Tarefa, participantes_alterados
+
+TEMPO_CACHE = 120  # segundos
+MAX_AVISOS = 20
+
+
+def _chave(user_id):
+    return f'painel:{user_id}'
+
+
+def montar_painel(usuario, hoje):
+    """
+    5 consultas, não importa quantas reuniões/convidados: reuniões, convidados, tarefas, avisos e mensagens
+    (+1 para as exceções se hoje tem reunião ou tarefa que repete). Séries viram as ocorrências de hoje.
+    """
+    inicio = agenda.inicio_do_dia(hoje)
+    fim = inicio + timedelta(days=1)
+    reunioes = agenda.ocorrencias_de_reunioes(agenda.reunioes_do_usuario(usuario, inicio, fim), inicio, fim)
+
+    amanha = hoje + timedelta(days=1)
+    tarefas = agenda.ocorrencias_de_tarefas(agenda.tarefas_do_usuario(usuario, hoje, amanha), hoje, amanha)
+
+    avisos = Notificacao.objects.filter(destinatario=usuario, lida=False).order_by('-data_criacao')[:MAX_AVISOS]
+
+    return {
+        'hoje': hoje,
+        'reunioes': reunioes,
+        'tarefas': tarefas,
+        'avisos': list(avisos),
+        'notificacoes': Mensagem.objects.filter(destinatario=usuario, lido=False).count(),
+    }
+
+
+def painel_do_usuario(usuario):
+    hoje = timezone.now().date()
+    painel = cache.get(_chave(usuario.id))
+    # A data vai dentro do retrato: virou o dia, monta de novo
+    if painel is None or painel['hoje'] != hoje:
+        painel = montar_painel(usuario, hoje)
+        cache.set(_chave(usuario.id), painel, TEMPO_CACHE)
+    return painel
+
+
+def invalidar(*user_ids):
+    chaves = [_chave(uid) for uid in set(user_ids) if uid]
+    if chaves:
+        # Só depois do commit: antes disso outra requisição remontaria o retrato com os dados antigos
+        transaction.on_commit(lambda: cache.delete_many(chaves))
+
+
+# --- SINAIS ---
+
+def _envolvidos_na_reuniao(reuniao):
+    return [reuniao.solicitante_id, *reuniao.participacoes.values_list('usuario_id', flat=True)]
+
+
+@receiver(post_save, sender=Reuniao)
+def reuniao_salva(sender, instance, **kwargs):
+    invalidar(*_envolvidos_na_reuniao(instance))
+
+
+@receiver(pre_delete, sender=Reuniao)
+def reuniao_apagada(sender, instance, **kwargs):
+    # pre_delete: no post_delete as participações já foram apagadas junto
+    invalidar(*_envolvidos_na_reuniao(instance))
+
+
+@receiver(participantes_alterados)
+def convidados_alterados(sender, reuniao, usuarios, **kwargs):
+    invalidar(*usuarios)
+
+
+@receiver([post_save, post_delete], sender=Tarefa)
+def tarefa_alterada(sender, instance, **kwargs):
+    invalidar(instance.usuario_id, instance.criador_id)
+
+
+@receiver([post_save, post_delete], sender=Notificacao)
+def notificacao_alterada(sender, instance, **kwargs):
+    invalidar(instance.destinatario_id)
+
+
+@receiver([post_save, post_delete], sender=Mensagem)
+def mensagem_alterada(sender, instance, **kwargs):
+    invalidar(instance.destinatario_id)
@@ -0,0 +1,106 @@
+# core/presenca.py
+# --- QUEM ESTÁ ONLINE ---
+# Online = visto nos últimos ONLINE_POR. O "visto" vem de:
+#   - qualquer requisição de usuário logado (presenca_middleware, no settings.MIDDLEWARE);
+#   - o ping da conexão SSE (core/eventos.py): aba aberta parada também conta.
+# Marcar não toca no banco: vai para um dicionário do processo, no máximo uma vez a cada INTERVALO por usuário.
+# A cada DESCARGA segundos (e sempre antes de ler quem está online) os pendentes vão para Perfil.visto_em
+# num UPDATE só por lote (CASE user_id WHEN ... THEN ...). Se o processo cair, perde no máximo isso de presença.
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.decorators import sync_and_async_middleware
+
+from .models import Perfil
+
+INTERVALO = 60  # segundos entre dois registros do mesmo usuário
+DESCARGA = 30  # segundos entre duas gravações no banco
+ONLINE_POR = timedelta(minutes=5)
+MAX_ONLINE = 100
+LOTE = 500  # usuários por UPDATE
+
+_trava = threading.Lock()
+_registrados = {}  # user_id -> time.monotonic() do último registro
+_pendentes = {}  # user_id -> quando foi visto (ainda não gravado)
+_ultima_descarga = time.monotonic()
+
+
+def marcar(user_id):
+    """Registra que o usuário está aqui agora. Barato: só memória (e nada se já registrou há menos de INTERVALO)."""
+    agora = time.monotonic()
+    with _trava:
+        anterior = _registrados.get(user_id)
+        if anterior is not None and agora - anterior < INTERVALO:
+            return False
+        _registrados[user_id] = agora
+        _pendentes[user_id] = timezone.now()
+    return True
+
+
+def descarregar():
+    """Grava os pendentes em Perfil.visto_em. Devolve quantos usuários foram gravados."""
+    global _ultima_descarga
+    with _trava:
+        pendentes = list(_pendentes.items())
+        _pendentes.clear()
+        _ultima_descarga = time.monotonic()
+        # Quem não aparece há mais de INTERVALO não precisa mais do controle de repetição
+        for user_id in [u for u, quando in _registrados.items() if _ultima_descarga - quando >= INTERVALO]:
+            del _registrados[user_id]
+
+    for i in range(0, len(pendentes), LOTE):
+        lote = pendentes[i:i + LOTE]
+        Perfil.objects.filter(user_id__in=[user_id for user_id, _ in lote]).update(
+            visto_em=Case(
+                *[When(user_id=user_id, then=Value(visto)) for user_id, visto in lote],
+                output_field=DateTimeField(),
+            )
+        )
+    return len(pendentes)
+
+
+def hora_de_descarregar():
+    return bool(_pendentes) and time.monotonic() - _ultima_descarga >= DESCARGA
+
+
+def online_desde():
+    return timezone.now() - ONLINE_POR
+
+
+def perfis_online():
+    """Perfis vistos nos últimos ONLINE_POR, o mais recente primeiro (índice perfil_visto_idx)."""
+    return (
+        Perfil.objects.filter(visto_em__gte=online_desde(), user__is_active=True)
+        .select_related('user').order_by('-visto_em')
+    )
+
+
+def online(limite=MAX_ONLINE):
+    """Grava os pendentes deste processo e devolve quem está online (uma consulta)."""
+    descarregar()
+    return list(perfis_online()[:limite])
+
+
+@sync_and_async_middleware
+def presenca_middleware(get_response):
+    # Marca antes da view: quem abre a página de online já aparece nela
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            usuario = await request.auser()
+            if usuario.is_authenticated:
+                marcar(usuario.id)
+                if hora_de_descarregar():
+                    await sync_to_async(descarregar)()
+            return await get_response(request)
+    else:
+        def middleware(request):
+            if request.user.is_authenticated:
+                marcar(request.user.id)
+                if hora_de_descarregar():
+                    descarregar()
+            return get_response(request)
+    return middleware
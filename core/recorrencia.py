@@ -0,0 +1,99 @@
+# core/recorrencia.py
+# --- REPETIÇÃO DE REUNIÕES E TAREFAS ---
+# Uma série é uma linha só: a primeira ocorrência + a regra (frequencia, repetir_ate, repeticoes).
+# As ocorrências são calculadas na hora, só para a janela pedida (calendário, painel, API, feed),
+# e nunca viram linhas no banco. Só a ocorrência editada ou cancelada ganha uma linha de exceção
+# (ReuniaoExcecao/TarefaExcecao), identificada pela data original dela: em qualquer frequência
+# uma série tem no máximo uma ocorrência por dia.
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+SEMANAL = 'semanal'
+QUINZENAL = 'quinzenal'
+MENSAL = 'mensal'
+# O '' entra nas opções para o select mostrar "Não repete" em vez de "---------"
+FREQUENCIAS = [('', 'Não repete'), (SEMANAL, 'Toda semana'), (QUINZENAL, 'A cada 2 semanas'), (MENSAL, 'Todo mês')]
+
+# Mesma regra no formato do iCalendar (feed .ics)
+RRULE = {SEMANAL: 'FREQ=WEEKLY', QUINZENAL: 'FREQ=WEEKLY;INTERVAL=2', MENSAL: 'FREQ=MONTHLY'}
+
+MAX_REPETICOES = 104  # teto de qualquer série (dois anos de reunião semanal), mesmo sem fim informado
+DESLOCAMENTO_MAXIMO = timedelta(days=7)  # uma ocorrência editada muda no máximo isso de lugar
+
+
+def _dia(valor):
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+def _n_esima(base, frequencia, n):
+    # A n-ésima repetição (0 = a própria base), ou None se o mês não tem esse dia
+    if frequencia == MENSAL:
+        meses = base.month - 1 + n
+        try:
+            return base.replace(year=base.year + meses // 12, month=meses % 12 + 1)
+        except ValueError:
+            return None  # dia 31 em mês de 30 dias: pula o mês, como o RRULE faz
+    return base + timedelta(weeks=n * (2 if frequencia == QUINZENAL else 1))
+
+
+def datas(base, frequencia, repetir_ate=None, repeticoes=None):
+    """
+    Gerador com as datas originais da série, em ordem (`base` é a primeira).
+    Serve para date (tarefas) e datetime sem fuso; sem frequência, só a própria base.
+    """
+    if not frequencia:
+        yield base
+        return
+
+    limite = min(repeticoes or MAX_REPETICOES, MAX_REPETICOES)
+    n = geradas = 0
+    while geradas < limite:
+        atual = _n_esima(base, frequencia, n)
+        n += 1
+        if atual is None:
+            continue
+        if repetir_ate and _dia(atual) > repetir_ate:
+            return
+        geradas += 1
+        yield atual
+
+
+def inicios(inicio, frequencia, repetir_ate=None, repeticoes=None):
+    """Como datas(), para datetimes com fuso: repete na hora local (14h continua 14h depois de mudar o horário de verão)."""
+    local = timezone.localtime(inicio).replace(tzinfo=None)
+    for atual in datas(local, frequencia, repetir_ate, repeticoes):
+        yield timezone.make_aware(atual)
+
+
+def ultima(base, frequencia, repetir_ate=None, repeticoes=None):
+    """Última data original da série (a própria base se não repete)."""
+    gerador = inicios if isinstance(base, datetime) else datas
+    atual = base
+    for atual in gerador(base, frequencia, repetir_ate, repeticoes):
+        pass
+    return atual
+
+
+class Ocorrencia:
+    """
+    Uma ocorrência calculada: o objeto da série (Reuniao ou Tarefa) com as datas desta ocorrência
+    por cima. `original` é a data original na série (é ela que as exceções e os links usam).
+    O resto (titulo, id, solicitante, convidados_lista...) vem do próprio objeto.
+    """
+
+    def __init__(self, objeto, original, **datas_efetivas):
+        self.objeto = objeto
+        self.original = _dia(timezone.localtime(original) if isinstance(original, datetime) else original)
+        for campo, valor in datas_efetivas.items():
+            setattr(self, campo, valor)
+
+    def __getattr__(self, nome):
+        # Só chamado para o que não está na ocorrência. O painel guarda ocorrências no cache (pickle):
+        # ao desempacotar ainda não existe self.objeto, e sem essa checagem seria recursão infinita
+        if nome == 'objeto' or nome.startswith('__'):
+            raise AttributeError(nome)
+        return getattr(self.objeto, nome)
+
+    def __repr__(self):
+        return f'<Ocorrencia {self.objeto!r} em {self.original}>'
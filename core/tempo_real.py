@@ -0,0 +1,132 @@
+# core/tempo_real.py
+# --- PUB/SUB PARA OS EVENTOS EM TEMPO REAL ---
+# As views (código síncrono) publicam eventos num "canal"; as conexões abertas no ASGI
+# (WebSocket do chat, SSE de notificações) assinam os canais e recebem os eventos.
+#
+# O backend padrão é em memória, dentro do próprio processo ASGI. Para rodar com mais de
+# um processo, troque TEMPO_REAL_BACKEND no settings por um backend com a mesma interface
+# (assinar / publicar) que converse com um broker local.
+import asyncio
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+BACKEND_PADRAO = 'core.tempo_real.BackendMemoria'
+TAMANHO_FILA_PADRAO = 100
+
+
+def com_banco(func):
+    """
+    Versão assíncrona de `func` para as conexões longas (WebSocket, SSE): fecha conexões velhas com o banco
+    antes e depois de cada acesso, como o Django faz por request.
+    """
+    def envolvida(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(envolvida)
+
+
+def canal_conversa(id1, id2):
+    a, b = sorted((id1, id2))
+    return f'conversa:{a}:{b}'
+
+
+def canal_usuario(user_id):
+    return f'usuario:{user_id}'
+
+
+class Assinatura:
+    """
+    Fila de eventos de uma conexão. Pode receber eventos de qualquer thread;
+    quem consome é a corrotina dona da conexão, no loop em que a assinatura foi criada.
+    A fila é limitada: se o cliente não acompanha, os eventos mais antigos são descartados.
+    """
+
+    def __init__(self, backend, canais, tamanho_fila):
+        self.backend = backend
+        self.canais = tuple(canais)
+        self.loop = asyncio.get_running_loop()
+        self.fila = asyncio.Queue(maxsize=tamanho_fila)
+        self.descartados = 0
+
+    def entregar(self, evento):
+        try:
+            self.loop.call_soon_threadsafe(self._colocar, evento)
+        except RuntimeError:
+            # Loop já fechado: a conexão morreu sem cancelar a assinatura
+            self.cancelar()
+
+    def _colocar(self, evento):
+        if self.fila.full():
+            self.fila.get_nowait()
+            self.descartados += 1
+        self.fila.put_nowait(evento)
+
+    async def proximo(self, timeout=None):
+        """Próximo evento, ou None se passar `timeout` segundos sem nada."""
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def cancelar(self):
+        self.backend.remover(self)
+
+
+class BackendMemoria:
+    def __init__(self):
+        self._assinaturas = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def assinar(self, canais, tamanho_fila=TAMANHO_FILA_PADRAO):
+        assinatura = Assinatura(self, canais, tamanho_fila)
+        with self._lock:
+            for canal in assinatura.canais:
+                self._assinaturas[canal].add(assinatura)
+        return assinatura
+
+    def remover(self, assinatura):
+        with self._lock:
+            for canal in assinatura.canais:
+                self._assinaturas[canal].discard(assinatura)
+                if not self._assinaturas[canal]:
+                    del self._assinaturas[canal]
+
+    def publicar(self, canal, evento):
+        with self._lock:
+            destinos = list(self._assinaturas.get(canal, ()))
+        for assinatura in destinos:
+            assinatura.entregar(evento)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = import_string(getattr(settings, 'TEMPO_REAL_BACKEND', BACKEND_PADRAO))()
+    return _backend
+
+
+def assinar(*canais, tamanho_fila=TAMANHO_FILA_PADRAO):
+    return backend().assinar(canais, tamanho_fila)
+
+
+def publicar(canal, evento):
+    backend().publicar(canal, evento)
+
+
+def publicar_apos_commit(canal, evento):
+    # Ninguém deve ver um evento de algo que ainda pode sofrer rollback
+    transaction.on_commit(lambda: publicar(canal, evento))
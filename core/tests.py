@@ -1,3 +1,2135 @@
-from django.test import TestCase
+import asyncio
+import json
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import date, datetime, timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import F, Q
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from . import (
+    agenda, banco, busca, chat, comentarios, diretorio, eventos, fila, imagens, notificacoes, paginas, painel, presenca,
+    recorrencia, tempo_real, views, websocket,
+)
+from .models import Comentario, Conversa, Mensagem, Notificacao, Perfil, Post, Reuniao, ReuniaoExcecao, Tarefa, TarefaExcecao, Trabalho, Turma
+
+
+# --- ÍNDICES: O PLANO DAS CONSULTAS QUENTES TEM QUE USAR ELES ---
+# Se alguém mudar a forma da consulta (ou o índice) e o banco voltar a varrer a tabela, quebra aqui.
+class IndicesConsultasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+        cls.bia = User.objects.create_user('bia', password='senha-teste')
+
+    def assertUsaIndice(self, queryset, nome_indice):
+        plano = queryset.explain()
+        self.assertIn(nome_indice, plano, f'O plano não usa {nome_indice}:\n{plano}')
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Os planos esperados são os do SQLite.')
+
+    def test_mensagens_nao_lidas_do_painel(self):
+        qs = Mensagem.objects.filter(destinatario=self.ana, lido=False)
+        self.assertUsaIndice(qs, 'msg_nao_lidas_idx')
+
+    def test_marcar_conversa_como_lida(self):
+        qs = Mensagem.objects.filter(remetente=self.bia, destinatario=self.ana, lido=False)
+        self.assertUsaIndice(qs, 'msg_nao_lidas_idx')
+
+    def test_historico_da_conversa(self):
+        qs = Mensagem.objects.filter(
+            Q(remetente=self.ana, destinatario=self.bia) | Q(remetente=self.bia, destinatario=self.ana),
+            id__lt=1000,
+        ).order_by('-id')
+        self.assertUsaIndice(qs, 'msg_conversa_idx')
+
+    def test_avisos_nao_lidos(self):
+        qs = Notificacao.objects.filter(destinatario=self.ana, lida=False).order_by('-data_criacao')
+        self.assertUsaIndice(qs, 'notif_nao_lidas_idx')
+
+    def test_tarefas_do_dia(self):
+        qs = Tarefa.objects.filter(Q(usuario=self.ana) | Q(criador=self.ana), data_prazo=timezone.now().date())
+        self.assertUsaIndice(qs, 'tarefa_usuario_prazo_idx')
+        self.assertUsaIndice(qs, 'tarefa_criador_prazo_idx')
+
+    def test_tarefas_no_periodo_com_series(self):
+        hoje = timezone.now().date()
+        qs = agenda.tarefas_do_usuario(self.ana, hoje, hoje + timedelta(days=30))
+        for indice in ('tarefa_usuario_prazo_idx', 'tarefa_criador_prazo_idx', 'tarefa_usuario_serie_idx', 'tarefa_criador_serie_idx'):
+            self.assertUsaIndice(qs, indice)
+
+    def test_reunioes_por_inicio(self):
+        agora = timezone.now()
+        qs = Reuniao.objects.filter(solicitante=self.ana, data_inicio__gte=agora).order_by('data_inicio')
+        self.assertUsaIndice(qs, 'reuniao_solic_inicio_idx')
+        qs = Reuniao.objects.filter(data_inicio__range=(agora, agora + timedelta(days=7)))
+        self.assertUsaIndice(qs, 'reuniao_inicio_idx')
+
+    def test_minhas_reunioes_no_periodo(self):
+        agora = timezone.now()
+        qs = agenda.reunioes_do_usuario(self.ana, agora, agora + timedelta(days=30))
+        self.assertUsaIndice(qs, 'participante_agenda_idx')
+        self.assertUsaIndice(qs, 'participante_serie_idx')  # séries que começaram antes da janela
+        self.assertNotIn('DISTINCT', str(qs.query))
+
+    def test_ocupacao_dos_participantes(self):
+        # O começo limitado por DURACAO_MAXIMA vira intervalo no índice
+        agora = timezone.now()
+        qs = agenda.participacoes_ocupadas([self.ana.id, self.bia.id], agora, agora + timedelta(hours=1))
+        self.assertUsaIndice(qs, 'participante_agenda_idx')
+        self.assertUsaIndice(qs, 'participante_serie_idx')
+
+    def test_feed_recentes(self):
+        qs = Post.objects.order_by('-data_criacao', '-id')[:20]
+        self.assertUsaIndice(qs, 'post_recentes_idx')
+
+    def test_feed_mais_curtidos(self):
+        qs = Post.objects.order_by('-likes_count', '-data_criacao', '-id')[:20]
+        self.assertUsaIndice(qs, 'post_mais_curtidos_idx')
+
+    def test_proximo_trabalho_da_fila(self):
+        qs = (
+            Trabalho.objects.filter(estado=Trabalho.PENDENTE, executar_em__lte=timezone.now())
+            .order_by('executar_em', 'id').values_list('pk', flat=True)[:1]
+        )
+        self.assertUsaIndice(qs, 'trabalho_fila_idx')
+
+    def test_trabalhos_travados(self):
+        qs = Trabalho.objects.filter(estado=Trabalho.EXECUTANDO, iniciado_em__lt=timezone.now() - timedelta(minutes=15))
+        self.assertUsaIndice(qs, 'trabalho_travados_idx')
+
+    def test_diretorio_por_tipo(self):
+        qs = diretorio.perfis(tipo='Mentor')[:24]
+        self.assertUsaIndice(qs, 'perfil_tipo_idx')
+        self.assertNotIn('TEMP B-TREE', qs.explain())  # a ordem por id já vem do índice
+
+    def test_diretorio_filtrado(self):
+        for campo in diretorio.FILTROS:
+            with self.subTest(campo=campo):
+                self.assertUsaIndice(diretorio.perfis(tipo='Estudante', **{campo: 'Recife'})[:24], f'perfil_{campo}_idx')
+                self.assertUsaIndice(diretorio.perfis(**{campo: 'Recife'})[:24], f'perfil_{campo}_idx')
+
+    def test_quem_esta_online(self):
+        qs = presenca.perfis_online()[:100]
+        self.assertUsaIndice(qs, 'perfil_visto_idx')
+        self.assertNotIn('TEMP B-TREE', qs.explain())
+
+    def test_comentarios_principais(self):
+        qs = Comentario.objects.filter(post_id=1, parent=None).order_by('-data_criacao', '-id')[:21]
+        self.assertUsaIndice(qs, 'comentario_principais_idx')
+        self.assertNotIn('TEMP B-TREE', qs.explain())
+
+    def test_usuarios_por_prefixo(self):
+        qs = diretorio.usuarios_por_prefixo('an')
+        for coluna in diretorio.COLUNAS_NOME:
+            self.assertUsaIndice(qs, f'usuario_{coluna}_lower_idx')
+
+    def test_respostas_dos_fios(self):
+        # respostas_dos_fios() em si não passa pelo explain() (o filtro na janela vira subconsulta): esta é a parte de dentro
+        qs = Comentario.objects.filter(raiz_id__in=[1, 2]).order_by('raiz_id', 'caminho')
+        self.assertUsaIndice(qs, 'comentario_fio_idx')
+        qs = Comentario.objects.filter(raiz_id=1, caminho__gt='0000000001').order_by('caminho')[:50]
+        self.assertUsaIndice(qs, 'comentario_fio_idx')
+        self.assertNotIn('TEMP B-TREE', qs.explain())
+
+
+# --- COMUNIDADE: O NÚMERO DE CONSULTAS NÃO CRESCE COM O NÚMERO DE USUÁRIOS ---
+
+class ComunidadeConsultasTests(TestCase):
+
+    def criar_usuarios(self, inicio, quantidade):
+        for i in range(inicio, inicio + quantidade):
+            usuario = User.objects.create_user(f'usuario{i}')
+            usuario.perfil.tipo = 'Mentor' if i % 3 == 0 else 'Estudante'
+            usuario.perfil.cidade = 'Recife' if i % 2 else 'Natal'
+            usuario.perfil.save()
+
+    def consultas_da_pagina(self, url):
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        return len(contexto.captured_queries)
+
+    def test_comunidade_em_consultas_constantes(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('ana'))
+        self.criar_usuarios(0, 6)
+        self.client.get('/comunidade/')  # facetas no cache
+        poucos = self.consultas_da_pagina('/comunidade/?cidade=Recife')
+        self.criar_usuarios(6, 60)
+        self.assertEqual(self.consultas_da_pagina('/comunidade/?cidade=Recife'), poucos)
+        self.assertEqual(self.consultas_da_pagina('/api/diretorio/?tipo=Mentor'), self.consultas_da_pagina('/api/diretorio/?tipo=Mentor&pagina=2'))
+
+
+# --- COMENTÁRIOS: A PÁGINA DO POST NÃO FAZ UMA CONSULTA POR COMENTÁRIO OU RESPOSTA ---
+
+class ComentariosConsultasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana')
+        cls.post = Post.objects.create(autor=cls.ana, conteudo='Primeiro post')
+
+    def setUp(self):
+        self.client.force_login(self.ana)
+
+    def comentar(self, quantidade, profundidade):
+        # `quantidade` fios, cada um uma corrente de `profundidade` respostas e mais uma resposta no principal
+        for i in range(quantidade):
+            autor = User.objects.create_user(f'autor{Comentario.objects.count()}')
+            pai = Comentario.objects.create(post=self.post, autor=autor, conteudo=f'fio {i}')
+            Comentario.objects.create(post=self.post, autor=self.ana, conteudo='oi', parent=pai)
+            for _ in range(profundidade):
+                pai = Comentario.objects.create(post=self.post, autor=autor, conteudo='resposta', parent=pai)
+
+    def consultas_da_pagina(self, url):
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        return len(contexto.captured_queries)
+
+    def test_arvore(self):
+        principal = Comentario.objects.create(post=self.post, autor=self.ana, conteudo='a')
+        resposta = Comentario.objects.create(post=self.post, autor=self.ana, conteudo='b', parent=principal)
+        neta = Comentario.objects.create(post=self.post, autor=self.ana, conteudo='c', parent=resposta)
+        self.assertEqual((neta.raiz_id, neta.profundidade), (principal.id, 2))
+        self.assertTrue(neta.caminho.startswith(resposta.caminho))
+
+        fios, tem_mais = comentarios.fios(self.post.id)
+        self.assertFalse(tem_mais)
+        self.assertEqual([c.id for c in fios[0].filhos], [resposta.id])
+        self.assertEqual([c.id for c in fios[0].filhos[0].filhos], [neta.id])
+
+    def test_post_em_consultas_constantes(self):
+        self.comentar(2, 1)
+        poucos = self.consultas_da_pagina(f'/forum/post/{self.post.id}/')
+        self.comentar(30, 6)
+        self.assertEqual(self.consultas_da_pagina(f'/forum/post/{self.post.id}/'), poucos)
+
+    def test_carregar_mais(self):
+        self.comentar(comentarios.COMENTARIOS_POR_PAGINA + 1, comentarios.RESPOSTAS_POR_FIO)
+        resposta = self.client.get(f'/forum/post/{self.post.id}/')
+        cursor = resposta.context['proximo_cursor']
+        fio = resposta.context['comentarios'][0]
+        self.assertTrue(cursor)
+        self.assertEqual(fio.restantes, 1)
+
+        dados = self.client.get(f'/forum/post/{self.post.id}/comentarios/', {'cursor': cursor}).json()
+        self.assertIsNone(dados['proximo_cursor'])
+        self.assertEqual(dados['html'].count('class="comment-card"'), 1)
+
+        dados = self.client.get(f'/comentario/{fio.id}/respostas/', {'depois': fio.depois}).json()
+        self.assertIsNone(dados['depois'])
+        self.assertEqual(len(dados['blocos']), 1)
+
+        self.assertEqual(self.client.get(f'/forum/post/{self.post.id}/comentarios/', {'cursor': 'x'}).status_code, 400)
+
+
+# --- SELETORES DE USUÁRIO: SÓ O QUE FOI ESCOLHIDO VAI PARA A PÁGINA ---
+
+class SeletorUsuariosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = User.objects.create_user('mentor', first_name='Marta')
+        cls.mentor.perfil.tipo = 'Mentor'
+        cls.mentor.perfil.save()
+        cls.ana = User.objects.create_user('ana.souza', first_name='Ana', last_name='Souza')
+        cls.andre = User.objects.create_user('andre', first_name='André', last_name='Lima')
+        cls.bruno = User.objects.create_user('bruno', first_name='Bruno', last_name='Andrade')
+        for i in range(40):
+            User.objects.create_user(f'aluno{i:02d}')
+
+    def setUp(self):
+        self.client.force_login(self.mentor)
+
+    def buscar(self, **params):
+        resposta = self.client.get('/api/usuarios/', params)
+        self.assertEqual(resposta.status_code, 200)
+        return [u['username'] for u in resposta.json()['usuarios']]
+
+    def test_busca_por_comeco_do_nome(self):
+        self.assertEqual(self.buscar(q='AN'), ['ana.souza', 'andre', 'bruno'])  # username, nome ou sobrenome
+        self.assertEqual(self.buscar(q='ana sou'), ['ana.souza'])
+        self.assertEqual(self.buscar(q='nd'), [])  # só começo, não "contém"
+        self.assertEqual(self.buscar(q='ma'), [])  # quem busca não aparece
+        self.assertEqual(self.buscar(q=''), [])
+        self.assertEqual(self.client.get('/api/usuarios/', {'q': 'a', 'tipo': 'Admin'}).status_code, 400)
+
+    def test_pagina_nao_lista_todo_mundo(self):
+        resposta = self.client.get('/nova-reuniao/')
+        self.assertNotContains(resposta, 'aluno00')
+        self.assertContains(resposta, 'data-autocompletar="/api/usuarios/"')
+
+        resposta = self.client.get('/nova-tarefa/')
+        self.assertNotContains(resposta, 'aluno00')
+        self.assertContains(resposta, 'data-tipo="Estudante"')
+
+    def test_escolhidos_e_validacao(self):
+        dados = {
+            'titulo': 'Mentoria', 'convidados': [self.ana.id, self.andre.id],
+            'data_inicio': '2030-01-10T10:00', 'data_fim': '2030-01-10T09:00',
+        }
+        resposta = self.client.post('/nova-reuniao/', dados)
+        # Voltou com erro: os escolhidos continuam marcados, e só eles estão na página
+        self.assertContains(resposta, f'<option value="{self.ana.id}" selected>Ana Souza (@ana.souza)</option>', html=True)
+        self.assertNotContains(resposta, 'bruno')
+
+        resposta = self.client.post('/nova-reuniao/', {**dados, 'convidados': [self.ana.id, 999999]})
+        self.assertIn('convidados', resposta.context['form'].errors)
+        resposta = self.client.post('/nova-reuniao/', {**dados, 'convidados': [self.mentor.id]})
+        self.assertIn('convidados', resposta.context['form'].errors)
+
+
+# --- TAREFAS EM LOTE: UM INSERT E UM TRABALHO DE AVISOS, NÃO UM POR ALUNO ---
+
+class TarefasEmLoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = User.objects.create_user('mentor')
+        cls.mentor.perfil.tipo = 'Mentor'
+        cls.mentor.perfil.save()
+        cls.alunos = [User.objects.create_user(f'aluno{i:02d}') for i in range(30)]
+
+    def setUp(self):
+        self.client.force_login(self.mentor)
+
+    def passar(self, **dados):
+        return self.client.post('/tarefas/varios-alunos/', {'titulo': 'Leitura', 'data_prazo': '2030-03-01', **dados})
+
+    def test_alunos_turma_e_todos(self):
+        # Escolhidos um a um, salvos como turma
+        resposta = self.passar(alunos=[a.id for a in self.alunos[:3]], salvar_turma='Manhã')
+        self.assertRedirects(resposta, '/calendario/')
+        turma = Turma.objects.get(mentor=self.mentor, nome='Manhã')
+        self.assertEqual(turma.alunos.count(), 3)
+
+        # Pela turma
+        self.passar(turmas=[turma.id], titulo='Exercícios')
+        self.assertEqual(Tarefa.objects.filter(titulo='Exercícios', criador=self.mentor).count(), 3)
+
+        # "Todos os meus alunos": quem está nas minhas turmas ou já recebeu tarefa minha
+        Tarefa.objects.create(usuario=self.alunos[10], criador=self.mentor, titulo='Antiga', data_prazo='2030-01-01')
+        self.passar(todos='on', titulo='Prova')
+        self.assertEqual(
+            set(Tarefa.objects.filter(titulo='Prova').values_list('usuario_id', flat=True)),
+            {a.id for a in self.alunos[:3]} | {self.alunos[10].id},
+        )
+
+        resposta = self.passar()
+        self.assertTrue(resposta.context['form'].non_field_errors())
+
+    def test_consultas_nao_crescem_com_os_alunos(self):
+        def consultas(alunos):
+            with CaptureQueriesContext(connection) as contexto:
+                self.passar(alunos=[a.id for a in alunos])
+            return len(contexto.captured_queries)
+
+        self.assertEqual(consultas(self.alunos[:2]), consultas(self.alunos))
+        self.assertEqual(Tarefa.objects.count(), 32)
+        # Um trabalho na fila com um aviso por aluno
+        trabalho = Trabalho.objects.filter(tipo='notificacoes.gravar').latest('id')
+        self.assertEqual(len(trabalho.dados['avisos']), 30)
+
+    def test_so_mentor(self):
+        self.client.force_login(self.alunos[0])
+        self.assertRedirects(self.client.get('/tarefas/varios-alunos/'), '/nova-tarefa/')
+
+    def test_concluir_e_excluir_em_lote(self):
+        aluno = self.alunos[0]
+        minhas = [Tarefa.objects.create(usuario=aluno, criador=self.mentor, titulo=f't{i}', data_prazo='2030-01-01') for i in range(3)]
+        do_aluno = Tarefa.objects.create(usuario=aluno, criador=aluno, titulo='dele', data_prazo='2030-01-01')
+        # Valores que não são id (ou não cabem na coluna) são ignorados, sem erro 500
+        ids = [t.id for t in minhas] + [do_aluno.id, '9' * 30, '²', 'x']
+
+        resposta = self.client.post('/tarefas/em-lote/', {'acao': 'concluir', 'tarefas': ids})
+        self.assertRedirects(resposta, '/calendario/', fetch_redirect_response=False)
+        self.assertEqual(Tarefa.objects.filter(concluida=True).count(), 3)  # a do aluno não é do mentor
+
+        self.client.post('/tarefas/em-lote/', {'acao': 'excluir', 'tarefas': ids})
+        self.assertEqual(list(Tarefa.objects.values_list('id', flat=True)), [do_aluno.id])
+
+
+# --- PERFIL: NASCE UMA VEZ COM O USUÁRIO, E SALVAR O USUÁRIO NÃO GRAVA O PERFIL ---
+# Antes cada login (UPDATE de last_login) regravava o perfil: escrita à toa e lock no SQLite.
+# A única escrita em core_perfil que pode aparecer no meio é a descarga da presença (só visto_em,
+# em lote, core/presenca.py), que não é do perfil em si: fica de fora da conta.
+
+class PerfilEscritasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', email='ana@exemplo.com', password='senha-teste')
+
+    def consultas_no_perfil(self, contexto):
+        return [
+            q['sql'] for q in contexto.captured_queries
+            if 'core_perfil' in q['sql'] and not q['sql'].startswith('UPDATE "core_perfil" SET "visto_em"')
+        ]
+
+    def escritas_no_perfil(self, contexto):
+        return [sql.split()[0] for sql in self.consultas_no_perfil(contexto) if sql.startswith(('INSERT', 'UPDATE', 'DELETE'))]
+
+    def test_login_nao_toca_no_perfil(self):
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.client.post('/login/', {'username': 'ana', 'password': 'senha-teste'})
+        self.assertEqual(resposta.status_code, 302)
+        self.assertEqual(self.consultas_no_perfil(contexto), [])
+
+    def test_cadastro_cria_um_perfil(self):
+        with CaptureQueriesContext(connection) as contexto:
+            bia = User.objects.create_user('bia', password='senha-teste')
+        self.assertEqual(self.escritas_no_perfil(contexto), ['INSERT'])
+        self.assertEqual(Perfil.objects.filter(user=bia).count(), 1)
+
+        # Salvar o usuário de novo não mexe no perfil
+        with CaptureQueriesContext(connection) as contexto:
+            bia.first_name = 'Bia'
+            bia.save()
+        self.assertEqual(self.escritas_no_perfil(contexto), [])
+
+    def test_cadastro_pelo_admin(self):
+        admin = User.objects.create_superuser('admin', password='senha-teste')
+        self.client.force_login(admin)
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.client.post('/admin/auth/user/add/', {
+                'username': 'caio', 'password1': 'uma-senha-boa-123', 'password2': 'uma-senha-boa-123',
+                'usable_password': 'true',
+            })
+        self.assertEqual(resposta.status_code, 302)
+        self.assertEqual(self.escritas_no_perfil(contexto), ['INSERT'])
+        self.assertEqual(Perfil.objects.filter(user__username='caio').count(), 1)
+
+    def test_meu_perfil(self):
+        self.client.force_login(self.ana)
+        with CaptureQueriesContext(connection) as contexto:
+            self.client.get('/perfil/')
+        self.assertEqual(self.escritas_no_perfil(contexto), [])
+
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.client.post('/perfil/', {
+                'username': 'ana', 'email': 'ana@exemplo.com', 'cidade': 'Recife', 'foto': '',
+            })
+        self.assertEqual(resposta.status_code, 302)
+        # Uma gravação só: a do formulário (o sinal não regrava o perfil ao salvar o usuário)
+        self.assertEqual(self.escritas_no_perfil(contexto), ['UPDATE'])
+        self.assertEqual(Perfil.objects.get(user=self.ana).cidade, 'Recife')
+
+
+# --- BANCO SOB ESCRITAS CONCORRENTES ---
+# Várias threads (cada uma com a sua conexão) mandando mensagens na mesma conversa ao mesmo tempo:
+# nenhuma pode receber "database is locked" e nenhuma mensagem pode se perder.
+# No SQLite isso depende dos PRAGMAs de core/banco.py e da transação IMMEDIATE (settings.DATABASES);
+# o banco de teste é um arquivo, senão as threads não teriam conexões de verdade.
+
+class BancoConcorrenciaTests(TransactionTestCase):
+    THREADS = 8
+    MENSAGENS_POR_THREAD = 25
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('banco de teste em memória: as threads não teriam conexões próprias')
+        self.ana = User.objects.create_user('ana', password='senha-teste')
+        self.bia = User.objects.create_user('bia', password='senha-teste')
+
+    def test_pragmas_do_sqlite(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('só no SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0].upper(), banco.PRAGMAS_SQLITE['journal_mode'])
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], banco.PRAGMAS_SQLITE['busy_timeout'])
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_mensagens_de_varias_threads(self):
+        largada = threading.Barrier(self.THREADS)
+        erros = []
+
+        def mandar(numero):
+            try:
+                largada.wait()
+                for i in range(self.MENSAGENS_POR_THREAD):
+                    remetente, destinatario = (self.ana, self.bia) if i % 2 else (self.bia, self.ana)
+                    chat.enviar_mensagem(remetente, destinatario, f'thread {numero}, mensagem {i}')
+            except OperationalError as erro:
+                erros.append(erro)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=mandar, args=(n,)) for n in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(erros, [])
+        total = self.THREADS * self.MENSAGENS_POR_THREAD
+        self.assertEqual(Mensagem.objects.count(), total)
+        # Os contadores da conversa (UPDATE ... + 1 de cada mensagem) também não perderam nenhuma
+        conversa = Conversa.objects.get()
+        self.assertEqual(conversa.nao_lidas_a + conversa.nao_lidas_b, total)
+        self.assertEqual(conversa.ultima_mensagem_id, Mensagem.objects.latest('id').id)
+
+
+# --- CACHE: PÁGINAS PÚBLICAS E CARDS DO PERFIL (core/paginas.py) ---
+
+class CachePaginasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+        cls.post = Post.objects.create(autor=cls.ana, conteudo='primeira versão')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pagina_publica_para_visitante(self):
+        primeira = self.client.get('/quem-somos/')
+        self.assertTrue(primeira.templates)
+        segunda = self.client.get('/quem-somos/')
+        self.assertEqual(segunda.templates, [])  # veio do cache, nada renderizado
+        self.assertEqual(segunda.content, primeira.content)
+
+        # Logado não usa (nem estraga) o cache dos visitantes: o menu é de cada um
+        self.client.force_login(self.ana)
+        self.assertContains(self.client.get('/quem-somos/'), 'ana')
+        self.assertRedirects(self.client.get('/'), '/painel/', fetch_redirect_response=False)
+        self.client.logout()
+        self.assertEqual(self.client.get('/quem-somos/').content, primeira.content)
+
+    def test_card_do_perfil_segue_a_versao_do_post(self):
+        url = f'/usuario/{self.ana.username}/'
+        self.assertContains(self.client.get(url), 'primeira versão')
+
+        # UPDATE direto não dispara sinal: o card continua vindo do cache
+        Post.objects.filter(pk=self.post.pk).update(conteudo='mudou por fora')
+        self.assertContains(self.client.get(url), 'primeira versão')
+
+        # save() troca a versão do post (depois do commit) e o card é renderizado de novo
+        self.post.conteudo = 'segunda versão'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        self.assertContains(self.client.get(url), 'segunda versão')
+
+    def test_card_do_perfil_mostra_curtidas_novas(self):
+        url = f'/usuario/{self.ana.username}/'
+        self.assertContains(self.client.get(url), '❤️ 0')
+        bia = User.objects.create_user('bia', password='senha-teste')
+        self.client.force_login(bia)
+        self.client.post(f'/api/forum/post/{self.post.pk}/like/')
+        self.assertContains(self.client.get(url), '❤️ 1')
+
+    def test_versoes_numa_ida_ao_cache(self):
+        outro = Post.objects.create(autor=self.ana, conteudo='outro')
+        antes = paginas.versoes('post', [self.post.pk, outro.pk])
+        self.assertEqual(paginas.versoes('post', [self.post.pk, outro.pk]), antes)
+        with self.captureOnCommitCallbacks(execute=True):
+            paginas.nova_versao('post', outro.pk)
+        depois = paginas.versoes('post', [self.post.pk, outro.pk])
+        self.assertEqual(depois[self.post.pk], antes[self.post.pk])
+        self.assertNotEqual(depois[outro.pk], antes[outro.pk])
+
+
+# --- EVENTOS (SSE): SÓ PELO ASGI ---
+
+class EventosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+
+    def setUp(self):
+        self.client.force_login(self.ana)
+
+    def test_wsgi_nao_abre_o_fluxo(self):
+        # O client de teste é WSGI: nada de gerador infinito segurando a thread
+        resposta = self.client.get('/eventos/')
+        self.assertEqual(resposta.status_code, 204)
+        self.assertFalse(resposta.streaming)
+        self.assertEqual(eventos._conexoes_total, 0)
+
+    def test_paginas_so_ligam_o_fluxo_no_asgi(self):
+        resposta = self.client.get('/painel/')
+        self.assertNotContains(resposta, 'data-eventos-url')
+        self.assertNotContains(resposta, 'js/eventos.js')
+
+        with override_settings(SERVIDOR_ASGI=True):
+            resposta = self.client.get('/painel/')
+        self.assertContains(resposta, 'data-eventos-url="/eventos/"')
+        self.assertContains(resposta, 'js/eventos.js')
+
+    @override_settings(SSE_MAX_POR_USUARIO=2, SSE_MAX_CONEXOES=3)
+    def test_limite_de_conexoes(self):
+        with mock.patch.dict(eventos._conexoes, clear=True), mock.patch.object(eventos, '_conexoes_total', 0):
+            self.assertTrue(eventos.reservar_conexao(1))
+            self.assertTrue(eventos.reservar_conexao(1))
+            self.assertFalse(eventos.reservar_conexao(1))  # terceira aba do mesmo usuário
+            self.assertTrue(eventos.reservar_conexao(2))
+            self.assertFalse(eventos.reservar_conexao(3))  # servidor cheio
+            self.assertEqual(eventos._conexoes_total, 3)
+
+            eventos.liberar_conexao(1)
+            self.assertTrue(eventos.reservar_conexao(1))
+            for user_id in (1, 1, 2):
+                eventos.liberar_conexao(user_id)
+            self.assertEqual((eventos._conexoes, eventos._conexoes_total), ({}, 0))
+
+    @override_settings(SSE_MAX_POR_USUARIO=0)
+    async def test_asgi_no_limite_responde_429(self):
+        cliente = AsyncClient()
+        await cliente.aforce_login(self.ana)
+        resposta = await cliente.get('/eventos/')
+        self.assertEqual(resposta.status_code, 429)
+        self.assertEqual(resposta['Retry-After'], '30')
+
+
+# Aba aberta e parada: só o ping do fluxo SSE mostra que o usuário está ali, e nenhum request chega ao processo
+# para gravar a presença. O próprio ping grava os pendentes (numa thread: TransactionTestCase).
+
+class PresencaNoPingTests(TransactionTestCase):
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('banco de teste em memória: a thread do sync_to_async não teria conexão própria')
+        self.ana = User.objects.create_user('ana', password='senha-teste')
+        # Memória da presença limpa (o id da ana pode repetir entre os testes) e ping a cada 10ms
+        for patcher in (
+            mock.patch.dict(presenca._registrados, clear=True),
+            mock.patch.dict(presenca._pendentes, clear=True),
+            mock.patch.object(eventos, 'INTERVALO_PING', 0.01),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def pings(self, vezes):
+        async def ler():
+            fluxo = eventos.fluxo_do_usuario(self.ana.id)
+            eventos.reservar_conexao(self.ana.id)
+            try:
+                self.assertEqual(await anext(fluxo), 'retry: 5000\n\n')
+                self.assertTrue((await anext(fluxo)).startswith('event: estado'))
+                for _ in range(vezes):
+                    self.assertEqual(await anext(fluxo), ': ping\n\n')
+            finally:
+                await fluxo.aclose()
+        self.loop.run_until_complete(ler())
+
+    def test_ping_grava_a_presenca(self):
+        with mock.patch.object(presenca, 'DESCARGA', 0):
+            self.pings(1)
+        self.assertIsNotNone(Perfil.objects.get(user=self.ana).visto_em)
+        self.assertEqual(presenca._pendentes, {})
+        self.assertEqual(eventos._conexoes_total, 0)
+
+    def test_ping_espera_a_descarga(self):
+        with mock.patch.object(presenca, 'DESCARGA', 3600):
+            self.pings(2)
+        # Marcado só na memória: vai para o banco na próxima descarga
+        self.assertIsNone(Perfil.objects.get(user=self.ana).visto_em)
+        self.assertIn(self.ana.id, presenca._pendentes)
+        presenca.descarregar()
+        self.assertIsNotNone(Perfil.objects.get(user=self.ana).visto_em)
+
+
+# --- FLUXO SSE DE VERDADE: eventos publicados chegam na ordem, "mensagens" repetidas viram um só ---
+
+class FluxoDoUsuarioTests(TransactionTestCase):
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('banco de teste em memória: a thread do sync_to_async não teria conexão própria')
+        self.ana = User.objects.create_user('ana', password='senha-teste')
+        self.bia = User.objects.create_user('bia', password='senha-teste')
+        Mensagem.objects.create(remetente=self.bia, destinatario=self.ana, conteudo='oi')
+        Notificacao.objects.create(destinatario=self.ana, mensagem='antiga')
+        for patcher in (
+            mock.patch.dict(presenca._registrados, clear=True),
+            mock.patch.dict(presenca._pendentes, clear=True),
+            mock.patch.object(presenca, 'DESCARGA', 3600),
+            mock.patch.object(eventos, 'INTERVALO_PING', 0.05),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def ler(self, passos):
+        """Abre o fluxo da ana e roda `passos(fluxo)`; devolve o que ela recebeu depois do "retry"."""
+        async def rodar():
+            eventos.reservar_conexao(self.ana.id)
+            fluxo = eventos.fluxo_do_usuario(self.ana.id)
+            try:
+                self.assertEqual(await anext(fluxo), 'retry: 5000\n\n')
+                return await passos(fluxo)
+            finally:
+                await fluxo.aclose()
+        recebidos = self.loop.run_until_complete(rodar())
+        self.assertEqual(eventos._conexoes_total, 0)
+        return recebidos
+
+    def evento(self, texto):
+        match = re.fullmatch(r'event: (\w+)\ndata: (.*)\n\n', texto)
+        self.assertIsNotNone(match, texto)
+        return match[1], json.loads(match[2])
+
+    def test_estado_inicial(self):
+        async def passos(fluxo):
+            return [await anext(fluxo)]
+        recebidos = self.ler(passos)
+        self.assertEqual(self.evento(recebidos[0]), ('estado', {'mensagens': 1, 'avisos': 1}))
+
+    def test_notificacao_depois_do_commit(self):
+        async def passos(fluxo):
+            recebidos = [await anext(fluxo)]
+            # Criada noutra thread, em autocommit: o on_commit publica no canal da ana
+            notificacao = await sync_to_async(Notificacao.objects.create)(
+                destinatario=self.ana, mensagem='bia comentou', link='/post/1/',
+            )
+            recebidos.append(await anext(fluxo))
+            return notificacao, recebidos
+        notificacao, recebidos = self.ler(passos)
+        self.assertEqual(self.evento(recebidos[1]), ('notificacao', {
+            'id': notificacao.id, 'mensagem': 'bia comentou', 'link': '/post/1/', 'avisos': 2,
+        }))
+
+    def test_notificacao_em_transacao_desfeita_nao_chega(self):
+        def criar_e_desfazer():
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Notificacao.objects.create(destinatario=self.ana, mensagem='some')
+                raise RuntimeError
+
+        async def passos(fluxo):
+            await anext(fluxo)
+            await sync_to_async(criar_e_desfazer)()
+            return [await anext(fluxo)]
+        self.assertEqual(self.ler(passos), [': ping\n\n'])
+
+    def test_mensagens_repetidas_viram_um_evento(self):
+        async def passos(fluxo):
+            recebidos = [await anext(fluxo)]
+            await sync_to_async(Mensagem.objects.create)(remetente=self.bia, destinatario=self.ana, conteudo='de novo')
+            canal = tempo_real.canal_usuario(self.ana.id)
+            for evento in (
+                {'tipo': 'mensagens'},
+                {'tipo': 'mensagens'},
+                {'tipo': 'comentario', 'comentario': {'id': 7, 'post_id': 3, 'conteudo': 'legal'}},
+                {'tipo': 'mensagens'},
+            ):
+                tempo_real.publicar(canal, evento)
+            for _ in range(3):
+                recebidos.append(await anext(fluxo))
+            return recebidos
+        recebidos = self.ler(passos)
+        self.assertEqual(self.evento(recebidos[1]), ('mensagens', {'mensagens': 2}))
+        self.assertEqual(self.evento(recebidos[2]), ('comentario', {'id': 7, 'post_id': 3, 'conteudo': 'legal'}))
+        self.assertEqual(recebidos[3], ': ping\n\n')  # o terceiro "mensagens" foi junto com o primeiro
+
+
+# --- FILA DE TRABALHOS (core/fila.py) ---
+
+def _trabalho_que_falha(titulo):
+    Turma.objects.create(mentor=User.objects.get(username='mentor'), nome=titulo)
+    raise RuntimeError('deu ruim')
+
+
+def _trabalho_que_funciona(titulo):
+    Turma.objects.create(mentor=User.objects.get(username='mentor'), nome=titulo)
+
+
+@override_settings(FILA_SINCRONA=False)
+class FilaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user('mentor')
+
+    def setUp(self):
+        registrados = mock.patch.dict(fila.TRABALHOS, {'teste.falha': _trabalho_que_falha, 'teste.ok': _trabalho_que_funciona})
+        registrados.start()
+        self.addCleanup(registrados.stop)
+
+    def liberar(self, item):
+        # Pula a espera entre tentativas
+        Trabalho.objects.filter(pk=item.pk).update(executar_em=timezone.now())
+
+    def test_espera_cresce_ate_o_maximo(self):
+        self.assertEqual([fila._espera(n) for n in (1, 2, 3)], [timedelta(seconds=30), timedelta(minutes=1), timedelta(minutes=2)])
+        self.assertEqual(fila._espera(20), fila.ESPERA_MAXIMA)
+
+    def test_nova_tentativa_e_falha_de_vez(self):
+        item = fila.enfileirar('teste.falha', max_tentativas=2, titulo='x')
+
+        pego = fila.pegar('w1')
+        self.assertEqual((pego.pk, pego.estado, pego.worker, pego.tentativas), (item.pk, Trabalho.EXECUTANDO, 'w1', 1))
+        with self.assertLogs('core.fila', 'WARNING'):
+            self.assertFalse(fila.executar(pego))
+
+        pego.refresh_from_db()
+        self.assertEqual(pego.estado, Trabalho.PENDENTE)
+        self.assertIn('RuntimeError: deu ruim', pego.erro)
+        self.assertAlmostEqual(pego.executar_em - timezone.now(), fila._espera(1), delta=timedelta(seconds=5))
+        self.assertFalse(Turma.objects.exists())  # o que o trabalho gravou antes de falhar foi desfeito
+        self.assertIsNone(fila.pegar('w1'))  # ainda esperando
+
+        self.liberar(item)
+        pego = fila.pegar('w2')
+        self.assertEqual(pego.tentativas, 2)
+        with self.assertLogs('core.fila', 'ERROR'):
+            self.assertFalse(fila.executar(pego))
+        pego.refresh_from_db()
+        self.assertEqual(pego.estado, Trabalho.FALHOU)
+        self.liberar(item)
+        self.assertIsNone(fila.pegar('w1'))  # falhou de vez: não volta para a fila
+
+    def test_executar_com_sucesso(self):
+        item = fila.enfileirar('teste.ok', titulo='Manhã')
+        self.assertTrue(fila.executar(fila.pegar('w1')))
+        item.refresh_from_db()
+        self.assertEqual(item.estado, Trabalho.FEITO)
+        self.assertIsNotNone(item.concluido_em)
+        self.assertTrue(Turma.objects.filter(nome='Manhã').exists())
+
+    def test_dois_workers_disputando(self):
+        primeiro = fila.enfileirar('teste.ok', titulo='a')
+        segundo = fila.enfileirar('teste.ok', titulo='b')
+        self.assertEqual(fila._marcar(primeiro.pk, 'w1'), 1)
+        self.assertEqual(fila._marcar(primeiro.pk, 'w2'), 0)  # o UPDATE condicional não pega duas vezes
+
+        # Entre o SELECT do pegar e o UPDATE, outro worker leva o primeiro da fila: pega o seguinte
+        Trabalho.objects.filter(pk=primeiro.pk).update(estado=Trabalho.PENDENTE, worker='')
+        marcar = fila._marcar
+
+        def outro_worker_chega_antes(pk, worker):
+            if pk == primeiro.pk:
+                marcar(pk, 'outro')
+            return marcar(pk, worker)
+
+        with mock.patch.object(fila, '_marcar', side_effect=outro_worker_chega_antes):
+            pego = fila.pegar('w1')
+        self.assertEqual(pego.pk, segundo.pk)
+        self.assertEqual(Trabalho.objects.get(pk=primeiro.pk).worker, 'outro')
+
+    def test_recuperar_travados(self):
+        travado = fila.enfileirar('teste.ok', titulo='a')
+        rodando = fila.enfileirar('teste.ok', titulo='b')
+        for item in (travado, rodando):
+            fila._marcar(item.pk, 'w1')
+        Trabalho.objects.filter(pk=travado.pk).update(iniciado_em=timezone.now() - fila.TEMPO_MAXIMO - timedelta(minutes=1))
+
+        self.assertEqual(fila.recuperar_travados(), 1)
+        self.assertEqual(Trabalho.objects.get(pk=travado.pk).estado, Trabalho.PENDENTE)
+        self.assertEqual(Trabalho.objects.get(pk=rodando.pk).estado, Trabalho.EXECUTANDO)
+        self.assertEqual(fila.pegar('w2').pk, travado.pk)
+
+
+# O comando fecha conexões velhas a cada volta (close_old_connections): fora da transação do TestCase
+@override_settings(FILA_SINCRONA=False)
+class RodarFilaTests(TransactionTestCase):
+
+    def setUp(self):
+        User.objects.create_user('mentor')
+        registrados = mock.patch.dict(fila.TRABALHOS, {'teste.falha': _trabalho_que_falha, 'teste.ok': _trabalho_que_funciona})
+        registrados.start()
+        self.addCleanup(registrados.stop)
+
+    def rodar(self, *args):
+        saida = StringIO()
+        call_command('rodar_fila', *args, stdout=saida)
+        return saida.getvalue()
+
+    def test_uma_vez(self):
+        for titulo in ('a', 'b'):
+            fila.enfileirar('teste.ok', titulo=titulo)
+        fila.enfileirar('teste.falha', titulo='c')
+        fila.enfileirar('teste.ok', atraso=timedelta(hours=1), titulo='depois')
+        travado = fila.enfileirar('teste.ok', titulo='travado')
+        fila._marcar(travado.pk, 'morreu')
+        Trabalho.objects.filter(pk=travado.pk).update(iniciado_em=timezone.now() - fila.TEMPO_MAXIMO - timedelta(minutes=1))
+
+        with self.assertLogs('core.fila', 'WARNING'):
+            saida = self.rodar('--uma-vez')
+
+        self.assertIn('1 trabalho(s) travado(s) de volta na fila.', saida)
+        self.assertIn('RuntimeError: deu ruim', saida)
+        self.assertIn('3 trabalho(s) feito(s), 1 falha(s).', saida)
+        self.assertEqual(set(Turma.objects.values_list('nome', flat=True)), {'a', 'b', 'travado'})
+        self.assertEqual(fila.resumo(), {Trabalho.PENDENTE: 2, Trabalho.EXECUTANDO: 0, Trabalho.FEITO: 3, Trabalho.FALHOU: 0})
+
+        self.assertEqual(self.rodar('--status').splitlines(), ['pendente: 2', 'executando: 0', 'feito: 3', 'falhou: 0'])
+
+
+# --- AVISOS: GRAVADOS PELA FILA, ENTREGUES NAS ABAS ABERTAS ---
+# Com o pub/sub em memória e o cache locmem (o padrão), o trabalho roda neste processo depois do commit:
+# no worker, o evento iria para o pub/sub do worker e ninguém receberia.
+
+class AvisosAoVivoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+        cls.bia = User.objects.create_user('bia', password='senha-teste')
+
+    def setUp(self):
+        cache.clear()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def assinar(self, user_id):
+        async def assinar():
+            return tempo_real.assinar(tempo_real.canal_usuario(user_id))
+        assinatura = self.loop.run_until_complete(assinar())
+        self.addCleanup(assinatura.cancelar)
+        return assinatura
+
+    def test_trabalho_chega_no_assinante(self):
+        assinatura = self.assinar(self.bia.id)
+        self.assertEqual(painel.painel_do_usuario(self.bia)['avisos'], [])  # retrato no cache
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notificacoes.notificar(self.ana, [notificacoes.Aviso(self.bia.id, 'mencao', 'mencao:post:1', '/forum/post/1/')])
+
+        self.assertEqual(Trabalho.objects.get(tipo='notificacoes.gravar').estado, Trabalho.FEITO)
+        evento = self.loop.run_until_complete(assinatura.proximo(timeout=1))
+        self.assertEqual(evento['tipo'], 'notificacao')
+        self.assertEqual(evento['notificacao']['mensagem'], '📣 ana mencionou você.')
+        # E o painel da bia saiu do cache deste processo
+        self.assertEqual(len(painel.painel_do_usuario(self.bia)['avisos']), 1)
+
+    def test_check_avisa_da_fila_sem_worker_de_verdade(self):
+        with override_settings(FILA_SINCRONA=False):
+            self.assertEqual([aviso.id for aviso in notificacoes.verificar_fila(None)], ['core.W001'])
+        with override_settings(FILA_SINCRONA=True):
+            self.assertEqual(notificacoes.verificar_fila(None), [])
+
+
+# --- FEED DO FÓRUM: PÁGINAS POR KEYSET ---
+
+class FeedPaginasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+        autores = [User.objects.create_user(f'autor{i}') for i in range(3)]
+        inicio = timezone.now() - timedelta(days=1)
+        # Datas repetidas de propósito: o desempate tem que ser pelo id
+        Post.objects.bulk_create([
+            Post(autor=autores[i % 3], conteudo=f'post {i}', data_criacao=inicio + timedelta(minutes=i // 2), likes_count=i % 4)
+            for i in range(45)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.ana)
+
+    def pagina(self, ordem='', cursor=None):
+        params = {'ordem': ordem}
+        if cursor:
+            params['cursor'] = cursor
+        resposta = self.client.get('/forum/mais/', params)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def ids_do_html(self, html):
+        return [int(pk) for pk in re.findall(r'data-post-id="(\d+)"', html)]
+
+    def test_percorre_tudo_sem_repetir(self):
+        for ordem, chave in [('', lambda p: (p.data_criacao, p.id)), ('curtidos', lambda p: (p.likes_count, p.data_criacao, p.id))]:
+            vistos, cursor = [], None
+            while True:
+                dados = self.pagina(ordem, cursor)
+                vistos += self.ids_do_html(dados['html'])
+                cursor = dados['proximo_cursor']
+                if not cursor:
+                    break
+            esperado = [p.id for p in sorted(Post.objects.all(), key=chave, reverse=True)]
+            self.assertEqual(vistos, esperado, ordem)
+
+    def test_consultas_constantes_por_pagina(self):
+        for ordem in ['', 'curtidos']:
+            cursor = self.pagina(ordem)['proximo_cursor']
+            # sessão + usuário + a página (autor, perfil e "curti?" na mesma consulta)
+            with self.assertNumQueries(3):
+                dados = self.pagina(ordem, cursor)
+            self.assertEqual(len(self.ids_do_html(dados['html'])), 20)
+
+    def test_cursor_com_tipos_errados(self):
+        cursor = views._codificar_cursor
+        invalidos = [
+            ('', [1, 2]),
+            ('', ['2024-01-01T00:00:00+00:00', [1]]),
+            ('', ['2024-01-01T00:00:00+00:00', True]),
+            ('', ['ontem', 1]),
+            ('', {'id': 1}),
+            ('curtidos', ['2024-01-01T00:00:00+00:00', 1]),
+            ('curtidos', ['3', '2024-01-01T00:00:00+00:00', 1]),
+        ]
+        for ordem, valores in invalidos:
+            resposta = self.client.get('/forum/mais/', {'ordem': ordem, 'cursor': cursor(valores)})
+            self.assertEqual(resposta.status_code, 400, valores)
+        self.assertEqual(self.client.get('/forum/mais/', {'cursor': 'não é base64'}).status_code, 400)
+
+
+# --- CAIXA DE ENTRADA (Conversa) ANDA JUNTO COM AS MENSAGENS ---
+
+class CaixaDeEntradaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+        cls.bia = User.objects.create_user('bia', password='senha-teste')
+
+    def assertNumaTransacao(self, contexto, *tabelas):
+        # Dentro do TestCase o atomic() vira SAVEPOINT: tudo tem que estar entre ele e o RELEASE dele
+        sqls = [q['sql'] for q in contexto.captured_queries]
+        self.assertTrue(sqls[0].startswith('SAVEPOINT'), sqls[0])
+        self.assertEqual(sqls[-1], 'RELEASE ' + sqls[0])
+        for tabela in tabelas:
+            self.assertTrue(any(f'"{tabela}"' in sql for sql in sqls[1:-1]), tabela)
+
+    def conversa(self):
+        return Conversa.objects.get(usuario_a=self.ana, usuario_b=self.bia)
+
+    def test_enviar_e_ler(self):
+        with CaptureQueriesContext(connection) as contexto:
+            primeira = chat.enviar_mensagem(self.ana, self.bia, 'oi')
+        self.assertNumaTransacao(contexto, 'core_mensagem', 'core_conversa')
+        segunda = chat.enviar_mensagem(self.ana, self.bia, 'tudo bem?')
+
+        conversa = self.conversa()
+        self.assertEqual((conversa.nao_lidas_a, conversa.nao_lidas_b), (0, 2))
+        self.assertEqual(conversa.ultima_mensagem_id, segunda.id)
+        self.assertEqual(conversa.ultimo_trecho, 'tudo bem?')
+        self.assertNotEqual(primeira.id, segunda.id)
+
+        with CaptureQueriesContext(connection) as contexto:
+            self.assertEqual(chat.marcar_como_lidas(self.bia, self.ana), 2)
+        self.assertNumaTransacao(contexto, 'core_mensagem', 'core_conversa')
+        self.assertEqual(self.conversa().nao_lidas_b, 0)
+        self.assertFalse(Mensagem.objects.filter(lido=False).exists())
+
+    def test_migracao_preenche_as_conversas(self):
+        caio = User.objects.create_user('caio')
+        chat.enviar_mensagem(self.ana, self.bia, 'oi')
+        chat.enviar_mensagem(self.bia, self.ana, 'olá')
+        chat.enviar_mensagem(self.bia, self.ana, 'e aí?')
+        chat.enviar_mensagem(caio, self.ana, 'bom dia')
+        esperado = list(Conversa.objects.order_by('id').values_list(
+            'usuario_a', 'usuario_b', 'ultima_mensagem', 'ultimo_trecho', 'nao_lidas_a', 'nao_lidas_b'))
+
+        # Banco de antes da caixa de entrada: só as mensagens
+        Conversa.objects.all().delete()
+        migracao = import_module('core.migrations.0006_conversa')
+        apps = MigrationLoader(connection).project_state(('core', '0006_conversa')).apps
+        migracao.preencher_conversas(apps, SimpleNamespace(connection=connection))
+
+        self.assertCountEqual(Conversa.objects.values_list(
+            'usuario_a', 'usuario_b', 'ultima_mensagem', 'ultimo_trecho', 'nao_lidas_a', 'nao_lidas_b'), esperado)
+
+    def test_comando_reconstruir_conversas(self):
+        caio = User.objects.create_user('caio')
+        chat.enviar_mensagem(self.ana, self.bia, 'oi')
+        chat.enviar_mensagem(self.bia, self.ana, 'olá ' * 50)  # trecho cortado em TAMANHO_TRECHO
+        chat.enviar_mensagem(caio, self.bia, 'bom dia')
+        chat.marcar_como_lidas(self.bia, caio)
+        campos = ('usuario_a', 'usuario_b', 'ultima_mensagem', 'ultima_data', 'ultimo_trecho', 'nao_lidas_a', 'nao_lidas_b')
+        esperado = list(Conversa.objects.values_list(*campos))
+
+        # Caixa de entrada estragada: contador errado e uma conversa sumida
+        Conversa.objects.filter(usuario_a=self.ana).update(nao_lidas_a=7, ultimo_trecho='?')
+        Conversa.objects.exclude(usuario_a=self.ana).delete()
+
+        saida = StringIO()
+        call_command('reconstruir_conversas', stdout=saida)
+        self.assertIn('2 conversa(s) reconstruída(s).', saida.getvalue())
+        self.assertCountEqual(Conversa.objects.values_list(*campos), esperado)
+        self.assertTrue(self.conversa().ultimo_trecho.endswith('…'))
+        self.assertEqual(len(self.conversa().ultimo_trecho), chat.TAMANHO_TRECHO)
+
+
+# --- CHAT EM TEMPO REAL: O PROTOCOLO WEBSOCKET DO ASGI (core/websocket.py) ---
+# Conexões de mentira: receive/send são filas. TransactionTestCase porque sessão, envio e leitura
+# rodam em threads do sync_to_async (com_banco), cada uma com a sua conexão.
+
+class ConexaoDeTeste:
+
+    def __init__(self, caminho, cookie=None, origem='http://testserver'):
+        cabecalhos = {'origin': origem, 'cookie': cookie}
+        self.scope = {
+            'type': 'websocket', 'path': caminho,
+            'headers': [(nome.encode(), valor.encode()) for nome, valor in cabecalhos.items() if valor],
+        }
+        self.entrada = asyncio.Queue()
+        self.saida = asyncio.Queue()
+
+    async def conectar(self):
+        self.tarefa = asyncio.ensure_future(websocket.rotear_websocket(self.scope, self.entrada.get, self.saida.put))
+        await self.entrada.put({'type': 'websocket.connect'})
+        return await self.recebido()
+
+    async def recebido(self):
+        return await asyncio.wait_for(self.saida.get(), timeout=5)
+
+    async def evento(self):
+        mensagem = await self.recebido()
+        return json.loads(mensagem['text'])
+
+    async def mandar(self, **dados):
+        await self.entrada.put({'type': 'websocket.receive', 'text': json.dumps(dados)})
+
+    async def desconectar(self):
+        await self.entrada.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.tarefa, timeout=5)
+
+
+class ChatWebSocketTests(TransactionTestCase):
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('banco de teste em memória: as threads do sync_to_async não teriam conexões próprias')
+        self.ana = User.objects.create_user('ana', password='senha-teste')
+        self.bia = User.objects.create_user('bia', password='senha-teste')
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def cookie(self, usuario):
+        # Um Client por usuário: logar outro no mesmo Client apagaria a sessão do primeiro
+        cliente = Client()
+        cliente.force_login(usuario)
+        return f'{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+    def rodar(self, cenario):
+        self.loop.run_until_complete(cenario())
+
+    def test_handshake_e_recusas(self):
+        cookie = self.cookie(self.ana)
+        casos = [
+            ('/ws/chat/bia/', {'cookie': cookie}, 'websocket.accept', None),
+            ('/ws/chat/bia/', {}, 'websocket.close', websocket.FECHAR_NAO_AUTORIZADO),  # sem sessão
+            ('/ws/chat/bia/', {'cookie': f'{settings.SESSION_COOKIE_NAME}=nao-existe'}, 'websocket.close', websocket.FECHAR_NAO_AUTORIZADO),
+            ('/ws/chat/bia/', {'cookie': cookie, 'origem': 'http://outro-site.com'}, 'websocket.close', websocket.FECHAR_NAO_AUTORIZADO),
+            ('/ws/chat/bia/', {'cookie': cookie, 'origem': None}, 'websocket.close', websocket.FECHAR_NAO_AUTORIZADO),
+            ('/ws/chat/ninguem/', {'cookie': cookie}, 'websocket.close', websocket.FECHAR_NAO_ENCONTRADO),
+            ('/ws/chat/ana/', {'cookie': cookie}, 'websocket.close', websocket.FECHAR_NAO_ENCONTRADO),  # consigo mesma
+            ('/ws/outra-coisa/', {'cookie': cookie}, 'websocket.close', websocket.FECHAR_NAO_ENCONTRADO),
+        ]
+
+        async def cenario():
+            for caminho, opcoes, tipo, codigo in casos:
+                conexao = ConexaoDeTeste(caminho, **opcoes)
+                if caminho.startswith('/ws/chat/'):
+                    resposta = await conexao.conectar()
+                else:
+                    # Rota desconhecida: fecha antes mesmo de ler o connect
+                    conexao.tarefa = asyncio.ensure_future(websocket.rotear_websocket(conexao.scope, conexao.entrada.get, conexao.saida.put))
+                    resposta = await conexao.recebido()
+                self.assertEqual(resposta['type'], tipo, (caminho, opcoes))
+                self.assertEqual(resposta.get('code'), codigo, (caminho, opcoes))
+                if tipo == 'websocket.accept':
+                    await conexao.desconectar()
+                else:
+                    await asyncio.wait_for(conexao.tarefa, timeout=5)
+        self.rodar(cenario)
+
+    def test_mensagem_e_leitura_chegam_nos_dois_lados(self):
+        ana = ConexaoDeTeste('/ws/chat/bia/', self.cookie(self.ana))
+        bia = ConexaoDeTeste('/ws/chat/ana/', self.cookie(self.bia))
+
+        async def cenario():
+            self.assertEqual((await ana.conectar())['type'], 'websocket.accept')
+            self.assertEqual((await bia.conectar())['type'], 'websocket.accept')
+
+            await ana.mandar(tipo='mensagem', conteudo='  oi, bia  ')
+            para_bia, para_ana = await bia.evento(), await ana.evento()
+            self.assertEqual(para_bia['tipo'], 'mensagem')
+            self.assertEqual((para_bia['mensagem']['conteudo'], para_bia['mensagem']['minha']), ('oi, bia', False))
+            self.assertTrue(para_ana['mensagem']['minha'])
+
+            # Vazio, JSON quebrado e tipo desconhecido são ignorados; o "lido" seguinte vem normalmente
+            await ana.mandar(tipo='mensagem', conteudo='   ')
+            await ana.entrada.put({'type': 'websocket.receive', 'text': 'não é json'})
+            await ana.mandar(tipo='outro')
+            await bia.mandar(tipo='lido')
+            lidas = await ana.evento()
+            self.assertEqual(lidas, {'tipo': 'lidas', 'leitor_id': self.bia.id, 'lidas_ate': para_bia['mensagem']['id']})
+
+            await ana.desconectar()
+            await bia.desconectar()
+        self.rodar(cenario)
+
+        self.assertEqual(list(Mensagem.objects.values_list('conteudo', 'lido')), [('oi, bia', True)])
+
+    def test_desconectar_cancela_a_assinatura(self):
+        ana = ConexaoDeTeste('/ws/chat/bia/', self.cookie(self.ana))
+        canal = tempo_real.canal_conversa(self.ana.id, self.bia.id)
+        assinaturas = tempo_real.backend()._assinaturas
+
+        async def cenario():
+            await ana.conectar()
+            self.assertEqual(len(assinaturas[canal]), 1)
+            await ana.desconectar()
+        self.rodar(cenario)
+
+        self.assertTrue(ana.tarefa.done())
+        self.assertNotIn(canal, assinaturas)
+        # Mensagem depois de desconectar não vai para ninguém (nem dá erro)
+        chat.enviar_mensagem(self.bia, self.ana, 'ainda aí?')
+        self.assertTrue(ana.saida.empty())
+
+@mock.patch.object(views, 'MENSAGENS_POR_PAGINA', 3)
+class MensagensApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+        cls.bia = User.objects.create_user('bia', password='senha-teste')
+        cls.mensagens = [
+            chat.enviar_mensagem(*((cls.ana, cls.bia) if i % 2 == 0 else (cls.bia, cls.ana)), f'm{i}')
+            for i in range(5)
+        ]
+        cls.ids = [m.id for m in cls.mensagens]
+
+    def api(self, usuario, outro='bia', **params):
+        self.client.force_login(usuario)
+        resposta = self.client.get(f'/api/chat/{outro}/mensagens/', params)
+        self.assertEqual(resposta.status_code, 200)
+        dados = resposta.json()
+        dados['ids'] = [m['id'] for m in dados.pop('mensagens')]
+        return dados
+
+    def test_ultimas_e_anteriores(self):
+        dados = self.api(self.ana)
+        self.assertEqual(dados['ids'], self.ids[2:])  # sempre em ordem crescente
+        self.assertTrue(dados['tem_mais'])
+
+        dados = self.api(self.ana, antes=self.ids[2])
+        self.assertEqual(dados['ids'], self.ids[:2])
+        self.assertFalse(dados['tem_mais'])
+
+    def test_depois_para_o_polling(self):
+        dados = self.api(self.ana, depois=0)
+        self.assertEqual(dados['ids'], self.ids[:3])  # do começo, de 3 em 3
+        self.assertTrue(dados['tem_mais'])
+        dados = self.api(self.ana, depois=self.ids[2])
+        self.assertEqual(dados['ids'], self.ids[3:])
+        self.assertFalse(dados['tem_mais'])
+        self.assertEqual(self.api(self.ana, depois=self.ids[-1])['ids'], [])
+
+    def test_leitura_e_lidas_ate(self):
+        # Nada lido ainda do que a ana mandou
+        self.assertIsNone(self.api(self.ana)['lidas_ate'])
+        self.assertFalse(Mensagem.objects.filter(destinatario=self.ana, lido=False).exists())  # abrir a conversa lê
+
+        # "Carregar anteriores" não marca como lido
+        self.api(self.bia, 'ana', antes=self.ids[1])
+        self.assertEqual(Mensagem.objects.filter(destinatario=self.bia, lido=False).count(), 3)
+
+        self.api(self.bia, 'ana', depois=self.ids[-1])
+        self.assertEqual(self.api(self.ana)['lidas_ate'], self.ids[4])
+
+    def test_enviar(self):
+        self.client.force_login(self.ana)
+        resposta = self.client.post('/api/chat/bia/mensagens/', {'conteudo': '  nova  '})
+        self.assertEqual(resposta.status_code, 201)
+        mensagem = resposta.json()['mensagem']
+        self.assertEqual((mensagem['conteudo'], mensagem['minha'], mensagem['lido']), ('nova', True, False))
+        self.assertEqual(Conversa.objects.get().ultima_mensagem_id, mensagem['id'])
+
+        self.assertEqual(self.client.post('/api/chat/bia/mensagens/', {'conteudo': '   '}).status_code, 400)
+        self.assertEqual(self.client.post('/api/chat/ninguem/mensagens/', {'conteudo': 'oi'}).status_code, 404)
+
+    def test_cursor_invalido(self):
+        self.client.force_login(self.ana)
+        for params in ({'antes': 'abc'}, {'depois': '1.5'}, {'depois': '-1'}, {'antes': '9' * 30}, {'depois': '9' * 30}):
+            resposta = self.client.get('/api/chat/bia/mensagens/', params)
+            self.assertEqual(resposta.status_code, 400, params)
+            self.assertEqual(resposta.json(), {'erro': 'Cursor inválido.'})
+
+
+# --- CURTIDAS: CONTADOR CERTO SEM CARREGAR A LISTA DE QUEM CURTIU ---
+
+class CurtidasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+        cls.bia = User.objects.create_user('bia', password='senha-teste')
+        cls.post = Post.objects.create(autor=cls.ana, conteudo='um post')
+
+    def setUp(self):
+        self.client.force_login(self.bia)
+        self.url = f'/api/forum/post/{self.post.pk}/like/'
+
+    def curtir(self, acao=None):
+        resposta = self.client.post(self.url, {'acao': acao} if acao else {})
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def assertContador(self, total):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, total)
+        self.assertEqual(self.post.likes.count(), total)
+
+    def test_alternar(self):
+        self.assertEqual(self.curtir(), {'curtido': True, 'likes': 1})
+        self.assertContador(1)
+        self.assertEqual(self.curtir(), {'curtido': False, 'likes': 0})
+        self.assertContador(0)
+
+    def test_acao_explicita_nao_desfaz(self):
+        # Clique repetido com acao=curtir (duas abas, rede lenta) não descurte nem conta duas vezes
+        self.assertEqual(self.curtir('curtir'), {'curtido': True, 'likes': 1})
+        self.assertEqual(self.curtir('curtir'), {'curtido': True, 'likes': 1})
+        self.assertContador(1)
+        self.assertEqual(self.curtir('descurtir'), {'curtido': False, 'likes': 0})
+        self.assertEqual(self.curtir('descurtir'), {'curtido': False, 'likes': 0})
+        self.assertContador(0)
+
+    def test_curtida_que_ja_existia(self):
+        # A curtida entrou por outra requisição entre o DELETE e o INSERT: a constraint única segura
+        # (IntegrityError) e o contador não sobe de novo
+        Post.likes.through.objects.create(post=self.post, user=self.bia)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=1)
+        self.assertEqual(views._alternar_like(self.bia, self.post.pk, 'curtir'), (True, 1))
+        self.assertContador(1)
+
+    def test_contador_com_varias_pessoas(self):
+        outros = [User.objects.create_user(f'u{i}') for i in range(3)]
+        for usuario in outros:
+            views._alternar_like(usuario, self.post.pk)
+        self.assertEqual(self.curtir(), {'curtido': True, 'likes': 4})
+        views._alternar_like(outros[0], self.post.pk)
+        self.assertEqual(self.curtir('curtir'), {'curtido': True, 'likes': 3})
+        self.assertContador(3)
+
+    def test_erros(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        self.assertEqual(self.client.post(self.url, {'acao': 'amar'}).status_code, 400)
+        self.assertEqual(self.client.post('/api/forum/post/999999/like/').status_code, 404)
+        self.assertContador(0)
+
+
+# --- CONTADORES DO POST: APAGAR COMENTÁRIO E recalcular_contadores ---
+
+class ContadoresPostTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+        cls.bia = User.objects.create_user('bia', password='senha-teste')
+        cls.post = Post.objects.create(autor=cls.ana, conteudo='um post')
+
+    def comentar(self, autor, texto, parent=None):
+        comentario = Comentario.objects.create(post=self.post, autor=autor, conteudo=texto, parent=parent)
+        Post.objects.filter(pk=self.post.pk).update(comentarios_count=F('comentarios_count') + 1)
+        return comentario
+
+    def contador(self):
+        self.post.refresh_from_db()
+        return self.post.comentarios_count
+
+    def test_apagar_comentario_desconta_as_respostas(self):
+        principal = self.comentar(self.ana, 'principal')
+        resposta = self.comentar(self.bia, 'resposta', principal)
+        self.comentar(self.ana, 'neta', resposta)
+        outro = self.comentar(self.bia, 'outro')
+        self.assertEqual(self.contador(), 4)
+
+        # Quem não é o autor não apaga
+        self.client.force_login(self.ana)
+        self.client.get(f'/comentario/{outro.pk}/deletar/')
+        self.assertEqual(self.contador(), 4)
+
+        # O principal leva junto a resposta e a neta (CASCADE): desconta 3
+        resposta = self.client.get(f'/comentario/{principal.pk}/deletar/')
+        self.assertRedirects(resposta, f'/forum/post/{self.post.pk}/', fetch_redirect_response=False)
+        self.assertEqual(self.contador(), 1)
+        self.assertEqual(self.contador(), self.post.comentarios.count())
+
+    def test_recalcular_contadores(self):
+        sem_nada = Post.objects.create(autor=self.bia, conteudo='outro')
+        self.post.likes.add(self.bia)
+        principal = Comentario.objects.create(post=self.post, autor=self.bia, conteudo='a')
+        Comentario.objects.create(post=self.post, autor=self.ana, conteudo='b', parent=principal)
+        # Contadores fora da realidade (escrita perdida, ajuste manual no banco...)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=9, comentarios_count=0)
+        Post.objects.filter(pk=sem_nada.pk).update(likes_count=3, comentarios_count=5)
+
+        saida = StringIO()
+        call_command('recalcular_contadores', stdout=saida)
+
+        self.assertIn('Contadores recalculados para 2 post(s).', saida.getvalue())
+        self.assertEqual(
+            dict(Post.objects.values_list('id', 'likes_count')), {self.post.pk: 1, sem_nada.pk: 0},
+        )
+        self.assertEqual(
+            dict(Post.objects.values_list('id', 'comentarios_count')), {self.post.pk: 2, sem_nada.pk: 0},
+        )
+
+
+# --- AVISOS AGRUPADOS POR CHAVE (core/notificacoes.py) ---
+
+class AgrupamentoAvisosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dono = User.objects.create_user('dono')
+        cls.outro = User.objects.create_user('outro')
+
+    def comentou(self, nome_ator, *destinatarios, chave='comentario:post:1'):
+        notificacoes.gravar(nome_ator, [
+            notificacoes.Aviso(destinatario.id, 'comentario', chave, '/forum/post/1/') for destinatario in destinatarios
+        ])
+
+    def test_duas_pessoas_uma_linha(self):
+        self.comentou('ana', self.dono)
+        self.comentou('bia', self.dono)
+        aviso = Notificacao.objects.get(destinatario=self.dono)
+        self.assertEqual(aviso.total, 2)
+        self.assertEqual(aviso.atores, ['bia', 'ana'])
+        self.assertEqual(aviso.mensagem, '📢 bia e ana comentaram no seu post.')
+
+        self.comentou('caio', self.dono)
+        aviso.refresh_from_db()
+        self.assertEqual(aviso.mensagem, '📢 caio e mais 2 pessoas comentaram no seu post.')
+
+    def test_mesma_pessoa_nao_conta_de_novo(self):
+        self.comentou('ana', self.dono)
+        self.comentou('bia', self.dono)
+        self.comentou('ana', self.dono)
+        aviso = Notificacao.objects.get(destinatario=self.dono)
+        self.assertEqual((aviso.total, aviso.atores), (2, ['ana', 'bia']))
+
+    def test_aviso_lido_nao_e_reaproveitado(self):
+        self.comentou('ana', self.dono)
+        Notificacao.objects.update(lida=True)
+        self.comentou('bia', self.dono)
+        self.assertEqual(
+            list(Notificacao.objects.order_by('id').values_list('lida', 'total', 'atores')),
+            [(True, 1, ['ana']), (False, 1, ['bia'])],
+        )
+
+    def test_chaves_diferentes_nao_se_juntam(self):
+        self.comentou('ana', self.dono, chave='comentario:post:1')
+        self.comentou('bia', self.dono, chave='comentario:post:2')
+        self.assertEqual(Notificacao.objects.filter(destinatario=self.dono).count(), 2)
+
+    def test_um_insert_e_um_update_por_lote(self):
+        self.comentou('ana', self.dono)
+        terceiros = [User.objects.create_user(f'u{i}') for i in range(5)]
+        with CaptureQueriesContext(connection) as contexto:
+            self.comentou('bia', self.dono, self.outro, *terceiros)
+        escritas = [q['sql'].split()[0] for q in contexto.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(escritas, ['INSERT', 'UPDATE'])  # bulk_create dos 6 novos, bulk_update do aberto
+        self.assertEqual(Notificacao.objects.get(destinatario=self.dono).total, 2)
+        self.assertEqual(Notificacao.objects.filter(total=1).count(), 6)
+
+    def test_lista_de_atores_limitada(self):
+        for i in range(notificacoes.MAX_ATORES + 5):
+            self.comentou(f'pessoa{i}', self.dono)
+        aviso = Notificacao.objects.get(destinatario=self.dono)
+        self.assertEqual(aviso.total, notificacoes.MAX_ATORES + 5)
+        self.assertEqual(len(aviso.atores), notificacoes.MAX_ATORES)
+        self.assertEqual(aviso.atores[0], f'pessoa{notificacoes.MAX_ATORES + 4}')
+
+
+# --- SÉRIES: OCORRÊNCIAS CALCULADAS NA JANELA (core/recorrencia.py, core/agenda.py) ---
+
+def _local(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class RecorrenciaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana')
+
+    # Regra (sem banco)
+
+    def test_teto_de_repeticoes(self):
+        base = date(2030, 1, 7)
+        self.assertEqual(len(list(recorrencia.datas(base, recorrencia.SEMANAL))), recorrencia.MAX_REPETICOES)
+        self.assertEqual(len(list(recorrencia.datas(base, recorrencia.SEMANAL, repeticoes=500))), recorrencia.MAX_REPETICOES)
+        self.assertEqual(list(recorrencia.datas(base, '')), [base])
+
+    def test_repetir_ate_e_repeticoes(self):
+        base = date(2030, 1, 7)
+        # O que acabar primeiro vale
+        self.assertEqual(len(list(recorrencia.datas(base, recorrencia.SEMANAL, repetir_ate=date(2030, 1, 28), repeticoes=10))), 4)
+        self.assertEqual(len(list(recorrencia.datas(base, recorrencia.SEMANAL, repetir_ate=date(2031, 1, 1), repeticoes=2))), 2)
+        self.assertEqual(
+            list(recorrencia.datas(base, recorrencia.QUINZENAL, repetir_ate=date(2030, 2, 3))),
+            [date(2030, 1, 7), date(2030, 1, 21)],
+        )
+        self.assertEqual(recorrencia.ultima(base, recorrencia.SEMANAL, repeticoes=3), date(2030, 1, 21))
+
+    def test_mensal_pula_mes_sem_o_dia(self):
+        self.assertEqual(
+            list(recorrencia.datas(date(2030, 1, 31), recorrencia.MENSAL, repeticoes=3)),
+            [date(2030, 1, 31), date(2030, 3, 31), date(2030, 5, 31)],
+        )
+
+    # Reuniões
+
+    def reuniao_semanal(self, **campos):
+        return Reuniao.objects.create(
+            solicitante=self.ana, titulo='1:1', frequencia=recorrencia.SEMANAL,
+            data_inicio=_local(2030, 3, 4, 14), data_fim=_local(2030, 3, 4, 15), **campos,
+        )
+
+    def ocorrencias(self, inicio, fim):
+        reunioes = agenda.reunioes_do_usuario(self.ana, inicio, fim)
+        return [(o.original, timezone.localtime(o.data_inicio)) for o in agenda.ocorrencias_de_reunioes(reunioes, inicio, fim)]
+
+    def test_janela_no_meio_da_serie(self):
+        self.reuniao_semanal(repeticoes=10)
+        # A série começou 4 semanas antes da janela: só a ocorrência desta semana aparece
+        self.assertEqual(self.ocorrencias(_local(2030, 4, 1), _local(2030, 4, 8)), [(date(2030, 4, 1), _local(2030, 4, 1, 14))])
+        # Depois da última (10ª em 06/05) não tem mais nada
+        self.assertEqual(self.ocorrencias(_local(2030, 5, 7), _local(2030, 6, 1)), [])
+
+    def test_ocorrencia_cancelada_e_movida(self):
+        reuniao = self.reuniao_semanal()
+        reuniao.alterar_ocorrencia(date(2030, 4, 1), cancelada=True)
+        # A de 08/04 foi puxada para 05/04: entra na janela mesmo com a data original fora dela
+        reuniao.alterar_ocorrencia(date(2030, 4, 8), data_inicio=_local(2030, 4, 5, 9), data_fim=_local(2030, 4, 5, 10))
+        self.assertEqual(self.ocorrencias(_local(2030, 4, 1), _local(2030, 4, 8)), [(date(2030, 4, 8), _local(2030, 4, 5, 9))])
+        # E não aparece de novo na semana em que cairia
+        self.assertEqual(self.ocorrencias(_local(2030, 4, 8), _local(2030, 4, 15)), [])
+        self.assertIsNone(agenda.ocorrencia_da_reuniao(reuniao, date(2030, 4, 1)))
+        self.assertEqual(ReuniaoExcecao.objects.filter(reuniao=reuniao).count(), 2)
+
+    def test_movida_para_alem_do_deslocamento_maximo(self):
+        reuniao = self.reuniao_semanal()
+        longe = _local(2030, 3, 11, 14) + recorrencia.DESLOCAMENTO_MAXIMO + timedelta(days=3)
+        reuniao.alterar_ocorrencia(date(2030, 3, 11), data_inicio=longe, data_fim=longe + timedelta(hours=1))
+        # A janela só olha séries/exceções até DESLOCAMENTO_MAXIMO de distância: por isso o form não deixa
+        # mover mais que isso (ver editar_reuniao). Aqui a ocorrência simplesmente não é achada
+        inicio = timezone.localtime(longe).replace(hour=0)
+        self.assertNotIn(date(2030, 3, 11), [original for original, _ in self.ocorrencias(inicio, inicio + timedelta(days=1))])
+
+    # Tarefas
+
+    def tarefa(self, **campos):
+        return Tarefa.objects.create(usuario=self.ana, criador=self.ana, titulo='ler', **campos)
+
+    def prazos(self, inicio, fim):
+        tarefas = agenda.tarefas_do_usuario(self.ana, inicio, fim)
+        return [(o.original, o.data_prazo) for o in agenda.ocorrencias_de_tarefas(tarefas, inicio, fim)]
+
+    def test_fim_da_serie_filtra_as_series(self):
+        serie = self.tarefa(data_prazo=date(2030, 1, 7), frequencia=recorrencia.SEMANAL, repeticoes=3)
+        self.assertEqual(serie.fim_da_serie, date(2030, 1, 21))
+        self.tarefa(data_prazo=date(2030, 1, 1))  # não repete, fora da janela
+
+        # Começou antes da janela e ainda não acabou
+        self.assertEqual(self.prazos(date(2030, 1, 20), date(2030, 1, 27)), [(date(2030, 1, 21), date(2030, 1, 21))])
+        # Já acabou: nem vem do banco
+        depois = agenda.tarefas_do_usuario(self.ana, date(2030, 2, 1), date(2030, 3, 1))
+        self.assertEqual(list(depois), [])
+
+    def test_tarefa_cancelada_e_movida(self):
+        serie = self.tarefa(data_prazo=date(2030, 1, 7), frequencia=recorrencia.SEMANAL)
+        serie.alterar_ocorrencia(date(2030, 1, 14), cancelada=True)
+        serie.alterar_ocorrencia(date(2030, 1, 21), data_prazo=date(2030, 1, 18))
+        self.assertEqual(self.prazos(date(2030, 1, 7), date(2030, 1, 20)), [
+            (date(2030, 1, 7), date(2030, 1, 7)),
+            (date(2030, 1, 21), date(2030, 1, 18)),
+        ])
+        self.assertEqual(TarefaExcecao.objects.filter(tarefa=serie).count(), 2)
+
+
+# --- DISPONIBILIDADE: CONFLITOS E HORÁRIOS LIVRES (core/agenda.py) ---
+
+class DisponibilidadeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+        cls.bia = User.objects.create_user('bia')
+        cls.cid = User.objects.create_user('cid')
+        # Segunda, 10h-11h: ana organiza, bia convidada
+        cls.reuniao = Reuniao.objects.create(
+            solicitante=cls.ana, titulo='Mentoria', data_inicio=_local(2030, 3, 4, 10), data_fim=_local(2030, 3, 4, 11),
+        )
+        cls.reuniao.definir_convidados([cls.bia])
+        cls.ids = [cls.ana.id, cls.bia.id, cls.cid.id]
+
+    def conflitos(self, inicio, fim, **opcoes):
+        return {uid: len(intervalos) for uid, intervalos in agenda.conflitos(self.ids, inicio, fim, **opcoes).items()}
+
+    def test_bordas_da_sobreposicao(self):
+        ocupados = {self.ana.id: 1, self.bia.id: 1}
+        self.assertEqual(self.conflitos(_local(2030, 3, 4, 10), _local(2030, 3, 4, 11)), ocupados)
+        self.assertEqual(self.conflitos(_local(2030, 3, 4, 10, 59), _local(2030, 3, 4, 11, 30)), ocupados)
+        self.assertEqual(self.conflitos(_local(2030, 3, 4, 9), _local(2030, 3, 4, 12)), ocupados)
+        # Encostar não é conflito: [inicio, fim) de um lado e do outro
+        self.assertEqual(self.conflitos(_local(2030, 3, 4, 11), _local(2030, 3, 4, 12)), {})
+        self.assertEqual(self.conflitos(_local(2030, 3, 4, 9), _local(2030, 3, 4, 10)), {})
+
+    def test_ignorar_a_reuniao_em_edicao(self):
+        Reuniao.objects.create(
+            solicitante=self.bia, titulo='Outra', data_inicio=_local(2030, 3, 4, 10, 30), data_fim=_local(2030, 3, 4, 11, 30),
+        )
+        inicio, fim = _local(2030, 3, 4, 10), _local(2030, 3, 4, 11)
+        self.assertEqual(self.conflitos(inicio, fim), {self.ana.id: 1, self.bia.id: 2})
+        # Editando a Mentoria: ela mesma não conta, a Outra continua
+        self.assertEqual(self.conflitos(inicio, fim, ignorar_reuniao=self.reuniao.id), {self.bia.id: 1})
+
+    def test_horarios_livres(self):
+        # 11h-11h30 do cid encosta na Mentoria: vira um bloco ocupado só, 10h-11h30
+        Reuniao.objects.create(
+            solicitante=self.cid, titulo='Café', data_inicio=_local(2030, 3, 4, 11), data_fim=_local(2030, 3, 4, 11, 30),
+        )
+        inicio, fim = _local(2030, 3, 4, 8), _local(2030, 3, 5, 9)
+
+        self.assertEqual(agenda.horarios_livres(self.ids, inicio, fim, timedelta(hours=1)), [
+            (_local(2030, 3, 4, 8), _local(2030, 3, 4, 10)),
+            (_local(2030, 3, 4, 11, 30), _local(2030, 3, 4, 22)),  # até o fim do HORARIO_UTIL
+            (_local(2030, 3, 5, 7), _local(2030, 3, 5, 9)),
+        ])
+        # Folgas menores que a duração ficam de fora; `limite` corta a lista
+        self.assertEqual(agenda.horarios_livres(self.ids, inicio, fim, timedelta(hours=2, minutes=30)), [
+            (_local(2030, 3, 4, 11, 30), _local(2030, 3, 4, 22)),
+        ])
+        self.assertEqual(len(agenda.horarios_livres(self.ids, inicio, fim, timedelta(hours=1), limite=2)), 2)
+        # Sem a Mentoria (editando ela), a manhã fica livre até as 11h
+        self.assertEqual(
+            agenda.horarios_livres(self.ids, inicio, fim, timedelta(hours=1), limite=1, ignorar_reuniao=self.reuniao.id),
+            [(_local(2030, 3, 4, 8), _local(2030, 3, 4, 11))],
+        )
+
+    def api(self, **params):
+        self.client.force_login(self.ana)
+        return self.client.get('/api/agenda/disponibilidade/', params)
+
+    def test_api(self):
+        resposta = self.api(
+            usuarios=f'{self.bia.id},{self.cid.id}', duracao=60,
+            inicio=_local(2030, 3, 4, 10, 30).isoformat(), fim=_local(2030, 3, 4, 13).isoformat(),
+        )
+        self.assertEqual(resposta.status_code, 200)
+        dados = resposta.json()
+        self.assertEqual(sorted(c['username'] for c in dados['conflitos']), ['ana', 'bia'])
+        self.assertEqual(dados['conflitos'][0]['ocupado'], [
+            {'inicio': _local(2030, 3, 4, 10).isoformat(), 'fim': _local(2030, 3, 4, 11).isoformat()},
+        ])
+        self.assertEqual(dados['livres'], [{'inicio': _local(2030, 3, 4, 11).isoformat(), 'fim': _local(2030, 3, 4, 13).isoformat()}])
+
+    def test_api_parametros_invalidos(self):
+        inicio = _local(2030, 3, 4, 8).isoformat()
+        for params in (
+            {'duracao': '99999999999999'},  # timedelta estouraria (OverflowError)
+            {'duracao': '0'},
+            {'duracao': str(agenda.DURACAO_MAXIMA // timedelta(minutes=1) + 1)},
+            {'duracao': 'uma hora'},
+            {'reuniao': '9' * 30},  # não cabe na coluna
+            {'usuarios': f'{self.bia.id},{"9" * 30}'},
+            {'usuarios': 'bia'},
+            {'fim': _local(2030, 3, 4, 7).isoformat()},
+            {'fim': _local(2030, 6, 1).isoformat()},  # mais que MAX_DIAS_API_CALENDARIO
+        ):
+            self.assertEqual(self.api(inicio=inicio, **params).status_code, 400, params)
+        # Nos extremos do datetime a busca de ocupação (início - DURACAO_MAXIMA) estouraria
+        self.assertEqual(self.api(inicio='0001-01-01', fim='0001-01-02').status_code, 400)
+        self.assertEqual(self.api(inicio='9999-12-30', fim='9999-12-31').status_code, 400)
+
+
+# --- API DO CALENDÁRIO: SÓ A JANELA PEDIDA (api/calendario/?start=...&end=...) ---
+
+class ApiCalendarioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+        cls.bia = User.objects.create_user('bia')
+
+        def reuniao(titulo, dia, hora, solicitante=cls.ana, **campos):
+            return Reuniao.objects.create(
+                solicitante=solicitante, titulo=titulo,
+                data_inicio=_local(2030, 3, dia, hora), data_fim=_local(2030, 3, dia, hora + 1), **campos,
+            )
+
+        # Janela dos testes: semana de 04/03/2030 (segunda) a 11/03 (exclusive)
+        reuniao('Começa no início', 4, 0)
+        reuniao('Antes', 3, 22)
+        reuniao('Começa no fim', 11, 0)
+        Reuniao.objects.create(
+            solicitante=cls.ana, titulo='Semanal', frequencia=recorrencia.SEMANAL, repeticoes=6,
+            data_inicio=_local(2030, 2, 25, 14), data_fim=_local(2030, 2, 25, 15),
+        )
+        reuniao('Da bia', 6, 9, solicitante=cls.bia).definir_convidados([cls.ana])
+        reuniao('Só da bia', 6, 11, solicitante=cls.bia)
+
+        Tarefa.objects.create(usuario=cls.ana, criador=cls.ana, titulo='No domingo', data_prazo=date(2030, 3, 10))
+        Tarefa.objects.create(usuario=cls.ana, criador=cls.ana, titulo='Segunda seguinte', data_prazo=date(2030, 3, 11))
+        Tarefa.objects.create(
+            usuario=cls.ana, criador=cls.bia, titulo='Toda terça', data_prazo=date(2030, 2, 26),
+            frequencia=recorrencia.SEMANAL, repeticoes=3,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.ana)
+
+    def api(self, start, end):
+        return self.client.get('/api/calendario/', {'start': start, 'end': end})
+
+    def test_janela(self):
+        resposta = self.api('2030-03-04', '2030-03-11')
+        self.assertEqual(resposta.status_code, 200)
+        dados = resposta.json()
+
+        reunioes = [(r['titulo'], r['inicio'], r['repete']) for r in dados['reunioes']]
+        self.assertEqual(sorted(reunioes, key=lambda r: r[1]), [
+            ('Começa no início', _local(2030, 3, 4, 0).isoformat(), None),
+            ('Semanal', _local(2030, 3, 4, 14).isoformat(), recorrencia.SEMANAL),  # 2ª ocorrência da série
+            ('Da bia', _local(2030, 3, 6, 9).isoformat(), None),  # convidada também vê
+        ])
+        da_bia = next(r for r in dados['reunioes'] if r['titulo'] == 'Da bia')
+        self.assertEqual((da_bia['organizador'], da_bia['convidados']), ('bia', ['ana']))
+
+        tarefas = [(t['titulo'], t['prazo']) for t in dados['tarefas']]
+        self.assertCountEqual(tarefas, [('Toda terça', '2030-03-05'), ('No domingo', '2030-03-10')])
+
+    def test_janela_com_hora(self):
+        # end com hora: o dia que a janela toca entra inteiro para as tarefas (prazo é data)
+        dados = self.api(_local(2030, 3, 10, 12).isoformat(), _local(2030, 3, 11, 0, 30).isoformat()).json()
+        self.assertEqual([r['titulo'] for r in dados['reunioes']], ['Começa no fim'])
+        self.assertEqual(sorted(t['titulo'] for t in dados['tarefas']), ['No domingo', 'Segunda seguinte'])
+
+    def test_parametros_invalidos(self):
+        for start, end in (
+            ('', '2030-03-11'),
+            ('2030-03-04', ''),
+            ('ontem', '2030-03-11'),
+            ('2030-02-30', '2030-03-11'),
+            ('2030-03-11', '2030-03-04'),  # fim antes do início
+            ('2030-03-04', '2030-03-04'),
+            ('2030-03-04', '2030-06-01'),  # mais que MAX_DIAS_API_CALENDARIO
+            ('0001-01-01', '0001-01-02'),
+            ('9999-12-30', '9999-12-31'),
+        ):
+            self.assertEqual(self.api(start, end).status_code, 400, (start, end))
+        self.assertEqual(self.api('2030-03-04', '2030-05-05').status_code, 200)  # 62 dias: no limite
+
+
+# --- FEED .ICS (calendario/feed/<token>.ics) ---
+
+class FeedAgendaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana')
+        inicio = timezone.localtime().replace(hour=14, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        cls.serie = Reuniao.objects.create(
+            solicitante=cls.ana, titulo='Mentoria semanal', frequencia=recorrencia.SEMANAL, repeticoes=4,
+            data_inicio=inicio, data_fim=inicio + timedelta(hours=1),
+        )
+        cls.serie.alterar_ocorrencia((inicio + timedelta(weeks=1)).date(), cancelada=True)
+        Tarefa.objects.create(usuario=cls.ana, criador=cls.ana, titulo='Relatório', data_prazo=inicio.date())
+        cls.url = f"/calendario/feed/{agenda.token_do_feed(cls.ana)}.ics"
+
+    def buscar_dono(self, contexto):
+        # A consulta do dono do token (usuário ativo pelo id)
+        return [
+            q for q in contexto.captured_queries
+            if ' FROM "auth_user" WHERE ' in q['sql'] and '"auth_user"."is_active"' in q['sql'].split(' WHERE ', 1)[1]
+        ]
+
+    def test_corpo_do_ics(self):
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.client.get(self.url)
+            corpo = b''.join(resposta.streaming_content).decode()
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(self.buscar_dono(contexto)), 1)
+
+        tz = settings.TIME_ZONE
+        self.assertTrue(corpo.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(corpo.endswith('END:VCALENDAR\r\n'))
+        # Todo TZID usado tem a definição no próprio arquivo (RFC 5545), antes dos eventos
+        self.assertIn(f'BEGIN:VTIMEZONE\r\nTZID:{tz}\r\n', corpo)
+        self.assertIn('TZOFFSETTO:-0300\r\n', corpo)
+        self.assertLess(corpo.index('END:VTIMEZONE'), corpo.index('BEGIN:VEVENT'))
+
+        self.assertIn(f'DTSTART;TZID={tz}:{timezone.localtime(self.serie.data_inicio):%Y%m%dT%H%M%S}\r\n', corpo)
+        self.assertIn('RRULE:FREQ=WEEKLY;UNTIL=', corpo)
+        self.assertIn(f'EXDATE;TZID={tz}:', corpo)
+        self.assertIn('SUMMARY:Tarefa: Relatório\r\n', corpo)
+        self.assertEqual(corpo.count('BEGIN:VEVENT'), 2)
+
+    def test_304_com_if_none_match(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 304)
+        self.assertEqual(len(self.buscar_dono(contexto)), 1)
+
+        # Mudou algo da agenda: ETag novo, corpo de novo
+        Tarefa.objects.create(usuario=self.ana, criador=self.ana, titulo='Outra', data_prazo=timezone.localdate())
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_token_invalido(self):
+        self.assertEqual(self.client.get('/calendario/feed/nao-vale.ics').status_code, 404)
+
+    @override_settings(TIME_ZONE='America/New_York')
+    def test_vtimezone_com_horario_de_verao(self):
+        inicio = timezone.make_aware(datetime(2030, 1, 1))
+        linhas = ''.join(agenda._vtimezone(inicio, inicio + timedelta(days=365)))
+        self.assertIn('BEGIN:DAYLIGHT\r\nDTSTART:20300310T020000\r\nTZOFFSETFROM:-0500\r\nTZOFFSETTO:-0400\r\n', linhas)
+        self.assertIn('BEGIN:STANDARD\r\nDTSTART:20301103T020000\r\nTZOFFSETFROM:-0400\r\nTZOFFSETTO:-0500\r\n', linhas)
+
+
+# --- IMAGENS ENVIADAS (core/imagens.py) ---
+
+class ImagensTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+
+    def setUp(self):
+        # media/ de mentira: as imagens são geradas pelo Pillow dentro de cada teste
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta, ignore_errors=True)
+        configuracao = override_settings(MEDIA_ROOT=pasta)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.perfil = Perfil.objects.get(user=self.ana)
+
+    def gravar(self, nome, tamanho, formato, **opcoes):
+        buffer = BytesIO()
+        Image.new('RGB', tamanho, 'red').save(buffer, formato, **opcoes)
+        return default_storage.save(nome, ContentFile(buffer.getvalue()))
+
+    def trocar_foto(self, nome):
+        Perfil.objects.filter(pk=self.perfil.pk).update(foto=nome)
+        self.perfil.refresh_from_db()
+
+    def abrir(self, nome):
+        with default_storage.open(nome) as arquivo:
+            imagem = Image.open(arquivo)
+            imagem.load()
+        return imagem
+
+    def test_gira_pelo_exif_e_tira_os_metadados(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # celular deitado: gira 90 graus
+        self.trocar_foto(self.gravar('perfil_fotos/deitada.jpg', (400, 200), 'JPEG', exif=exif))
+
+        imagens.processar_foto(self.perfil)
+
+        self.perfil.refresh_from_db()
+        self.assertEqual(self.perfil.foto.name, 'perfil_fotos/deitada.jpg')
+        original = self.abrir(self.perfil.foto.name)
+        self.assertEqual(original.size, (200, 400))
+        self.assertEqual(len(original.getexif()), 0)
+
+    def test_gif_vira_png(self):
+        self.trocar_foto(self.gravar('perfil_fotos/animada.gif', (64, 64), 'GIF'))
+
+        imagens.processar_foto(self.perfil)
+
+        self.perfil.refresh_from_db()
+        self.assertEqual(self.perfil.foto.name, 'perfil_fotos/animada.png')
+        self.assertEqual(self.abrir(self.perfil.foto.name).format, 'PNG')
+        self.assertFalse(default_storage.exists('perfil_fotos/animada.gif'))
+
+    def test_tamanho_das_versoes(self):
+        self.trocar_foto(self.gravar('perfil_fotos/retrato.png', (600, 300), 'PNG'))
+        versoes = imagens.processar_foto(self.perfil)
+
+        self.perfil.refresh_from_db()
+        self.assertEqual(self.perfil.foto_versoes, versoes)
+        self.assertEqual(set(versoes), set(imagens.VERSOES_FOTO))
+        for nome, tamanho in imagens.VERSOES_FOTO.items():
+            self.assertTrue(versoes[nome].startswith('perfil_fotos/versoes/retrato_'))
+            self.assertEqual(self.abrir(versoes[nome]).size, tamanho)
+        self.assertEqual(self.perfil.foto_pequena, default_storage.url(versoes['p']))
+
+        # Post: o original fica com no máximo LADO_MAXIMO, a versão do feed só reduz (mantém a proporção)
+        post = Post.objects.create(autor=self.ana, conteudo='com imagem')
+        Post.objects.filter(pk=post.pk).update(imagem=self.gravar('posts_img/larga.jpg', (4096, 1024), 'JPEG'))
+        post.refresh_from_db()
+        versoes = imagens.processar_imagem_post(post)
+        self.assertEqual(self.abrir(post.imagem.name).size, (imagens.LADO_MAXIMO, imagens.LADO_MAXIMO // 4))
+        self.assertEqual(self.abrir(versoes['feed']).size, (1200, 300))
+
+    def test_nao_sobrescreve_imagem_trocada_no_meio(self):
+        self.trocar_foto(self.gravar('perfil_fotos/antiga.png', (64, 64), 'PNG'))
+        # Enquanto a antiga era processada, o usuário mandou outra
+        Perfil.objects.filter(pk=self.perfil.pk).update(foto='perfil_fotos/nova.png')
+
+        self.assertTrue(imagens.processar_foto(self.perfil))
+
+        self.perfil.refresh_from_db()
+        self.assertEqual(self.perfil.foto.name, 'perfil_fotos/nova.png')
+        self.assertEqual(self.perfil.foto_versoes, {})
+
+    def test_recusa_acima_do_limite_de_pixels(self):
+        nome = self.gravar('perfil_fotos/enorme.png', (300, 300), 'PNG')
+        self.trocar_foto(nome)
+        with default_storage.open(nome) as arquivo:
+            antes = arquivo.read()
+
+        with mock.patch.object(imagens, 'LIMITE_PIXELS', 300 * 300 - 1), self.assertLogs('core.imagens', 'WARNING'):
+            self.assertEqual(imagens.processar_foto(self.perfil), {})
+
+        # Arquivo fica como veio, sem versões
+        self.perfil.refresh_from_db()
+        self.assertEqual(self.perfil.foto.name, nome)
+        self.assertEqual(self.perfil.foto_versoes, {})
+        with default_storage.open(nome) as arquivo:
+            self.assertEqual(arquivo.read(), antes)
+
+    def test_comando_gerar_miniaturas(self):
+        # Perfis novos apontam todos para o default.jpg: processado uma vez só
+        User.objects.create_user('bia', password='senha-teste')
+        self.gravar('default.jpg', (200, 200), 'JPEG')
+        post = Post.objects.create(autor=self.ana, conteudo='imagem quebrada')
+        Post.objects.filter(pk=post.pk).update(imagem=default_storage.save('posts_img/quebrada.jpg', ContentFile(b'nao e imagem')))
+
+        saida = StringIO()
+        with mock.patch.object(imagens, 'processar', wraps=imagens.processar) as processar, self.assertLogs('core.imagens', 'WARNING'):
+            call_command('gerar_miniaturas', stdout=saida)
+
+        self.assertEqual(processar.call_count, 2)  # default.jpg + a imagem do post
+        self.assertIn('Fotos de perfil: 2 imagem(ns) processada(s).', saida.getvalue())
+        self.assertIn('Imagens dos posts: 1 arquivo(s) que não deu para abrir', saida.getvalue())
+        self.assertEqual(Perfil.objects.filter(foto_versoes={}).count(), 0)
+
+        # Sem --todas, quem já tem versões fica de fora
+        saida = StringIO()
+        with self.assertLogs('core.imagens', 'WARNING'):
+            call_command('gerar_miniaturas', stdout=saida)
+        self.assertIn('Fotos de perfil: 0 imagem(ns) processada(s).', saida.getvalue())
+
+
+# --- BUSCA DO FÓRUM E DO DIRETÓRIO (core/busca.py) ---
+
+class BuscaTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # O SQLite daqui pode ter sido compilado sem FTS5 (e aí a migration do índice nem roda)
+        if not busca.disponivel():
+            raise unittest.SkipTest('banco sem busca textual')
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA compile_options')
+                if 'ENABLE_FTS5' not in {linha[0] for linha in cursor.fetchall()}:
+                    raise unittest.SkipTest('SQLite sem FTS5')
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+        cls.bia = User.objects.create_user('bia', first_name='Beatriz')
+
+    def test_sinais_mantem_o_indice(self):
+        post = Post.objects.create(autor=self.ana, conteudo='Dicas de mentoria para o primeiro emprego')
+        outro = Post.objects.create(autor=self.ana, conteudo='Vagas abertas')
+        comentario = Comentario.objects.create(post=outro, autor=self.bia, conteudo='Alguém usa Django?')
+
+        self.assertEqual(busca.buscar_posts('mentor'), [post.id])  # prefixo
+        self.assertEqual(busca.buscar_posts('django'), [outro.id])  # comentário leva ao post dele
+        self.assertEqual(busca.buscar_posts('beatriz django'), [outro.id])  # nome do autor entra no índice
+        self.assertEqual(busca.buscar_posts('mentoria vagas'), [])  # todos os termos são obrigatórios
+        self.assertEqual(busca.buscar_posts('" OR *'), [])  # nada de operadores do usuário no MATCH
+
+        post.conteudo = 'Dicas de currículo'
+        post.save()
+        self.assertEqual(busca.buscar_posts('mentoria'), [])
+        self.assertEqual(busca.buscar_posts('curriculo'), [post.id])  # sem acento também acha
+
+        comentario.delete()
+        self.assertEqual(busca.buscar_posts('django'), [])
+        outro.delete()
+        self.assertEqual(busca.buscar_posts('vagas'), [])
+
+    def test_reindexar(self):
+        # bulk_create não dispara sinais: só entra no índice com o reindexar_busca
+        Post.objects.bulk_create([Post(autor=self.ana, conteudo='importado sem sinal')])
+        self.assertEqual(busca.buscar_posts('importado'), [])
+
+        saida = StringIO()
+        call_command('reindexar_busca', stdout=saida)
+        self.assertEqual(busca.buscar_posts('importado'), list(Post.objects.values_list('id', flat=True)))
+        self.assertIn('Índice de busca refeito com 1 documento(s).', saida.getvalue())
+
+    def test_perfis_pelo_sobre_mim(self):
+        perfil = Perfil.objects.get(user=self.bia)
+        perfil.bio = 'Engenheira de dados, ajudo com análise'
+        perfil.save()
+
+        perfis = Perfil.objects.all()
+        self.assertEqual(list(busca.filtrar_perfis(perfis, 'engenh analise')), [perfil])  # prefixo, sem acento
+        self.assertEqual(list(busca.filtrar_perfis(perfis, 'python')), [])
+
+        perfil.bio = ''
+        perfil.save()
+        self.assertEqual(list(busca.filtrar_perfis(perfis, 'engenh')), [])
+
+    def test_paginas_da_busca(self):
+        for i in range(25):
+            Post.objects.create(autor=self.bia, conteudo=f'python {i}')
+        Post.objects.create(autor=self.bia, conteudo='java')
+        self.client.force_login(self.ana)
+
+        vistos, cursor, paginas = [], None, 0
+        while True:
+            params = {'q': 'python', **({'cursor': cursor} if cursor else {})}
+            resposta = self.client.get('/forum/mais/', params)
+            self.assertEqual(resposta.status_code, 200)
+            vistos += [int(pk) for pk in re.findall(r'data-post-id="(\d+)"', resposta.json()['html'])]
+            cursor, paginas = resposta.json()['proximo_cursor'], paginas + 1
+            if not cursor:
+                break
+
+        self.assertEqual(paginas, 2)
+        self.assertEqual(len(vistos), 25)
+        self.assertEqual(set(vistos), set(Post.objects.filter(conteudo__startswith='python').values_list('id', flat=True)))
+
+        # O cursor da busca é só o offset
+        for valores in ([-1], ['20'], [20, 1], [True], [views.MAX_OFFSET_BUSCA + 1], [10**30]):
+            resposta = self.client.get('/forum/mais/', {'q': 'python', 'cursor': views._codificar_cursor(valores)})
+            self.assertEqual(resposta.status_code, 400, valores)
+
+
+class BuscaSemIndiceTests(TestCase):
+    # Banco sem busca textual (MySQL, SQLite sem FTS5): fórum e diretório voltam para o icontains
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', password='senha-teste')
+        cls.bia = User.objects.create_user('bia_dev')
+        cls.post = Post.objects.create(autor=cls.ana, conteudo='Vaga de estágio em Python')
+        cls.do_autor = Post.objects.create(autor=cls.bia, conteudo='Bom dia')
+        Post.objects.create(autor=cls.ana, conteudo='Outro assunto')
+
+    def setUp(self):
+        sem_indice = mock.patch.object(busca, 'disponivel', return_value=False)
+        sem_indice.start()
+        self.addCleanup(sem_indice.stop)
+        self.client.force_login(self.ana)
+
+    def buscar(self, texto):
+        resposta = self.client.get('/forum/mais/', {'q': texto})
+        self.assertEqual(resposta.status_code, 200)
+        return [int(pk) for pk in re.findall(r'data-post-id="(\d+)"', resposta.json()['html'])]
+
+    def test_forum_com_icontains(self):
+        self.assertEqual(busca.buscar_posts('python'), [])
+        self.assertEqual(self.buscar('PYTHON'), [self.post.id])
+        self.assertEqual(self.buscar('_dev'), [self.do_autor.id])  # username do autor
+
+    def test_diretorio_com_icontains(self):
+        perfil = Perfil.objects.get(user=self.bia)
+        Perfil.objects.filter(pk=perfil.pk).update(bio='Desenvolvedora backend')
+        perfis = Perfil.objects.all()
+        self.assertEqual(list(busca.filtrar_perfis(perfis, 'backend desenvol')), [perfil])
+        self.assertEqual(list(busca.filtrar_perfis(perfis, 'backend frontend')), [])
+
+
+# --- DIRETÓRIO DA COMUNIDADE: API, FILTROS E FACETAS EM CACHE (core/diretorio.py) ---
+
+class DiretorioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        perfis = [
+            ('ana', 'Mentor', 'Recife', 'Acme'),
+            ('bia', 'Mentor', 'Recife', 'Outra'),
+            ('caio', 'Estudante', 'Recife', ''),
+            ('duda', 'Mentor', 'Olinda', 'Acme'),
+            ('edu', 'Estudante', '', ''),
+        ]
+        for username, tipo, cidade, empresa in perfis:
+            usuario = User.objects.create_user(username, password='senha-teste')
+            Perfil.objects.filter(user=usuario).update(tipo=tipo, cidade=cidade, empresa=empresa)
+        inativo = User.objects.create_user('fred', is_active=False)
+        Perfil.objects.filter(user=inativo).update(tipo='Mentor', cidade='Recife')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.get(username='ana'))
+
+    def api(self, **params):
+        resposta = self.client.get('/api/diretorio/', params)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def nomes(self, dados):
+        return [r['username'] for r in dados['resultados']]
+
+    def test_filtros(self):
+        self.assertEqual(self.nomes(self.api()), ['ana', 'bia', 'caio', 'duda', 'edu'])  # inativo fica de fora
+        self.assertEqual(self.nomes(self.api(tipo='Mentor', cidade='Recife')), ['ana', 'bia'])
+        self.assertEqual(self.nomes(self.api(empresa='Acme')), ['ana', 'duda'])
+        self.assertEqual(self.nomes(self.api(cidade='  Olinda ')), ['duda'])
+        self.assertEqual(self.api(cidade='Natal')['total'], 0)
+
+    def test_paginas(self):
+        dados = self.api(por_pagina=2, pagina=2)
+        self.assertEqual(self.nomes(dados), ['caio', 'duda'])
+        self.assertEqual((dados['pagina'], dados['paginas'], dados['total']), (2, 3, 5))
+        self.assertEqual(self.api(por_pagina=2, pagina=99)['pagina'], 3)  # fora do intervalo: a última
+        self.assertEqual(self.api(por_pagina=2, pagina='x')['pagina'], 1)
+
+        # Pedir mais que MAX_POR_PAGINA não passa do limite
+        with mock.patch.object(diretorio, 'MAX_POR_PAGINA', 3):
+            dados = self.api(por_pagina=1000)
+        self.assertEqual((len(dados['resultados']), dados['paginas']), (3, 2))
+
+    def test_parametros_invalidos(self):
+        for params in ({'tipo': 'Admin'}, {'por_pagina': '0'}, {'por_pagina': 'muitos'}):
+            resposta = self.client.get('/api/diretorio/', params)
+            self.assertEqual(resposta.status_code, 400, params)
+
+    def test_facetas(self):
+        facetas = self.api()['facetas']
+        self.assertEqual(facetas['tipo'], {'Mentor': 3, 'Estudante': 2})
+        self.assertEqual(facetas['cidade'], [{'valor': 'Recife', 'total': 3}, {'valor': 'Olinda', 'total': 1}])
+        self.assertEqual(facetas['empresa'], [{'valor': 'Acme', 'total': 2}, {'valor': 'Outra', 'total': 1}])
+
+    def test_cache_das_facetas_sai_quando_perfil_muda(self):
+        diretorio.facetas()
+        with self.assertNumQueries(0):
+            diretorio.facetas()
+
+        perfil = Perfil.objects.get(user__username='edu')
+        perfil.cidade = 'Olinda'
+        with self.captureOnCommitCallbacks(execute=True):
+            perfil.save()
+        self.assertIsNone(cache.get(diretorio.CHAVE_FACETAS))
+        self.assertEqual(diretorio.facetas()['cidade'], [{'valor': 'Recife', 'total': 3}, {'valor': 'Olinda', 'total': 2}])
+
+        # Perfil apagado (junto com o usuário) também
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(username='duda').delete()
+        self.assertEqual(diretorio.facetas()['tipo'], {'Mentor': 2, 'Estudante': 2})
@@ -0,0 +1,44 @@
+# core/trabalhos.py
+# --- TRABALHOS DA FILA (ver core/fila.py) ---
+# Cada função recebe só ids/textos (os dados vão em JSON) e busca o resto no banco na hora de rodar:
+# entre enfileirar e executar o objeto pode ter mudado ou sumido, e aí o trabalho simplesmente não faz nada.
+from . import fila, imagens, notificacoes
+from .models import Comentario, Perfil, Post
+
+
+# --- IMAGENS ---
+
+@fila.trabalho('imagens.foto')
+def processar_foto(perfil_id, nome):
+    perfil = Perfil.objects.filter(pk=perfil_id).first()
+    # Trocou de foto de novo antes do worker chegar: o trabalho da foto nova cuida dela
+    if perfil is not None and perfil.foto.name == nome:
+        imagens.processar_foto(perfil)
+
+
+@fila.trabalho('imagens.post')
+def processar_imagem_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None and post.imagem:
+        imagens.processar_imagem_post(post)
+
+
+# --- NOTIFICAÇÕES ---
+
+@fila.trabalho('notificacoes.gravar')
+def gravar_notificacoes(nome_ator, avisos):
+    notificacoes.gravar(nome_ator, [notificacoes.Aviso(*aviso) for aviso in avisos])
+
+
+@fila.trabalho('notificacoes.comentario')
+def notificar_comentario(comentario_id):
+    comentario = Comentario.objects.select_related('autor', 'post', 'parent').filter(pk=comentario_id).first()
+    if comentario is not None:
+        notificacoes.gravar(comentario.autor.username, notificacoes.avisos_do_comentario(comentario))
+
+
+@fila.trabalho('notificacoes.post')
+def notificar_post(post_id):
+    post = Post.objects.select_related('autor').filter(pk=post_id).first()
+    if post is not None:
+        notificacoes.gravar(post.autor.username, notificacoes.avisos_do_post(post))
@@ -0,0 +1,90 @@
+# core/turmas.py
+# --- TAREFAS PARA VÁRIOS ALUNOS DE UMA VEZ ---
+# O mentor escolhe os alunos um a um (busca por nome), por turma salva (Turma) ou "todos os meus alunos"
+# e a mesma tarefa vira uma linha por aluno:
+#   - um bulk_create só, numa transação (nada de um formulário e um INSERT por aluno);
+#   - bulk_create não passa pelo save() nem dispara sinais: o fim_da_serie é calculado aqui
+#     e o painel de cada aluno é invalidado na mão;
+#   - um aviso por aluno, gravados juntos pela fila (core/notificacoes.py). Avisos de tarefa
+#     ainda não lidos se juntam: "marta e mais 2 pessoas passaram tarefas para você."
+# "Meus alunos" = estudantes das minhas turmas + estudantes para quem eu já passei alguma tarefa.
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from . import notificacoes, painel, recorrencia
+from .models import Tarefa
+
+MAX_ALUNOS_POR_LOTE = 500
+
+# Campos que a tarefa do formulário passa igual para a de cada aluno
+CAMPOS_DA_TAREFA = ['titulo', 'informacoes', 'data_prazo', 'frequencia', 'repetir_ate', 'repeticoes']
+
+
+def estudantes():
+    return User.objects.filter(is_active=True, perfil__tipo='Estudante')
+
+
+def meus_alunos(mentor):
+    return estudantes().filter(Q(turmas_como_aluno__mentor=mentor) | Q(tarefa__criador=mentor)).distinct()
+
+
+def destinatarios(mentor, alunos=(), turmas=(), todos=False):
+    """Ids dos alunos escolhidos (sem repetir e sem o próprio mentor). Uma consulta para turmas/todos."""
+    ids = {aluno.id for aluno in alunos}
+    if todos:
+        ids.update(meus_alunos(mentor).values_list('id', flat=True))
+    elif turmas:
+        ids.update(estudantes().filter(turmas_como_aluno__in=turmas).values_list('id', flat=True).distinct())
+    ids.discard(mentor.id)
+    return ids
+
+
+def atribuir(mentor, tarefa, aluno_ids):
+    """
+    Cria uma cópia de `tarefa` (não salva, com os campos do formulário) para cada aluno.
+    Devolve as tarefas criadas.
+    """
+    campos = {campo: getattr(tarefa, campo) for campo in CAMPOS_DA_TAREFA}
+    if tarefa.frequencia:
+        campos['fim_da_serie'] = recorrencia.ultima(tarefa.data_prazo, tarefa.frequencia, tarefa.repetir_ate, tarefa.repeticoes)
+
+    aluno_ids = sorted(aluno_ids)
+    link = reverse('calendario')
+    with transaction.atomic():
+        novas = Tarefa.objects.bulk_create(
+            [Tarefa(usuario_id=aluno_id, criador=mentor, **campos) for aluno_id in aluno_ids],
+            batch_size=MAX_ALUNOS_POR_LOTE,
+        )
+        painel.invalidar(mentor.id, *aluno_ids)
+        notificacoes.notificar(mentor, [
+            notificacoes.Aviso(aluno_id, 'tarefa', 'tarefa:nova', link) for aluno_id in aluno_ids
+        ])
+    return novas
+
+
+def salvar_turma(mentor, nome, aluno_ids):
+    """Cria (ou substitui os alunos de) a turma `nome` do mentor."""
+    turma, _ = mentor.turmas.get_or_create(nome=nome)
+    turma.alunos.set(aluno_ids)
+    return turma
+
+
+# --- AÇÕES EM LOTE NA LISTA DE TAREFAS (CALENDÁRIO) ---
+
+def concluir(usuario, tarefa_ids):
+    """Marca como concluídas as tarefas da lista que são do usuário (dono ou criador). Devolve quantas."""
+    tarefas = Tarefa.objects.filter(Q(usuario=usuario) | Q(criador=usuario), id__in=tarefa_ids, concluida=False)
+    with transaction.atomic():
+        envolvidos = list(tarefas.values_list('usuario_id', 'criador_id'))
+        total = tarefas.update(concluida=True, atualizado_em=timezone.now())
+        painel.invalidar(*[uid for par in envolvidos for uid in par])
+    return total
+
+
+def excluir(usuario, tarefa_ids):
+    """Apaga as tarefas da lista que o usuário criou (como o excluir_tarefa). Devolve quantas."""
+    _, apagados = Tarefa.objects.filter(criador=usuario, id__in=tarefa_ids).delete()
+    return apagados.get('core.Tarefa', 0)
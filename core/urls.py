@@ -20,13 +20,26 @@ urlpatterns = [
 
     path('chat/<str:username>/', views.sala_chat, name='sala_chat'),
 
+    path('api/chat/<str:username>/mensagens/', views.api_mensagens, name='api_mensagens'),
+
     path('nova-tarefa/', views.nova_tarefa, name='nova_tarefa'),
+    path('tarefas/varios-alunos/', views.atribuir_tarefas, name='atribuir_tarefas'),
+    path('tarefas/turma/<int:id>/excluir/', views.excluir_turma, name='excluir_turma'),
+    path('tarefas/em-lote/', views.tarefas_em_lote, name='tarefas_em_lote'),
 
     path('calendario/', views.calendario, name='calendario'),
 
+    path('api/calendario/', views.api_calendario, name='api_calendario'),
+
+    path('api/agenda/disponibilidade/', views.api_disponibilidade, name='api_disponibilidade'),
+
+    path('calendario/feed/<str:token>.ics', views.feed_agenda, name='feed_agenda'),
+
     path('quem-somos/', views.quem_somos, name='quem_somos'),
 
     path('comunidade/', views.usuarios_online, name='usuarios_online'),
+    path('api/diretorio/', views.api_diretorio, name='api_diretorio'),
+    path('api/usuarios/', views.api_usuarios, name='api_usuarios'),
 
     path('perfil/', views.meu_perfil, name='meu_perfil'),
 
@@ -42,13 +55,21 @@ urlpatterns = [
 
     path('forum/', views.forum, name='forum'),
 
+    path('forum/mais/', views.forum_mais, name='forum_mais'),
+
     path('forum/post/<int:pk>/', views.post_detail, name='post_detail'),
+    path('forum/post/<int:pk>/comentarios/', views.comentarios_mais, name='comentarios_mais'),
+    path('comentario/<int:pk>/respostas/', views.comentario_respostas, name='comentario_respostas'),
     
     path('forum/like/<int:pk>/', views.dar_like, name='dar_like'),
 
+    path('api/forum/post/<int:pk>/like/', views.api_like, name='api_like'),
+
     path('post/<int:pk>/deletar/', views.deletar_post, name='deletar_post'),
 
     path('comentario/<int:pk>/deletar/', views.deletar_comentario, name='deletar_comentario'),
 
+    path('eventos/', views.stream_eventos, name='stream_eventos'),
+
     path('notificacao/<int:id>/lida/', views.marcar_notificacao_lida, name='marcar_notificacao_lida'),
 ]
\ No newline at end of file
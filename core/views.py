@@ -1,18 +1,30 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import condition, require_POST
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils import timezone
 from django.db.models import Q
-from .models import Mensagem, Reuniao, Tarefa, Perfil, Notificacao
-from .forms import ReuniaoForm, TarefaForm
+from .models import Mensagem, Reuniao, Tarefa, Perfil, Notificacao, Conversa
+from .forms import ReuniaoForm, TarefaEmLoteForm, TarefaForm
 from django.contrib.auth.models import User
 from django.contrib import messages
 from .forms import UserUpdateForm, PerfilUpdateForm
-from django.http import HttpResponseForbidden
-from django.db.models import Count 
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.db.models import Exists, F, Max, OuterRef
+from django.db import IntegrityError, transaction
+from django.template.loader import render_to_string
 from .forms import PostForm, ComentarioForm
 from .models import Post, Comentario 
+from . import agenda, busca, chat, comentarios, diretorio, eventos, fila, notificacoes, painel, paginas, presenca, recorrencia, turmas
 
 # --- Página de Entrada (Pública) ---
+@paginas.em_cache_para_visitantes
 def home(request):
     # Se o usuário já estiver logado, manda direto pro painel
     if request.user.is_authenticated:
@@ -22,30 +34,8 @@ def home(request):
 # --- Painel Principal (Protegido) ---
 @login_required
 def dashboard(request):
-    hoje = timezone.now().date()
-    
-    # Busca reuniões onde sou solicitante OU estou na lista de convidados
-    reunioes = Reuniao.objects.filter(
-        Q(solicitante=request.user) | Q(convidados=request.user)
-    ).filter(data_inicio__date=hoje).distinct().order_by('data_inicio')
-    
-    # Mostra se: Eu sou o dono da tarefa (usuario) OU Eu fui quem criou (criador)
-    tarefas = Tarefa.objects.filter(
-        Q(usuario=request.user) | Q(criador=request.user),
-        data_prazo=hoje
-    ).distinct()
-    
-    avisos = Notificacao.objects.filter(destinatario=request.user, lida=False).order_by('-data_criacao')
-    # Conta mensagens não lidas
-    notificacoes = Mensagem.objects.filter(destinatario=request.user, lido=False).count()
-    
-    context = {
-        'reunioes': reunioes,
-        'tarefas': tarefas,
-        'notificacoes': notificacoes,
-        'avisos': avisos,
-        'hoje': hoje
-    }
+    # Reuniões e tarefas de hoje, avisos e mensagens não lidas: tudo vem do retrato em cache (core/painel.py)
+    context = painel.painel_do_usuario(request.user)
     return render(request, 'dashboard.html', context)
 
 # --- CRIAR REUNIÃO (Renomeado para bater com o HTML) ---
@@ -56,9 +46,9 @@ def nova_reuniao(request):
         if form.is_valid():
             reuniao = form.save(commit=False)
             reuniao.solicitante = request.user
-            reuniao.save() # Salva os dados básicos (título, data)
-            
-            form.save_m2m() # <--- OBRIGATÓRIO: Salva os convidados (Many-to-Many)
+            with transaction.atomic():
+                reuniao.save() # Salva os dados básicos (título, data) e o organizador como participante
+                reuniao.definir_convidados(form.cleaned_data['convidados'])
             
             messages.success(request, 'Reunião agendada com sucesso!')
             # MUDANÇA AQUI: Agora vai para o calendário
@@ -70,13 +60,25 @@ def nova_reuniao(request):
 
 @login_required
 def lista_usuarios(request):
-    # Busca usuários que trocaram mensagens comigo
-    usuarios = User.objects.filter(
-        Q(mensagens_enviadas__destinatario=request.user) | 
-        Q(mensagens_recebidas__remetente=request.user)
-    ).distinct().exclude(id=request.user.id)
+    # Caixa de entrada: uma linha de Conversa por pessoa com quem troquei mensagens, mais recente primeiro
+    conversas = Conversa.objects.filter(
+        Q(usuario_a=request.user) | Q(usuario_b=request.user)
+    ).select_related('usuario_a__perfil', 'usuario_b__perfil', 'ultima_mensagem').order_by('-ultima_data')
+
+    conversas = list(conversas)
+    for conversa in conversas:
+        conversa.outro_usuario = conversa.outro(request.user)
+        conversa.nao_lidas = conversa.nao_lidas_para(request.user)
+
+    return render(request, 'lista_usuarios.html', {'conversas': conversas})
 
-    return render(request, 'lista_usuarios.html', {'usuarios': usuarios})
+MENSAGENS_POR_PAGINA = 50
+
+def _mensagens_da_conversa(usuario, outro_usuario):
+    return Mensagem.objects.filter(
+        Q(remetente=usuario, destinatario=outro_usuario) | 
+        Q(remetente=outro_usuario, destinatario=usuario)
+    )
 
 @login_required
 def sala_chat(request, username):
@@ -85,23 +87,73 @@ def sala_chat(request, username):
     if request.method == 'POST':
         conteudo = request.POST.get('conteudo')
         if conteudo:
-            Mensagem.objects.create(
-                remetente=request.user,
-                destinatario=outro_usuario,
-                conteudo=conteudo
-            )
+            chat.enviar_mensagem(request.user, outro_usuario, conteudo)
             return redirect('sala_chat', username=username)
 
-    mensagens = Mensagem.objects.filter(
-        Q(remetente=request.user, destinatario=outro_usuario) | 
-        Q(remetente=outro_usuario, destinatario=request.user)
-    ).order_by('data_envio')
+    # Só a "cauda" da conversa; o histórico mais antigo vem pela API sob demanda
+    ultimas = list(_mensagens_da_conversa(request.user, outro_usuario).order_by('-id')[:MENSAGENS_POR_PAGINA + 1])
+    tem_anteriores = len(ultimas) > MENSAGENS_POR_PAGINA
+    mensagens = ultimas[:MENSAGENS_POR_PAGINA][::-1]
 
-    Mensagem.objects.filter(remetente=outro_usuario, destinatario=request.user, lido=False).update(lido=True)
+    chat.marcar_como_lidas(request.user, outro_usuario)
 
     return render(request, 'chat.html', {
         'outro_usuario': outro_usuario,
-        'mensagens': mensagens
+        'mensagens': mensagens,
+        'tem_anteriores': tem_anteriores,
+    })
+
+@login_required
+def api_mensagens(request, username):
+    """
+    Histórico paginado da conversa com `username`, sempre em ordem crescente de id:
+      GET            -> as últimas N mensagens
+      GET ?antes=ID  -> N mensagens mais antigas que ID ("carregar anteriores")
+      GET ?depois=ID -> mensagens novas depois de ID (polling incremental)
+      POST conteudo  -> envia uma mensagem e devolve ela em JSON
+    """
+    outro_usuario = get_object_or_404(User, username=username)
+    conversa = _mensagens_da_conversa(request.user, outro_usuario)
+
+    if request.method == 'POST':
+        conteudo = (request.POST.get('conteudo') or '').strip()
+        if not conteudo:
+            return JsonResponse({'erro': 'Mensagem vazia.'}, status=400)
+        msg = chat.enviar_mensagem(request.user, outro_usuario, conteudo)
+        return JsonResponse({'mensagem': chat.mensagem_json(msg, request.user)}, status=201)
+
+    try:
+        antes = int(request.GET['antes']) if request.GET.get('antes') else None
+        depois = int(request.GET['depois']) if request.GET.get('depois') else None
+    except ValueError:
+        return JsonResponse({'erro': 'Cursor inválido.'}, status=400)
+    # Fora da faixa da coluna o banco daria OverflowError (depois=0 é o polling de uma conversa vazia)
+    if any(cursor is not None and not 0 <= cursor <= MAX_ID for cursor in (antes, depois)):
+        return JsonResponse({'erro': 'Cursor inválido.'}, status=400)
+
+    if depois is not None:
+        lote = list(conversa.filter(id__gt=depois).order_by('id')[:MENSAGENS_POR_PAGINA + 1])
+        tem_mais = len(lote) > MENSAGENS_POR_PAGINA
+        lote = lote[:MENSAGENS_POR_PAGINA]
+    else:
+        if antes is not None:
+            conversa = conversa.filter(id__lt=antes)
+        lote = list(conversa.order_by('-id')[:MENSAGENS_POR_PAGINA + 1])
+        tem_mais = len(lote) > MENSAGENS_POR_PAGINA
+        lote = lote[:MENSAGENS_POR_PAGINA][::-1]
+
+    if antes is None:
+        chat.marcar_como_lidas(request.user, outro_usuario)
+
+    # Confirmação de leitura: como a leitura marca tudo de uma vez, basta o maior id lido
+    lidas_ate = Mensagem.objects.filter(
+        remetente=request.user, destinatario=outro_usuario, lido=True
+    ).aggregate(maior=Max('id'))['maior']
+
+    return JsonResponse({
+        'mensagens': [chat.mensagem_json(m, request.user) for m in lote],
+        'tem_mais': tem_mais,
+        'lidas_ate': lidas_ate,
     })
 
 # --- CRIAR TAREFA (Renomeado para bater com o HTML) ---
@@ -134,46 +186,264 @@ def nova_tarefa(request):
     # Usamos o 'form_generico.html' pois você disse que funcionou melhor
     return render(request, 'form_generico.html', {'form': form, 'titulo': 'Nova Tarefa'})
 
+# --- MESMA TAREFA PARA VÁRIOS ALUNOS (MENTORES) ---
+@login_required
+def atribuir_tarefas(request):
+    if request.user.perfil.tipo != 'Mentor':
+        messages.error(request, 'Só mentores podem passar tarefas para vários alunos.')
+        return redirect('nova_tarefa')
+
+    if request.method == 'POST':
+        form = TarefaEmLoteForm(request.POST, user=request.user)
+        if form.is_valid():
+            ids = form.cleaned_data['destinatarios']
+            with transaction.atomic():
+                # Um bulk_create e os avisos na fila (ver core/turmas.py)
+                novas = turmas.atribuir(request.user, form.instance, ids)
+                if form.cleaned_data['salvar_turma']:
+                    turmas.salvar_turma(request.user, form.cleaned_data['salvar_turma'], ids)
+            messages.success(request, f'Tarefa passada para {len(novas)} aluno(s)!')
+            return redirect('calendario')
+    else:
+        form = TarefaEmLoteForm(user=request.user)
+
+    return render(request, 'atribuir_tarefas.html', {'form': form})
+
+@login_required
+@require_POST
+def excluir_turma(request, id):
+    request.user.turmas.filter(id=id).delete()
+    messages.success(request, 'Turma apagada.')
+    return redirect('atribuir_tarefas')
+
+@login_required
+@require_POST
+def tarefas_em_lote(request):
+    # Concluir/excluir as tarefas marcadas na lista do calendário, numa consulta só
+    ids = set()
+    for valor in request.POST.getlist('tarefas'):
+        try:
+            ids.add(_ler_id(valor))
+        except ValueError:
+            pass  # não é id (ou não cabe na coluna, que daria OverflowError no filtro): fica de fora
+    acao = request.POST.get('acao')
+    if not ids:
+        messages.error(request, 'Nenhuma tarefa marcada.')
+    elif acao == 'concluir':
+        total = turmas.concluir(request.user, ids)
+        messages.success(request, f'{total} tarefa(s) concluída(s).')
+    elif acao == 'excluir':
+        total = turmas.excluir(request.user, ids)
+        messages.success(request, f'{total} tarefa(s) excluída(s).')
+        if total < len(ids):
+            messages.warning(request, 'Só quem criou a tarefa pode excluir: as outras ficaram.')
+    else:
+        messages.error(request, 'Ação inválida.')
+    return redirect('calendario')
+
+# --- CALENDÁRIO ---
+JANELA_CALENDARIO = timedelta(days=90)
+MAX_TAREFAS_ANTIGAS = 20
+MAX_DIAS_API_CALENDARIO = 62  # um mês com folga (visão mensal mostra semanas vizinhas)
+MAX_ID = 2**31 - 1  # maior id de um AutoField (integer) em qualquer banco
+# Perto do ano 1 ou 9999 as contas com folga (séries, duração máxima) estourariam o datetime (OverflowError)
+ANOS_CALENDARIO = range(1900, 3001)
+
 @login_required
 def calendario(request):
     agora = timezone.now()
     hoje = agora.date()
+    limite = agora + JANELA_CALENDARIO
 
-    # 1. Reuniões (Com filtro de segurança)
-    reunioes = Reuniao.objects.filter(
-        Q(solicitante=request.user) | Q(convidados=request.user),
-        data_inicio__gte=agora
-    ).distinct().order_by('data_inicio')
+    # 1. Reuniões e tarefas da janela (o resto o usuário vê pela API/feed .ics); séries viram ocorrências
+    reunioes = agenda.ocorrencias_de_reunioes(agenda.reunioes_do_usuario(request.user, agora, limite), agora, limite)
+    tarefas = agenda.ocorrencias_de_tarefas(agenda.tarefas_do_usuario(request.user, hoje, limite.date()), hoje, limite.date())
 
-    # 2. Tarefas (Com filtro de segurança)
-    todas_minhas_tarefas = Tarefa.objects.filter(
-        Q(usuario=request.user) | Q(criador=request.user)
-    ).distinct()
-
-    # Separa em Futuras e Antigas
-    tarefas = todas_minhas_tarefas.filter(data_prazo__gte=hoje).order_by('data_prazo')
-    tarefas_antigas = todas_minhas_tarefas.filter(data_prazo__lt=hoje).order_by('-data_prazo')
+    # 2. Tarefas antigas: só as mais recentes, o histórico não cresce para sempre na página
+    # (séries que ainda estão valendo aparecem nas pendentes, não aqui)
+    antigas = Tarefa.objects.filter(
+        Q(usuario=request.user) | Q(criador=request.user), data_prazo__lt=hoje
+    ).exclude(fim_da_serie__gte=hoje).order_by('-data_prazo', '-id')
 
     context = {
         'reunioes': reunioes,
         'tarefas': tarefas,
-        'tarefas_antigas': tarefas_antigas,
+        'tarefas_antigas': antigas[:MAX_TAREFAS_ANTIGAS],
+        'total_tarefas_antigas': antigas.count(),
+        'dias_janela': JANELA_CALENDARIO.days,
+        'link_feed': request.build_absolute_uri(reverse('feed_agenda', args=[agenda.token_do_feed(request.user)])),
     }
     return render(request, 'calendario.html', context)
 
+
+def _ler_id(valor):
+    # int() de um id vindo da URL; fora da faixa da coluna também é ValueError (o banco daria OverflowError)
+    id = int(valor)
+    if not 0 < id <= MAX_ID:
+        raise ValueError(f'id fora da faixa: {valor}')
+    return id
+
+def _ler_momento(valor):
+    # Aceita data (2026-10-01) ou data/hora ISO (2026-10-01T00:00:00-03:00), como os calendários JS mandam
+    if not valor:
+        return None
+    try:
+        momento = parse_datetime(valor)
+        if momento is None:
+            dia = parse_date(valor)
+            return agenda.inicio_do_dia(dia) if dia else None
+    except ValueError:
+        return None
+    return momento if timezone.is_aware(momento) else timezone.make_aware(momento)
+
+
+@login_required
+def api_calendario(request):
+    inicio = _ler_momento(request.GET.get('start'))
+    fim = _ler_momento(request.GET.get('end'))
+    if inicio is None or fim is None or fim <= inicio or not (inicio.year in ANOS_CALENDARIO and fim.year in ANOS_CALENDARIO):
+        return JsonResponse({'erro': 'Informe start e end válidos (start < end).'}, status=400)
+    if fim - inicio > timedelta(days=MAX_DIAS_API_CALENDARIO):
+        return JsonResponse({'erro': f'Período máximo de {MAX_DIAS_API_CALENDARIO} dias.'}, status=400)
+
+    reunioes = agenda.ocorrencias_de_reunioes(agenda.reunioes_do_usuario(request.user, inicio, fim), inicio, fim)
+    # Prazo é data: pega todo dia que a janela toca
+    primeiro_dia = timezone.localtime(inicio).date()
+    dia_seguinte = timezone.localtime(fim - timedelta(microseconds=1)).date() + timedelta(days=1)
+    tarefas = agenda.ocorrencias_de_tarefas(agenda.tarefas_do_usuario(request.user, primeiro_dia, dia_seguinte), primeiro_dia, dia_seguinte)
+
+    return JsonResponse({
+        'reunioes': [agenda.reuniao_json(r) for r in reunioes],
+        'tarefas': [agenda.tarefa_json(t) for t in tarefas],
+    })
+
+
+MAX_USUARIOS_DISPONIBILIDADE = 500
+
+
+@login_required
+def api_disponibilidade(request):
+    """
+    ?usuarios=3,8,15&inicio=...&fim=...&duracao=60[&reuniao=ID para ignorar ao editar]
+    Devolve quem tem conflito em [inicio, inicio+duracao) e as primeiras folgas comuns até `fim`.
+    """
+    try:
+        ids = [_ler_id(i) for i in request.GET.get('usuarios', '').split(',') if i.strip()]
+        minutos = int(request.GET.get('duracao', 60))
+        ignorar = _ler_id(request.GET['reuniao']) if request.GET.get('reuniao') else None
+    except ValueError:
+        return JsonResponse({'erro': 'Parâmetros inválidos.'}, status=400)
+
+    inicio = _ler_momento(request.GET.get('inicio')) or timezone.now()
+    fim = _ler_momento(request.GET.get('fim')) or inicio + timedelta(days=7)
+    # Os minutos são conferidos antes de virar timedelta: um número enorme daria OverflowError (500)
+    if (
+        not 0 < minutos <= agenda.DURACAO_MAXIMA // timedelta(minutes=1) or fim <= inicio
+        or not (inicio.year in ANOS_CALENDARIO and fim.year in ANOS_CALENDARIO)
+    ):
+        return JsonResponse({'erro': 'Período ou duração inválidos.'}, status=400)
+    duracao = timedelta(minutes=minutos)
+    if fim - inicio > timedelta(days=MAX_DIAS_API_CALENDARIO):
+        return JsonResponse({'erro': f'Período máximo de {MAX_DIAS_API_CALENDARIO} dias.'}, status=400)
+    if len(ids) > MAX_USUARIOS_DISPONIBILIDADE:
+        return JsonResponse({'erro': f'No máximo {MAX_USUARIOS_DISPONIBILIDADE} usuários.'}, status=400)
+
+    ids = [request.user.id] + [i for i in ids if i != request.user.id]
+    ocupados = agenda.conflitos(ids, inicio, inicio + duracao, ignorar_reuniao=ignorar)
+    nomes = dict(User.objects.filter(id__in=ocupados).values_list('id', 'username'))
+    livres = agenda.horarios_livres(ids, inicio, fim, duracao, limite=5, ignorar_reuniao=ignorar)
+
+    def intervalo(ini, fi):
+        return {'inicio': timezone.localtime(ini).isoformat(), 'fim': timezone.localtime(fi).isoformat()}
+
+    return JsonResponse({
+        # Só os horários ocupados, sem título: a agenda dos outros não é da minha conta
+        'conflitos': [
+            {'usuario_id': uid, 'username': nomes.get(uid), 'ocupado': [intervalo(i, f) for i, f in intervalos]}
+            for uid, intervalos in ocupados.items()
+        ],
+        'livres': [intervalo(i, f) for i, f in livres],
+    })
+
+def _dono_do_feed(request, token):
+    # Guardado no request: o @condition (ETag) e a view precisam dele, uma consulta só
+    if not hasattr(request, 'dono_do_feed'):
+        user_id = agenda.usuario_do_token(token)
+        request.dono_do_feed = User.objects.filter(pk=user_id, is_active=True).first() if user_id else None
+    return request.dono_do_feed
+
+
+def _etag_do_feed(request, token):
+    usuario = _dono_do_feed(request, token)
+    return agenda.etag_do_feed(usuario) if usuario else None
+
+
+# Feed .ics para Google Agenda/Outlook/etc. Sem login (o token assinado identifica o usuário);
+# os apps consultam de tempos em tempos e recebem 304 se nada mudou (If-None-Match).
+@condition(etag_func=_etag_do_feed)
+def feed_agenda(request, token):
+    usuario = _dono_do_feed(request, token)
+    if usuario is None:
+        return HttpResponse(status=404)
+
+    resposta = StreamingHttpResponse(agenda.linhas_ics(usuario, request.get_host()), content_type='text/calendar; charset=utf-8')
+    resposta['Content-Disposition'] = 'inline; filename="agenda.ics"'
+    resposta['Cache-Control'] = 'private, max-age=300'
+    return resposta
+
+@paginas.em_cache_para_visitantes
 def quem_somos(request):
     return render(request, 'quem_somos.html')
 
 @login_required
 def usuarios_online(request):
-    mentores = User.objects.filter(perfil__tipo='Mentor', is_active=True)
-    estudantes = User.objects.filter(perfil__tipo='Estudante', is_active=True)
+    # Quem está online agora (core/presenca.py) e, embaixo, duas colunas paginadas (?mentores=2&estudantes=3)
+    # com os filtros do diretório (core/diretorio.py): o número de consultas não depende de quantos usuários existem
+    filtros = diretorio.ler_filtros(request.GET)
+    filtros.pop('tipo', None)
 
     return render(request, 'usuarios_online.html', {
-        'mentores': mentores,
-        'estudantes': estudantes
+        'online': presenca.online(),
+        'online_desde': presenca.online_desde(),
+        'mentores': diretorio.pagina(diretorio.perfis(tipo='Mentor', **filtros), request.GET.get('mentores')),
+        'estudantes': diretorio.pagina(diretorio.perfis(tipo='Estudante', **filtros), request.GET.get('estudantes')),
+        'filtros': filtros,
+        'facetas': diretorio.facetas(),
     })
 
+
+@login_required
+def api_diretorio(request):
+    """?tipo=Mentor&cidade=Recife&profissao=...&empresa=...&formacao=...&q=texto no bio&pagina=2&por_pagina=24"""
+    filtros = diretorio.ler_filtros(request.GET)
+    if filtros.get('tipo') and filtros['tipo'] not in diretorio.TIPOS:
+        return JsonResponse({'erro': f"tipo deve ser um de: {', '.join(diretorio.TIPOS)}."}, status=400)
+    try:
+        por_pagina = int(request.GET.get('por_pagina', diretorio.POR_PAGINA))
+    except ValueError:
+        return JsonResponse({'erro': 'por_pagina inválido.'}, status=400)
+    if por_pagina < 1:
+        return JsonResponse({'erro': 'por_pagina inválido.'}, status=400)
+
+    pagina = diretorio.pagina(diretorio.perfis(**filtros), request.GET.get('pagina'), por_pagina)
+    return JsonResponse({
+        'resultados': [diretorio.perfil_json(p) for p in pagina],
+        'pagina': pagina.number,
+        'paginas': pagina.paginator.num_pages,
+        'total': pagina.paginator.count,
+        'facetas': diretorio.facetas(),
+    })
+
+@login_required
+def api_usuarios(request):
+    """?q=começo do nome&tipo=Mentor (autocompletar dos seletores de usuário; quem pergunta fica de fora)"""
+    tipo = request.GET.get('tipo') or None
+    if tipo and tipo not in diretorio.TIPOS:
+        return JsonResponse({'erro': f"tipo deve ser um de: {', '.join(diretorio.TIPOS)}."}, status=400)
+
+    usuarios = diretorio.usuarios_por_prefixo(request.GET.get('q'), tipo=tipo, excluir=request.user.id)
+    return JsonResponse({'usuarios': [diretorio.usuario_json(u) for u in usuarios]})
+
 @login_required
 def meu_perfil(request):
     if request.method == 'POST':
@@ -182,7 +452,13 @@ def meu_perfil(request):
 
         if u_form.is_valid() and p_form.is_valid():
             u_form.save()
-            p_form.save()
+            perfil = p_form.save(commit=False)
+            if 'foto' in p_form.changed_data:
+                # As versões da foto antiga saem já; as da nova o worker gera (até lá vai o original)
+                perfil.foto_versoes = {}
+            perfil.save()
+            if perfil.foto and 'foto' in p_form.changed_data:
+                fila.enfileirar('imagens.foto', perfil_id=perfil.id, nome=perfil.foto.name)
             return redirect('meu_perfil') 
             
     else:
@@ -198,8 +474,9 @@ def meu_perfil(request):
 def perfil_publico(request, username):
     perfil_user = get_object_or_404(User, username=username)
     
-    # Busca os posts desse usuário (do mais novo para o mais velho)
-    posts = Post.objects.filter(autor=perfil_user).order_by('-data_criacao')
+    # Busca os posts desse usuário (do mais novo para o mais velho); cada card vem do cache
+    # enquanto o post não muda (core/paginas.py)
+    posts = paginas.anotar_versoes(Post.objects.filter(autor=perfil_user).order_by('-data_criacao'))
     
     context = {
         'perfil_user': perfil_user,
@@ -207,6 +484,30 @@ def perfil_publico(request, username):
     }
     return render(request, 'perfil_publico.html', context)
 
+def _ler_dia(valor):
+    try:
+        return parse_date(valor or '')
+    except ValueError:  # formato certo, data impossível (2026-02-31)
+        return None
+
+
+def _dia_da_ocorrencia(request):
+    # ?data=AAAA-MM-DD nos links de editar/excluir: mexe só naquela ocorrência da série
+    return _ler_dia(request.GET.get('data'))
+
+
+def _ler_repeticao(request, objeto):
+    # Campos de repetição dos forms de edição (série inteira)
+    frequencia = request.POST.get('frequencia', '')
+    objeto.frequencia = frequencia if frequencia in dict(recorrencia.FREQUENCIAS) else ''
+    objeto.repetir_ate = _ler_dia(request.POST.get('repetir_ate')) if objeto.frequencia else None
+    try:
+        repeticoes = int(request.POST.get('repeticoes') or 0)
+    except ValueError:
+        repeticoes = 0
+    objeto.repeticoes = min(repeticoes, recorrencia.MAX_REPETICOES) if objeto.frequencia and repeticoes > 0 else None
+
+
 @login_required
 def editar_tarefa(request, id):
     tarefa = get_object_or_404(Tarefa, id=id)
@@ -215,20 +516,45 @@ def editar_tarefa(request, id):
     if tarefa.criador != request.user:
         return HttpResponseForbidden("Você não tem permissão.")
 
+    # Uma ocorrência só da série: só o prazo muda (vira uma TarefaExcecao)
+    dia = _dia_da_ocorrencia(request) if tarefa.frequencia else None
+    ocorrencia = agenda.ocorrencia_da_tarefa(tarefa, dia) if dia else None
+    if dia and ocorrencia is None:
+        raise Http404("Essa ocorrência não existe.")
+
     if request.method == 'POST':
+        if ocorrencia:
+            prazo = _ler_dia(request.POST.get('data'))
+            if prazo is None or abs(prazo - ocorrencia.original) > recorrencia.DESLOCAMENTO_MAXIMO:
+                messages.error(request, f"Uma ocorrência só pode mudar até {recorrencia.DESLOCAMENTO_MAXIMO.days} dias de lugar.")
+                return render(request, 'editar_tarefa.html', {'tarefa': ocorrencia, 'ocorrencia': ocorrencia})
+            tarefa.alterar_ocorrencia(ocorrencia.original, data_prazo=prazo)
+            return redirect('calendario')
+
+        antes = (tarefa.data_prazo, tarefa.frequencia)
         tarefa.titulo = request.POST.get('titulo')
-        tarefa.data_prazo = request.POST.get('data')
+        tarefa.data_prazo = _ler_dia(request.POST.get('data')) or tarefa.data_prazo
         tarefa.informacoes = request.POST.get('descricao')
-        tarefa.save()
+        _ler_repeticao(request, tarefa)
+        with transaction.atomic():
+            tarefa.save()
+            if antes != (tarefa.data_prazo, tarefa.frequencia):
+                # Mudou o dia ou a frequência: as exceções (chaveadas pela data de cada ocorrência) não valem mais
+                tarefa.excecoes.all().delete()
         return redirect('calendario') # Redireciona para o calendário
     
-    return render(request, 'editar_tarefa.html', {'tarefa': tarefa})
+    return render(request, 'editar_tarefa.html', {'tarefa': ocorrencia or tarefa, 'ocorrencia': ocorrencia, 'frequencias': recorrencia.FREQUENCIAS})
 
 @login_required
 def excluir_tarefa(request, id):
     tarefa = get_object_or_404(Tarefa, id=id)
     if tarefa.criador == request.user:
-        tarefa.delete()
+        dia = _dia_da_ocorrencia(request)
+        if dia and tarefa.frequencia:
+            # Só esta ocorrência: fica registrada como cancelada, a série continua
+            tarefa.alterar_ocorrencia(dia, cancelada=True)
+        else:
+            tarefa.delete()
     return redirect('calendario')
 
 @login_required
@@ -239,30 +565,193 @@ def editar_reuniao(request, id):
     if reuniao.solicitante != request.user:
         return HttpResponseForbidden("Você não tem permissão.")
 
+    # Uma ocorrência só da série: só o horário muda (vira uma ReuniaoExcecao)
+    dia = _dia_da_ocorrencia(request) if reuniao.frequencia else None
+    ocorrencia = agenda.ocorrencia_da_reuniao(reuniao, dia) if dia else None
+    if dia and ocorrencia is None:
+        raise Http404("Essa ocorrência não existe.")
+    if ocorrencia:
+        return _editar_ocorrencia(request, reuniao, ocorrencia)
+
     if request.method == 'POST':
+        antes = (timezone.localtime(reuniao.data_inicio).date(), reuniao.frequencia)
         reuniao.titulo = request.POST.get('titulo')
         
         data_str = request.POST.get('data')
         hora_str = request.POST.get('hora')
+        hora_fim_str = request.POST.get('hora_fim')
         
-        if data_str and hora_str:
-            reuniao.data_inicio = f"{data_str} {hora_str}"
+        inicio = _ler_momento(f"{data_str}T{hora_str}") if data_str and hora_str else None
+        if inicio:
+            # Sem hora de término no POST, mantém a duração que a reunião já tinha
+            fim = _ler_momento(f"{data_str}T{hora_fim_str}") if hora_fim_str else inicio + (reuniao.data_fim - reuniao.data_inicio)
+            if fim is None or fim <= inicio or fim - inicio > agenda.DURACAO_MAXIMA:
+                messages.error(request, "Horário de término inválido.")
+                return render(request, 'editar_reuniao.html', {'reuniao': reuniao, 'frequencias': recorrencia.FREQUENCIAS})
+            reuniao.data_inicio, reuniao.data_fim = inicio, fim
             
         reuniao.link_externo = request.POST.get('link')
-        reuniao.save()
+        _ler_repeticao(request, reuniao)
+        with transaction.atomic():
+            reuniao.save()
+            if antes != (timezone.localtime(reuniao.data_inicio).date(), reuniao.frequencia):
+                # Mudou o dia ou a frequência: as exceções (chaveadas pela data de cada ocorrência) não valem mais
+                reuniao.excecoes.all().delete()
+
+        # Editar não bloqueia, mas avisa se alguém ficou com dois compromissos ao mesmo tempo (em qualquer ocorrência)
+        horarios = agenda.horarios_da_serie(reuniao.data_inicio, reuniao.data_fim, reuniao.frequencia, reuniao.repetir_ate, reuniao.repeticoes)
+        _avisar_conflitos(request, reuniao, horarios)
         return redirect('calendario') # Redireciona para o calendário
     
-    return render(request, 'editar_reuniao.html', {'reuniao': reuniao})
+    return render(request, 'editar_reuniao.html', {'reuniao': reuniao, 'frequencias': recorrencia.FREQUENCIAS})
+
+
+def _avisar_conflitos(request, reuniao, horarios):
+    ids = reuniao.participacoes.values_list('usuario_id', flat=True)
+    ocupados = agenda.conflitos_da_serie(ids, horarios, ignorar_reuniao=reuniao.pk)
+    if ocupados:
+        nomes = ', '.join(User.objects.filter(id__in=ocupados).values_list('username', flat=True))
+        messages.warning(request, f"Atenção: conflito de horário para {nomes}.")
+
+
+def _editar_ocorrencia(request, reuniao, ocorrencia):
+    contexto = {'reuniao': ocorrencia, 'ocorrencia': ocorrencia}
+    if request.method != 'POST':
+        return render(request, 'editar_reuniao.html', contexto)
+
+    data_str = request.POST.get('data')
+    inicio = _ler_momento(f"{data_str}T{request.POST.get('hora')}") if data_str else None
+    fim = _ler_momento(f"{data_str}T{request.POST.get('hora_fim')}") if data_str else None
+    if (
+        inicio is None or fim is None or not timedelta(0) < fim - inicio <= agenda.DURACAO_MAXIMA
+        or abs(inicio - ocorrencia.inicio_original) > recorrencia.DESLOCAMENTO_MAXIMO
+    ):
+        messages.error(request, f"Horário inválido (uma ocorrência só pode mudar até {recorrencia.DESLOCAMENTO_MAXIMO.days} dias de lugar).")
+        return render(request, 'editar_reuniao.html', contexto)
+
+    reuniao.alterar_ocorrencia(ocorrencia.original, data_inicio=inicio, data_fim=fim)
+    _avisar_conflitos(request, reuniao, [(inicio, fim)])
+    return redirect('calendario')
 
 @login_required
 def excluir_reuniao(request, id):
     reuniao = get_object_or_404(Reuniao, id=id)
     if reuniao.solicitante == request.user:
-        reuniao.delete()
+        dia = _dia_da_ocorrencia(request)
+        if dia and reuniao.frequencia:
+            # Só esta ocorrência: fica registrada como cancelada, a série continua
+            reuniao.alterar_ocorrencia(dia, cancelada=True)
+        else:
+            reuniao.delete()
     return redirect('calendario')
 
 
 # --- VIEW DO FÓRUM (FEED) ---
+POSTS_POR_PAGINA = 20
+MAX_OFFSET_BUSCA = 10_000  # 500 páginas de resultados
+TIPOS_DO_CURSOR = {'data_criacao': str, 'likes_count': int, 'id': int}  # a data vai em ISO
+
+def _codificar_cursor(valores):
+    # O cursor é só a "posição" do último post da página (ordem + id), em base64
+    bruto = json.dumps(valores, separators=(',', ':'))
+    return base64.urlsafe_b64encode(bruto.encode()).decode()
+
+def _decodificar_cursor(cursor):
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return valores if isinstance(valores, list) else None
+
+def _filtro_keyset(campos, valores):
+    # Para ordem DESC em (c1, c2, ..., id): c1 < v1 OU (c1 = v1 E c2 < v2) OU ...
+    filtro = Q()
+    for i, campo in enumerate(campos):
+        iguais = {c: v for c, v in zip(campos[:i], valores[:i])}
+        filtro |= Q(**iguais, **{f'{campo}__lt': valores[i]})
+    return filtro
+
+def _posts_do_feed(request):
+    # Tudo que o card precisa vem na mesma consulta: autor/perfil (JOIN),
+    # contagens (colunas do próprio Post) e o "curti?" (subconsulta só para as linhas da página)
+    curtidas = Post.likes.through.objects.filter(post_id=OuterRef('pk'), user_id=request.user.id)
+    posts = Post.objects.select_related('autor__perfil').annotate(curtido=Exists(curtidas))
+
+    # Filtro de Tipo de Usuário (Alunos ou Mentores)
+    tipo_autor = _tipo_autor(request)
+    if tipo_autor:
+        posts = posts.filter(autor__perfil__tipo=tipo_autor)
+
+    return posts
+
+def _tipo_autor(request):
+    return {'mentores': 'Mentor', 'alunos': 'Estudante'}.get(request.GET.get('filtro_autor'))
+
+def _pagina_da_busca(request, query, cursor=None):
+    # Com busca, a ordem é por relevância (vem do índice), então o cursor é só o offset
+    offset = 0
+    if cursor:
+        valores = _decodificar_cursor(cursor)
+        # Com limite: offset enorme não cabe no OFFSET do banco (OverflowError) e ninguém pagina até lá
+        if not valores or len(valores) != 1 or type(valores[0]) is not int or not 0 <= valores[0] <= MAX_OFFSET_BUSCA:
+            raise ValueError('cursor inválido')
+        offset = valores[0]
+
+    ids = busca.buscar_posts(query, _tipo_autor(request), limite=POSTS_POR_PAGINA + 1, offset=offset)
+    proximo_cursor = None
+    if len(ids) > POSTS_POR_PAGINA:
+        ids = ids[:POSTS_POR_PAGINA]
+        proximo_cursor = _codificar_cursor([offset + POSTS_POR_PAGINA])
+
+    por_id = _posts_do_feed(request).in_bulk(ids)
+    return [por_id[i] for i in ids if i in por_id], proximo_cursor
+
+def _pagina_do_feed(request, cursor=None):
+    """Devolve (posts, proximo_cursor) de uma página do feed, paginado por keyset."""
+    query = request.GET.get('q')
+    if query and busca.disponivel():
+        return _pagina_da_busca(request, query, cursor)
+
+    posts = _posts_do_feed(request)
+
+    # Busca (Search) sem índice textual (banco sem FTS): volta para o icontains
+    if query:
+        # Busca no conteúdo do post OU no username do autor
+        posts = posts.filter(
+            Q(conteudo__icontains=query) | 
+            Q(autor__username__icontains=query)
+        )
+
+    # Ordenação (Mais Recentes ou Mais Curtidos), sempre desempatando pelo id
+    if request.GET.get('ordem') == 'curtidos':
+        campos = ['likes_count', 'data_criacao', 'id']
+    else:
+        campos = ['data_criacao', 'id']
+    posts = posts.order_by(*[f'-{c}' for c in campos])
+
+    if cursor:
+        valores = _decodificar_cursor(cursor)
+        # JSON válido com tipos trocados ([1, 2], id numa lista...) também é cursor inválido, não erro 500
+        if valores is None or len(valores) != len(campos) or any(
+            type(valor) is not TIPOS_DO_CURSOR[campo] for campo, valor in zip(campos, valores)
+        ):
+            raise ValueError('cursor inválido')
+        if 'data_criacao' in campos:
+            pos = campos.index('data_criacao')
+            valores[pos] = datetime.fromisoformat(valores[pos])
+        posts = posts.filter(_filtro_keyset(campos, valores))
+
+    # Pega um a mais só para saber se existe próxima página
+    pagina = list(posts[:POSTS_POR_PAGINA + 1])
+    proximo_cursor = None
+    if len(pagina) > POSTS_POR_PAGINA:
+        pagina = pagina[:POSTS_POR_PAGINA]
+        ultimo = pagina[-1]
+        valores = [getattr(ultimo, c) for c in campos]
+        valores = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+        proximo_cursor = _codificar_cursor(valores)
+    return pagina, proximo_cursor
+
 @login_required
 def forum(request):
     form = PostForm()
@@ -274,47 +763,44 @@ def forum(request):
             post = form.save(commit=False)
             post.autor = request.user
             post.save()
+            if post.imagem:
+                fila.enfileirar('imagens.post', post_id=post.id)
+            notificacoes.notificar_post(post)
             return redirect('forum')
 
-    # 2. Configuração dos Filtros e Busca
-    posts = Post.objects.all()
-    
-    # Busca (Search)
-    query = request.GET.get('q')
-    if query:
-        # Busca no conteúdo do post OU no username do autor
-        posts = posts.filter(
-            Q(conteudo__icontains=query) | 
-            Q(autor__username__icontains=query)
-        )
-
-    # Filtro de Tipo de Usuário (Alunos ou Mentores)
-    filtro_autor = request.GET.get('filtro_autor')
-    if filtro_autor == 'mentores':
-        posts = posts.filter(autor__perfil__tipo='Mentor')
-    elif filtro_autor == 'alunos':
-        posts = posts.filter(autor__perfil__tipo='Estudante')
-
-    # Ordenação (Mais Recentes ou Mais Curtidos)
-    ordem = request.GET.get('ordem')
-    if ordem == 'curtidos':
-        # Anota a contagem de likes e ordena por ela (desc), e depois por data (desc)
-        posts = posts.annotate(num_likes=Count('likes')).order_by('-num_likes', '-data_criacao')
-    else:
-        # Padrão: Mais recentes primeiro
-        posts = posts.order_by('-data_criacao')
+    # 2. Primeira página do feed (as próximas vêm pelo "Carregar mais")
+    posts, proximo_cursor = _pagina_do_feed(request)
 
     context = {
         'posts': posts,
+        'proximo_cursor': proximo_cursor,
         'form': form,
     }
     return render(request, 'forum.html', context)
 
+@login_required
+def forum_mais(request):
+    # Endpoint do "Carregar mais": mesmos filtros da página + o cursor
+    try:
+        posts, proximo_cursor = _pagina_do_feed(request, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'erro': 'Cursor inválido.'}, status=400)
+
+    html = render_to_string('forum_posts.html', {'posts': posts}, request=request)
+    return JsonResponse({'html': html, 'proximo_cursor': proximo_cursor})
+
 # --- DETALHES DO POST (COMENTÁRIOS) ---
+# Os comentários vêm em fios (core/comentarios.py): uma página de principais com o começo de cada fio,
+# e o resto pelo "Carregar mais comentários" / "Ver mais respostas".
+def _cursor_dos_comentarios(pagina, tem_mais):
+    if not tem_mais:
+        return None
+    ultimo = pagina[-1]
+    return _codificar_cursor([ultimo.data_criacao.isoformat(), ultimo.id])
+
 @login_required
 def post_detail(request, pk):
-    post = get_object_or_404(Post, pk=pk)
-    comentarios_principais = post.comentarios.filter(parent=None).order_by('-data_criacao')
+    post = get_object_or_404(Post.objects.select_related('autor__perfil'), pk=pk)
     form = ComentarioForm()
 
     if request.method == 'POST':
@@ -324,54 +810,111 @@ def post_detail(request, pk):
             comentario.autor = request.user
             comentario.post = post
             
-            # --- LÓGICA DE NOTIFICAÇÃO ---
             parent_id = request.POST.get('parent_id')
-            
-            # CASO 1: É uma RESPOSTA a um comentário
             if parent_id:
-                parent_obj = Comentario.objects.get(id=parent_id)
-                comentario.parent = parent_obj
-                
-                # Notifica o dono do comentário original (se não for eu mesmo)
-                if parent_obj.autor != request.user:
-                    Notificacao.objects.create(
-                        destinatario=parent_obj.autor,
-                        mensagem=f"💬 {request.user.username} respondeu seu comentário.",
-                        link=f"/forum/post/{post.id}/"
-                    )
-            
-            # CASO 2: É um comentário direto no POST
-            else:
-                # Notifica o dono do Post (se não for eu mesmo)
-                if post.autor != request.user:
-                    Notificacao.objects.create(
-                        destinatario=post.autor,
-                        mensagem=f"📢 {request.user.username} comentou no seu post.",
-                        link=f"/forum/post/{post.id}/"
-                    )
-            
-            comentario.save()
+                # Resposta a um comentário (do mesmo post)
+                comentario.parent = get_object_or_404(Comentario, id=parent_id, post=post)
+
+            with transaction.atomic():
+                comentario.save()
+                Post.objects.filter(pk=post.pk).update(comentarios_count=F('comentarios_count') + 1)
+                # Os avisos vão para a fila junto com o comentário (ver core/notificacoes.py)
+                notificacoes.notificar_comentario(comentario)
             return redirect('post_detail', pk=pk)
 
+    fios, tem_mais = comentarios.fios(post.id)
     context = {
         'post': post,
-        'comentarios': comentarios_principais,
+        'curtido': post.likes.filter(pk=request.user.pk).exists(),
+        'comentarios': fios,
+        'proximo_cursor': _cursor_dos_comentarios(fios, tem_mais),
         'form': form
     }
     return render(request, 'post_detail.html', context)
 
+@login_required
+def comentarios_mais(request, pk):
+    # "Carregar mais comentários": a próxima página de fios depois do cursor
+    valores = _decodificar_cursor(request.GET.get('cursor', ''))
+    try:
+        data, comentario_id = valores
+        antes = (datetime.fromisoformat(data), int(comentario_id))
+    except (TypeError, ValueError):
+        return JsonResponse({'erro': 'Cursor inválido.'}, status=400)
+
+    fios, tem_mais = comentarios.fios(pk, antes)
+    html = render_to_string('post_comentarios.html', {'comentarios': fios, 'form': ComentarioForm()}, request=request)
+    return JsonResponse({'html': html, 'proximo_cursor': _cursor_dos_comentarios(fios, tem_mais)})
+
+@login_required
+def comentario_respostas(request, pk):
+    # "Ver mais respostas" de um fio: cada bloco vai para dentro do comentário pai, que já está na página
+    raiz = get_object_or_404(Comentario.objects.only('id'), pk=pk, parent=None)
+    depois = request.GET.get('depois', '')
+    if depois and not depois.isdigit():
+        return JsonResponse({'erro': 'Posição inválida.'}, status=400)
+
+    respostas, tem_mais = comentarios.respostas_do_fio(raiz.id, depois)
+    form = ComentarioForm()
+    blocos = [
+        {'pai': pai, 'html': render_to_string('post_comentarios.html', {'comentarios': filhos, 'form': form}, request=request)}
+        for pai, filhos in comentarios.blocos(respostas)
+    ]
+    return JsonResponse({'blocos': blocos, 'depois': respostas[-1].caminho if tem_mais else None})
+
 # --- FUNÇÃO DE DAR LIKE (AJAX/Simples) ---
+def _alternar_like(usuario, post_id, acao=None):
+    """
+    Curte/descurte sem carregar a lista de quem curtiu.
+    acao: 'curtir', 'descurtir' ou None (alterna). Devolve (curtido, total_likes).
+    """
+    Curtida = Post.likes.through
+
+    with transaction.atomic():
+        removidas = 0
+        if acao != 'curtir':
+            # DELETE direto pelo índice único (post_id, user_id): se apagou, era curtida
+            removidas, _ = Curtida.objects.filter(post_id=post_id, user_id=usuario.id).delete()
+
+        if removidas:
+            curtido = False
+            Post.objects.filter(pk=post_id).update(likes_count=F('likes_count') - 1)
+        elif acao == 'descurtir':
+            curtido = False
+        else:
+            # INSERT e deixa a constraint única avisar se já existia (clique duplo, duas abas...)
+            try:
+                with transaction.atomic():
+                    Curtida.objects.create(post_id=post_id, user_id=usuario.id)
+            except IntegrityError:
+                pass
+            else:
+                Post.objects.filter(pk=post_id).update(likes_count=F('likes_count') + 1)
+            curtido = True
+
+        total = Post.objects.filter(pk=post_id).values_list('likes_count', flat=True).get()
+    return curtido, total
+
 @login_required
 def dar_like(request, pk):
-    post = get_object_or_404(Post, pk=pk)
-    if request.user in post.likes.all():
-        post.likes.remove(request.user)
-    else:
-        post.likes.add(request.user)
+    post = get_object_or_404(Post.objects.only('id'), pk=pk)
+    _alternar_like(request.user, post.id)
     
     # Redireciona de volta para a mesma página que estava (feed ou detalhe)
     return redirect(request.META.get('HTTP_REFERER', 'forum'))
 
+@login_required
+@require_POST
+def api_like(request, pk):
+    # Versão AJAX: devolve o novo estado em JSON para a página atualizar sem recarregar
+    post = get_object_or_404(Post.objects.only('id'), pk=pk)
+    acao = request.POST.get('acao')
+    if acao not in (None, '', 'curtir', 'descurtir'):
+        return JsonResponse({'erro': 'Ação inválida.'}, status=400)
+
+    curtido, total = _alternar_like(request.user, post.id, acao or None)
+    return JsonResponse({'curtido': curtido, 'likes': total})
+
 
 @login_required
 def deletar_post(request, pk):
@@ -393,7 +936,11 @@ def deletar_comentario(request, pk):
     
     # Verificação de Segurança
     if request.user == comentario.autor or request.user.is_superuser:
-        comentario.delete()
+        with transaction.atomic():
+            # Apagar um comentário leva junto as respostas (CASCADE), então desconta todas
+            _, apagados = comentario.delete()
+            total = apagados.get('core.Comentario', 0)
+            Post.objects.filter(pk=post_id).update(comentarios_count=F('comentarios_count') - total)
         messages.success(request, "Comentário apagado!")
     else:
         messages.error(request, "Sem permissão.")
@@ -409,4 +956,27 @@ def marcar_notificacao_lida(request, id):
         notificacao.save()
         # Redireciona para o link da notificação (o post)
         return redirect(notificacao.link)
-    return redirect('dashboard')
\ No newline at end of file
+    return redirect('dashboard')
+
+
+# --- EVENTOS EM TEMPO REAL (SSE) ---
+# View assíncrona: precisa ser servida pelo ASGI para não prender uma thread por aba aberta.
+async def stream_eventos(request):
+    if not isinstance(request, ASGIRequest):
+        # WSGI/runserver: o fluxo infinito prenderia uma thread por aba. 204 faz o EventSource desistir
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+
+    if not eventos.reservar_conexao(user.id):
+        # Muitas abas deste usuário (ou servidor cheio): o EventSource tenta de novo sozinho
+        resposta = HttpResponse(status=429)
+        resposta['Retry-After'] = '30'
+        return resposta
+
+    resposta = StreamingHttpResponse(eventos.fluxo_do_usuario(user.id), content_type='text/event-stream')
+    resposta['Cache-Control'] = 'no-cache'
+    resposta['X-Accel-Buffering'] = 'no'  # nginx: não segurar os eventos no buffer
+    return resposta
@@ -0,0 +1,137 @@
+# core/websocket.py
+# --- CHAT EM TEMPO REAL (WEBSOCKET NO ASGI) ---
+# Implementado direto no protocolo ASGI (sem Channels): o mentoria_project/asgi.py manda
+# para cá as conexões do tipo "websocket" e o resto continua indo para o Django normal.
+#
+# Rota: /ws/chat/<username>/
+#   cliente -> servidor: {"tipo": "mensagem", "conteudo": "..."} | {"tipo": "lido"}
+#   servidor -> cliente: {"tipo": "mensagem", "mensagem": {...}} | {"tipo": "lidas", "leitor_id": .., "lidas_ate": ..}
+import asyncio
+import json
+import re
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import aget_user
+from django.contrib.auth.models import User
+from django.http.request import split_domain_port, validate_host
+
+from . import chat, tempo_real
+
+ROTA_CHAT = re.compile(r'^/ws/chat/(?P<username>[^/]+)/$')
+
+# Códigos de fechamento (4000+ são livres para a aplicação)
+FECHAR_NAO_ENCONTRADO = 4004
+FECHAR_NAO_AUTORIZADO = 4003
+
+
+def _cabecalhos(scope):
+    return {nome.decode('latin1'): valor.decode('latin1') for nome, valor in scope.get('headers', [])}
+
+
+def _origem_permitida(cabecalhos):
+    # Sem checar a origem, qualquer site poderia abrir o socket com o cookie do usuário
+    origem = cabecalhos.get('origin')
+    if not origem:
+        return False
+    host = re.sub(r'^[a-z]+://', '', origem)
+    dominio, _ = split_domain_port(host)
+    hosts = settings.ALLOWED_HOSTS or (['localhost', '127.0.0.1', '[::1]'] if settings.DEBUG else [])
+    return bool(dominio) and validate_host(dominio, hosts)
+
+
+async def _usuario_da_sessao(cabecalhos):
+    cookies = SimpleCookie()
+    cookies.load(cabecalhos.get('cookie', ''))
+    chave = cookies.get(settings.SESSION_COOKIE_NAME)
+    if not chave:
+        return None
+
+    engine = import_module(settings.SESSION_ENGINE)
+    request = SimpleNamespace(session=engine.SessionStore(chave.value))
+    user = await aget_user(request)
+    return user if user.is_authenticated else None
+
+
+@tempo_real.com_banco
+def _buscar_usuario(username):
+    return User.objects.filter(username=username).first()
+
+
+@tempo_real.com_banco
+def _enviar(remetente, destinatario, conteudo):
+    chat.enviar_mensagem(remetente, destinatario, conteudo)
+
+
+@tempo_real.com_banco
+def _marcar_lidas(leitor, outro_usuario):
+    chat.marcar_como_lidas(leitor, outro_usuario)
+
+
+async def _fechar(send, codigo):
+    await send({'type': 'websocket.close', 'code': codigo})
+
+
+async def rotear_websocket(scope, receive, send):
+    rota = ROTA_CHAT.match(scope['path'])
+    if not rota:
+        await _fechar(send, FECHAR_NAO_ENCONTRADO)
+        return
+    await chat_websocket(scope, receive, send, rota['username'])
+
+
+async def chat_websocket(scope, receive, send, username):
+    evento = await receive()
+    if evento['type'] != 'websocket.connect':
+        return
+
+    cabecalhos = _cabecalhos(scope)
+    usuario = await _usuario_da_sessao(cabecalhos) if _origem_permitida(cabecalhos) else None
+    if usuario is None:
+        await _fechar(send, FECHAR_NAO_AUTORIZADO)
+        return
+
+    outro_usuario = await _buscar_usuario(username)
+    if outro_usuario is None or outro_usuario.id == usuario.id:
+        await _fechar(send, FECHAR_NAO_ENCONTRADO)
+        return
+
+    assinatura = tempo_real.assinar(tempo_real.canal_conversa(usuario.id, outro_usuario.id))
+    await send({'type': 'websocket.accept'})
+
+    async def ouvir_cliente():
+        while True:
+            evento = await receive()
+            if evento['type'] == 'websocket.disconnect':
+                return
+            if evento['type'] != 'websocket.receive' or not evento.get('text'):
+                continue
+            try:
+                dados = json.loads(evento['text'])
+            except ValueError:
+                continue
+
+            if dados.get('tipo') == 'mensagem':
+                conteudo = (dados.get('conteudo') or '').strip()
+                if conteudo:
+                    await _enviar(usuario, outro_usuario, conteudo)
+            elif dados.get('tipo') == 'lido':
+                await _marcar_lidas(usuario, outro_usuario)
+
+    async def repassar_eventos():
+        while True:
+            evento = await assinatura.proximo()
+            if evento['tipo'] == 'mensagem':
+                msg = evento['mensagem']
+                evento = {**evento, 'mensagem': {**msg, 'minha': msg['remetente_id'] == usuario.id}}
+            await send({'type': 'websocket.send', 'text': json.dumps(evento)})
+
+    tarefas = [asyncio.ensure_future(ouvir_cliente()), asyncio.ensure_future(repassar_eventos())]
+    try:
+        await asyncio.wait(tarefas, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        assinatura.cancelar()
+        for tarefa in tarefas:
+            tarefa.cancel()
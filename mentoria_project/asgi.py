@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mentoria_project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Importado depois do get_asgi_application(), que é quem inicializa o Django
+from core.websocket import rotear_websocket  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # WebSocket (chat em tempo real) vai para o core; HTTP e lifespan seguem para o Django
+    if scope['type'] == 'websocket':
+        await rotear_websocket(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -48,6 +48,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.presenca.presenca_middleware',  # "visto agora" dos usuários logados (core/presenca.py)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,6 +65,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.eventos.tempo_real_ativo',
             ],
         },
         'DIRS': [BASE_DIR / 'templates'],
@@ -72,14 +74,101 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'mentoria_project.wsgi.application'
 
+# Chat em tempo real e notificações (WebSocket/SSE) só funcionam servindo pelo ASGI
+# (ex.: uvicorn mentoria_project.asgi:application)
+ASGI_APPLICATION = 'mentoria_project.asgi.application'
+
+# Servindo pelo ASGI? (SERVIDOR_ASGI=1). Só então as páginas abrem o fluxo /eventos/: pelo WSGI
+# (e no runserver) cada aba aberta prenderia uma thread do servidor para sempre.
+SERVIDOR_ASGI = os.environ.get('SERVIDOR_ASGI') == '1'
+
+# Pub/sub dos eventos em tempo real (ver core/tempo_real.py)
+TEMPO_REAL_BACKEND = os.environ.get('TEMPO_REAL_BACKEND', 'core.tempo_real.BackendMemoria')
+
+# Limite de conexões SSE (/eventos/) abertas por processo, no total e por usuário
+SSE_MAX_CONEXOES = 500
+SSE_MAX_POR_USUARIO = 5
+
+# Fila de trabalhos em segundo plano (ver core/fila.py). Quem executa: python manage.py rodar_fila
+# Padrão (FILA_SINCRONA=1): cada trabalho roda na hora, depois do commit, sem worker (um processo só:
+# desenvolvimento, testes). FILA_SINCRONA=0 quando houver worker rodando; para os avisos também saírem
+# da requisição, TEMPO_REAL_BACKEND e CACHE_BACKEND precisam ser compartilhados (senão o check core.W001 avisa)
+FILA_SINCRONA = os.environ.get('FILA_SINCRONA', '1') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
+# Escolhido pelas variáveis de ambiente DB_*: SQLite por padrão (desenvolvimento, instalação pequena),
+# DB_ENGINE=postgres em produção (precisa do driver: pip install "psycopg[binary]").
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'mentoria'),
+            'USER': os.environ.get('DB_USER', 'mentoria'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Conexão reaproveitada entre requisições por até DB_CONN_MAX_AGE segundos (servindo pelo WSGI),
+            # testada antes de cada requisição para não usar uma que o servidor já derrubou
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            # Exportações grandes (feed .ics, reconstrução das conversas, miniaturas) usam .iterator(),
+            # que aqui vira cursor no servidor: as linhas vêm aos poucos em vez de todas para a memória.
+            # Atrás de um pgbouncer em modo transação os cursores no servidor não funcionam: DB_SEM_CURSOR_SERVIDOR=1
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_SEM_CURSOR_SERVIDOR') == '1',
+            'OPTIONS': {},
+        }
+    }
+    # Pelo ASGI (chat, SSE) cada requisição pode cair numa thread diferente e a conexão persistente não é
+    # reaproveitada: lá o certo é DB_POOL=1 (pool do psycopg, com CONN_MAX_AGE 0)
+    if os.environ.get('DB_POOL') == '1':
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Transação de escrita já pede a trava no BEGIN: sem isso, uma transação que leu e depois
+                # tenta escrever enquanto outra escreve falha na hora com "database is locked"
+                # (o busy_timeout não vale para esse caso). WAL, busy_timeout etc.: core/banco.py
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 5,  # segundos esperando a trava
+            },
+            # Testes num arquivo, não na memória: várias conexões de verdade (teste de concorrência do chat)
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+
+# Cache (painel, facetas do diretório, páginas públicas e cards de post: core/paginas.py)
+# CACHE_BACKEND=locmem (padrão): memória de cada processo. Com mais de um processo servindo,
+# um não vê o que o outro apagou: use file (pasta compartilhada) ou redis (precisa do pacote redis).
+# CACHE_VERSION entra em todas as chaves: subir o número num deploy descarta o cache antigo inteiro.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': {
+            'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+            'file': 'django.core.cache.backends.filebased.FileBasedCache',
+            'redis': 'django.core.cache.backends.redis.RedisCache',
+        }[CACHE_BACKEND],
+        'LOCATION': {
+            'locmem': 'mentoria',
+            'file': os.environ.get('CACHE_DIR', str(BASE_DIR / 'cache')),
+            'redis': os.environ.get('CACHE_URL', 'redis://127.0.0.1:6379/1'),
+        }[CACHE_BACKEND],
+        'TIMEOUT': 300,
+        'KEY_PREFIX': 'mentoria',
+        'VERSION': int(os.environ.get('CACHE_VERSION', '1')),
     }
 }
 
@@ -120,7 +209,6 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
-import os
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
@@ -0,0 +1,129 @@
+// --- SELETOR DE USUÁRIOS COM AUTOCOMPLETAR ---
+// Os <select data-autocompletar="/api/usuarios/"> vêm só com as opções já escolhidas (ver core/forms.py).
+// Aqui o select fica escondido e no lugar dele aparece um campo de busca: cada escolha vira uma
+// <option selected> no próprio select, então o formulário é enviado do jeito de sempre.
+
+(function() {
+    var ESPERA = 200; // ms depois da última tecla
+
+    function montar(select) {
+        var multiplo = select.multiple;
+        var caixa = document.createElement('div');
+        caixa.className = 'autocompletar';
+        var escolhidos = document.createElement('div');
+        escolhidos.className = 'autocompletar-escolhidos';
+        var campo = document.createElement('input');
+        campo.type = 'text';
+        campo.autocomplete = 'off';
+        campo.placeholder = 'Digite o nome ou @usuário';
+        var lista = document.createElement('ul');
+        lista.className = 'autocompletar-lista';
+        lista.hidden = true;
+
+        caixa.appendChild(escolhidos);
+        caixa.appendChild(campo);
+        caixa.appendChild(lista);
+        select.hidden = true;
+        select.parentNode.insertBefore(caixa, select.nextSibling);
+
+        function desenharEscolhidos() {
+            escolhidos.innerHTML = '';
+            Array.prototype.forEach.call(select.options, function(opcao) {
+                if (!opcao.selected || !opcao.value) return;
+                var chip = document.createElement('span');
+                chip.className = 'autocompletar-chip';
+                chip.textContent = opcao.text + ' ';
+                var remover = document.createElement('button');
+                remover.type = 'button';
+                remover.textContent = '×';
+                remover.onclick = function() {
+                    if (multiplo) {
+                        opcao.remove();
+                    } else {
+                        select.value = '';
+                    }
+                    desenharEscolhidos();
+                    select.dispatchEvent(new Event('change', { bubbles: true }));
+                };
+                chip.appendChild(remover);
+                escolhidos.appendChild(chip);
+            });
+        }
+
+        function escolher(usuario) {
+            var opcao = Array.prototype.find.call(select.options, function(o) { return o.value === String(usuario.id); });
+            if (!opcao) {
+                if (!multiplo) {
+                    // Seletor de um só: troca a escolha anterior (a opção vazia fica)
+                    Array.prototype.slice.call(select.options).forEach(function(o) { if (o.value) o.remove(); });
+                }
+                opcao = new Option(usuario.rotulo, usuario.id);
+                select.add(opcao);
+            }
+            opcao.selected = true;
+            campo.value = '';
+            lista.hidden = true;
+            desenharEscolhidos();
+            select.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+
+        function mostrar(usuarios) {
+            lista.innerHTML = '';
+            usuarios.forEach(function(usuario) {
+                var item = document.createElement('li');
+                var foto = document.createElement('img');
+                foto.src = usuario.foto;
+                item.appendChild(foto);
+                item.appendChild(document.createTextNode(usuario.rotulo));
+                item.onmousedown = function(e) { e.preventDefault(); escolher(usuario); };
+                lista.appendChild(item);
+            });
+            if (!usuarios.length) {
+                var vazio = document.createElement('li');
+                vazio.className = 'autocompletar-vazio';
+                vazio.textContent = 'Ninguém encontrado';
+                lista.appendChild(vazio);
+            }
+            lista.hidden = false;
+            lista.usuarios = usuarios;
+        }
+
+        var temporizador = null;
+        var ultimaBusca = 0;
+        campo.addEventListener('input', function() {
+            clearTimeout(temporizador);
+            var texto = campo.value.trim();
+            if (!texto) { lista.hidden = true; return; }
+            temporizador = setTimeout(function() {
+                var params = new URLSearchParams({ q: texto });
+                if (select.dataset.tipo) params.set('tipo', select.dataset.tipo);
+                var busca = ++ultimaBusca;
+                fetch(select.dataset.autocompletar + '?' + params, { credentials: 'same-origin' })
+                    .then(function(r) { return r.json(); })
+                    .then(function(dados) {
+                        // Resposta de uma busca antiga (a pessoa continuou digitando): ignora
+                        if (busca === ultimaBusca) mostrar(dados.usuarios || []);
+                    });
+            }, ESPERA);
+        });
+
+        campo.addEventListener('keydown', function(e) {
+            if (e.key !== 'Enter') return;
+            e.preventDefault(); // Enter escolhe a primeira sugestão, não envia o formulário
+            if (!lista.hidden && lista.usuarios && lista.usuarios.length) escolher(lista.usuarios[0]);
+        });
+        campo.addEventListener('blur', function() { lista.hidden = true; });
+
+        desenharEscolhidos();
+    }
+
+    function iniciar() {
+        document.querySelectorAll('select[data-autocompletar]').forEach(montar);
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', iniciar);
+    } else {
+        iniciar();
+    }
+})();
@@ -0,0 +1,45 @@
+// --- CONTADORES EM TEMPO REAL (SSE) ---
+// Um EventSource por aba em /eventos/. Atualiza os badges com data-contador
+// e repassa os eventos como "mentoria:<tipo>" no document para as páginas que quiserem reagir.
+
+(function() {
+    if (!window.EventSource || !document.body.dataset.eventosUrl) return;
+
+    function atualizarContador(nome, valor) {
+        document.querySelectorAll('[data-contador="' + nome + '"]').forEach(function(el) {
+            el.textContent = valor;
+            el.hidden = !valor;
+        });
+    }
+
+    function repassar(tipo, dados) {
+        document.dispatchEvent(new CustomEvent('mentoria:' + tipo, { detail: dados }));
+    }
+
+    var fonte = new EventSource(document.body.dataset.eventosUrl);
+
+    fonte.addEventListener('estado', function(e) {
+        var dados = JSON.parse(e.data);
+        atualizarContador('mensagens', dados.mensagens);
+        atualizarContador('avisos', dados.avisos);
+    });
+
+    fonte.addEventListener('mensagens', function(e) {
+        var dados = JSON.parse(e.data);
+        atualizarContador('mensagens', dados.mensagens);
+        repassar('mensagens', dados);
+    });
+
+    fonte.addEventListener('notificacao', function(e) {
+        var dados = JSON.parse(e.data);
+        atualizarContador('avisos', dados.avisos);
+        repassar('notificacao', dados);
+    });
+
+    fonte.addEventListener('comentario', function(e) {
+        repassar('comentario', JSON.parse(e.data));
+    });
+
+    // Sair da página fecha a conexão na hora (libera a vaga no servidor)
+    window.addEventListener('pagehide', function() { fonte.close(); });
+})();
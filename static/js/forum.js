@@ -0,0 +1,48 @@
+// --- CURTIDAS SEM RECARREGAR A PÁGINA ---
+// Botões com data-like-url chamam a API e atualizam ícone, texto e contadores do post.
+
+function pegarCookie(nome) {
+    var valor = null;
+    document.cookie.split(';').forEach(function(item) {
+        var partes = item.trim().split('=');
+        if (partes[0] === nome) valor = decodeURIComponent(partes[1]);
+    });
+    return valor;
+}
+
+function curtirPost(evento, botao) {
+    evento.preventDefault();
+    evento.stopPropagation();
+    if (botao.dataset.enviando) return;
+    botao.dataset.enviando = '1';
+
+    fetch(botao.dataset.likeUrl, {
+        method: 'POST',
+        headers: { 'X-CSRFToken': pegarCookie('csrftoken') },
+        credentials: 'same-origin'
+    })
+        .then(function(resp) {
+            if (!resp.ok) throw new Error('Falha ao curtir');
+            return resp.json();
+        })
+        .then(function(dados) {
+            botao.classList.toggle(botao.dataset.classeAtiva, dados.curtido);
+
+            var icone = botao.querySelector('.like-icone');
+            if (icone) icone.textContent = dados.curtido ? '❤️' : '🤍';
+
+            var rotulo = botao.querySelector('.like-rotulo');
+            if (rotulo) rotulo.textContent = dados.curtido ? 'Curtido' : 'Curtir';
+
+            document.querySelectorAll('[data-likes-post="' + botao.dataset.postId + '"]').forEach(function(el) {
+                el.textContent = dados.likes;
+            });
+        })
+        .catch(function() {
+            // Sem JS/API? Cai no link antigo, que recarrega a página
+            window.location.href = botao.href;
+        })
+        .finally(function() {
+            delete botao.dataset.enviando;
+        });
+}